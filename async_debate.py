@@ -0,0 +1,254 @@
+"""
+Asyncio debate engine.
+
+Runs the same debate as debate.run_semi_agentic_debate(), but the
+independent per-agent calls of each phase (and the sentiment analysis
+behind the idea evolution report) are issued concurrently through an
+AsyncLLMGateway. A phase then takes about as long as its slowest agent
+instead of the sum of all of them. Prompts, parsing, knowledge handling and
+artifact writing are shared with debate.py, so the results dict matches
+the sequential engine's.
+"""
+
+import asyncio
+import logging
+
+from dotenv import load_dotenv
+
+from debate import (
+    MODERATOR_PROMPTS, add_reference_instructions, build_debate_context, choose_critique_target,
+    common_ground_request, critique_request, final_position_request, final_report_request,
+    format_contributions, format_critiques, format_perspectives, format_responses,
+    generate_agent_perspective, group_critiques_by_target, integrate_knowledge, parse_sentiment,
+    perspective_request, record_knowledge_results, response_request, save_debate_outputs,
+    sentiment_request, sentiment_texts, start_debate, target_selection_request
+)
+from knowledge_integration import knowledge_service, process_reference_requests
+from llm_gateway import get_async_llm_gateway, get_llm_gateway
+
+logger = logging.getLogger("AsyncDebate")
+
+DEBATE_CONCURRENCY = 8
+
+async def moderator_message(gateway, moderator, prompt, phase_name, context=None):
+    """Generate a moderator message; reference resolution runs in a worker thread."""
+    message = await gateway.chat(**moderator.build_request(prompt, context))
+    return await asyncio.to_thread(moderator.finish_message, message, phase_name)
+
+async def agent_message(gateway, request, agent, knowledge_integration, phase, problem_statement):
+    """Run an agent's chat request and resolve its references in a worker thread."""
+    message = await gateway.chat(**request)
+    return await asyncio.to_thread(integrate_knowledge, message, agent.name, knowledge_integration,
+                                   phase, problem_statement)
+
+async def analyze_sentiment_async(gateway, text):
+    """Analyze sentiment of text to track emotional tone."""
+    try:
+        return parse_sentiment(await gateway.chat(**sentiment_request(text)))
+    except Exception as e:
+        logger.warning(f"Sentiment analysis failed: {str(e)}")
+        return 0  # Default to neutral
+
+async def initial_perspective(gateway, client, agent, problem_statement, knowledge_integration):
+    """Phase 1 for one agent."""
+    print(f"  💬 {agent.name} is sharing perspective...")
+    # generate_argument() may do blocking knowledge lookups, so it runs in a thread
+    perspective = await asyncio.to_thread(generate_agent_perspective, agent, client, problem_statement,
+                                          knowledge_integration)
+    if perspective is None:
+        # Use standard perspective generation
+        perspective = await agent_message(gateway, perspective_request(agent, problem_statement, knowledge_integration),
+                                          agent, knowledge_integration, "initial_perspective", problem_statement)
+    print(f"  ✅ {agent.name}: {perspective[:70]}...")
+    return perspective
+
+async def critique(gateway, agent, agents, problem_statement, perspectives, perspectives_text, knowledge_integration):
+    """Phase 2 for one agent: choose a target, then critique it."""
+    print(f"  💬 {agent.name} is selecting a perspective to critique...")
+    target_selection = await gateway.chat(**target_selection_request(agent, problem_statement, perspectives_text))
+    target_name = choose_critique_target(target_selection, agent, agents)
+    print(f"  📌 {agent.name} chose to critique {target_name}")
+
+    critique_text = await agent_message(
+        gateway, critique_request(agent, problem_statement, target_name, perspectives[target_name]),
+        agent, knowledge_integration, "critique", problem_statement
+    )
+    print(f"  ✅ {agent.name} critiqued {target_name}")
+    return target_name, critique_text
+
+async def respond(gateway, agent, problem_statement, received_critiques, knowledge_integration):
+    """Phase 3 for one agent."""
+    if received_critiques:
+        print(f"  💬 {agent.name} is responding to critiques...")
+    response = await agent_message(gateway, response_request(agent, problem_statement, received_critiques),
+                                   agent, knowledge_integration, "response", problem_statement)
+    if received_critiques:
+        print(f"  ✅ {agent.name} responded to critiques")
+    else:
+        print(f"  ✅ {agent.name} provided general reflections")
+    return {
+        "critiques_received": [c["critic"] for c in received_critiques],
+        "response": response
+    }
+
+async def _run_debate(problem_statement, agents, client, knowledge_integration, moderator, results, max_concurrency):
+    """
+    Run the debate phases, filling in results.
+
+    Returns:
+        tuple: (text -> sentiment score for the idea evolution visualization,
+            statistics of the async gateway)
+    """
+    gateway = get_async_llm_gateway(max_concurrency)
+    try:
+        # The welcome and the Phase 1 introduction don't depend on each other
+        welcome_prompt = MODERATOR_PROMPTS["welcome"].format(problem_statement=problem_statement)
+        welcome_message, phase1_intro = await asyncio.gather(
+            moderator_message(gateway, moderator, welcome_prompt, "welcome"),
+            moderator_message(gateway, moderator, MODERATOR_PROMPTS["phase1_intro"], "phase1_intro")
+        )
+        results["moderator_messages"]["welcome"] = welcome_message
+        results["moderator_messages"]["phase1_intro"] = phase1_intro
+        print(f"\n🎭 Moderator: {welcome_message}\n")
+        print(f"\n🎭 Moderator: {phase1_intro}\n")
+
+        # PHASE 1: Initial Perspectives
+        print("1️⃣ PHASE 1: Initial Perspectives")
+        if knowledge_integration:
+            add_reference_instructions(agents)
+
+        outputs = await asyncio.gather(*[
+            initial_perspective(gateway, client, agent, problem_statement, knowledge_integration) for agent in agents
+        ])
+        perspectives = {agent.name: perspective for agent, perspective in zip(agents, outputs)}
+        results["phases"]["initial_perspectives"] = perspectives
+
+        perspectives_text = format_perspectives(perspectives)
+        phase1_summary = await moderator_message(gateway, moderator, MODERATOR_PROMPTS["phase1_summary"],
+                                                 "phase1_summary", perspectives_text)
+        results["moderator_messages"]["phase1_summary"] = phase1_summary
+        print(f"\n🎭 Moderator: {phase1_summary}\n")
+
+        # PHASE 2: Critiques
+        print("2️⃣ PHASE 2: Critiques")
+        outputs = await asyncio.gather(*[
+            critique(gateway, agent, agents, problem_statement, perspectives, perspectives_text, knowledge_integration)
+            for agent in agents
+        ])
+        critiques = {}
+        for agent, (target_name, critique_text) in zip(agents, outputs):
+            critiques.setdefault(agent.name, {})[target_name] = critique_text
+        results["phases"]["critiques"] = critiques
+
+        critiques_text = format_critiques(critiques)
+        phase2_summary = await moderator_message(gateway, moderator, MODERATOR_PROMPTS["phase2_summary"],
+                                                 "phase2_summary", critiques_text)
+        results["moderator_messages"]["phase2_summary"] = phase2_summary
+        print(f"\n🎭 Moderator: {phase2_summary}\n")
+
+        # PHASE 3: Responses to Critiques
+        print("3️⃣ PHASE 3: Responses to Critiques")
+        critique_targets = group_critiques_by_target(critiques)
+        outputs = await asyncio.gather(*[
+            respond(gateway, agent, problem_statement, critique_targets.get(agent.name, []), knowledge_integration)
+            for agent in agents
+        ])
+        responses = {agent.name: response for agent, response in zip(agents, outputs)}
+        results["phases"]["responses"] = responses
+
+        responses_text = format_responses(responses)
+        phase3_summary = await moderator_message(gateway, moderator, MODERATOR_PROMPTS["phase3_summary"],
+                                                 "phase3_summary", responses_text)
+        results["moderator_messages"]["phase3_summary"] = phase3_summary
+        print(f"\n🎭 Moderator: {phase3_summary}\n")
+
+        # PHASE 4: Common Ground
+        print("4️⃣ PHASE 4: Finding Common Ground")
+        debate_context = build_debate_context(problem_statement, perspectives_text, critiques_text, responses_text)
+        outputs = await asyncio.gather(*[
+            agent_message(gateway, common_ground_request(agent, debate_context), agent, knowledge_integration,
+                          "common_ground", problem_statement)
+            for agent in agents
+        ])
+        common_ground = {agent.name: text for agent, text in zip(agents, outputs)}
+        results["phases"]["common_ground"] = common_ground
+
+        common_ground_text = format_contributions(common_ground)
+        phase4_summary = await moderator_message(gateway, moderator, MODERATOR_PROMPTS["phase4_summary"],
+                                                 "phase4_summary", common_ground_text)
+        results["moderator_messages"]["phase4_summary"] = phase4_summary
+        print(f"\n🎭 Moderator: {phase4_summary}\n")
+
+        # PHASE 5: Final Positions
+        print("5️⃣ PHASE 5: Final Positions")
+        outputs = await asyncio.gather(*[
+            agent_message(gateway, final_position_request(agent, problem_statement, perspectives[agent.name]),
+                          agent, knowledge_integration, "final_position", problem_statement)
+            for agent in agents
+        ])
+        final_positions = {agent.name: text for agent, text in zip(agents, outputs)}
+        results["phases"]["final_positions"] = final_positions
+
+        final_positions_text = format_contributions(final_positions)
+        conclusion = await moderator_message(gateway, moderator, MODERATOR_PROMPTS["conclusion"],
+                                             "conclusion", final_positions_text)
+        results["moderator_messages"]["conclusion"] = conclusion
+        print(f"\n🎭 Moderator: {conclusion}\n")
+
+        record_knowledge_results(results, knowledge_integration)
+
+        # FINAL REPORT GENERATION, with the sentiment analysis for the
+        # idea evolution report running alongside it
+        print("6️⃣ Generating Final Report")
+        texts = list(dict.fromkeys(sentiment_texts(perspectives, critiques, responses, common_ground, final_positions)))
+        final_report, *scores = await asyncio.gather(
+            gateway.chat(**final_report_request(
+                moderator, results, perspectives_text, critiques_text, responses_text,
+                common_ground_text, final_positions_text
+            )),
+            *[analyze_sentiment_async(gateway, text) for text in texts]
+        )
+
+        # Process any reference requests in the final report
+        if knowledge_integration:
+            final_report = await asyncio.to_thread(
+                process_reference_requests, final_report, knowledge_integration,
+                agent_name="Moderator", phase="final_report"
+            )
+        results["final_report"] = final_report
+        print("  ✅ Final report generated")
+
+        return dict(zip(texts, scores)), gateway.get_stats()
+    finally:
+        await gateway.aclose()
+
+def run_async_debate(problem_statement, agents, output_dir=None, knowledge_config=None,
+                     max_concurrency=DEBATE_CONCURRENCY):
+    """
+    Run the semi-agentic debate with each phase's per-agent calls issued concurrently.
+
+    Args:
+        problem_statement (str): The topic for debate
+        agents (list): List of agent objects
+        output_dir (str, optional): Directory to save results
+        knowledge_config (dict, optional): Configuration for knowledge integration
+        max_concurrency (int): LLM calls allowed in flight at once
+
+    Returns:
+        tuple: (output_dir, results), as from run_semi_agentic_debate()
+    """
+    load_dotenv()
+    client = get_llm_gateway()
+
+    knowledge_integration, output_dir, moderator, results = start_debate(
+        problem_statement, agents, output_dir, knowledge_config, client
+    )
+
+    # The service installed here follows the debate into its tasks and threads
+    with knowledge_service(knowledge_integration):
+        sentiments, llm_stats = asyncio.run(_run_debate(
+            problem_statement, agents, client, knowledge_integration, moderator, results, max_concurrency
+        ))
+
+    return save_debate_outputs(results, output_dir, knowledge_integration, client, sentiments=sentiments,
+                               llm_stats=llm_stats)
@@ -77,11 +77,14 @@ class DebateAgent(autogen.AssistantAgent):
         
         logger.info(f"Updated system message for {self.name}")
     
-    def generate_argument(self, topic):
+    def generate_argument(self, topic, knowledge_integration=None):
         """Generate an initial argument for the debate topic, incorporating knowledge retrieval.
         
         Args:
             topic (str): The debate topic
+            knowledge_integration (KnowledgeIntegration, optional): The debate's
+                knowledge integration, so the knowledge retrieved here is cached
+                for the reference request this method returns
             
         Returns:
             str: The generated argument with incorporated knowledge
@@ -90,21 +93,22 @@ class DebateAgent(autogen.AssistantAgent):
         
         # Try to retrieve relevant knowledge
         try:
-            knowledge = retrieve_knowledge(topic)
+            # Use the agent's expertise to frame the query we will reference
+            agent_role = self._original_system_message.split('a ')[1].split(' with')[0]
+            query = f"{topic} from {agent_role}'s perspective"
+            
+            # Not recorded in the reference ledger: resolving the returned
+            # reference request records it
+            if knowledge_integration:
+                knowledge = knowledge_integration.retrieve_knowledge(query, track=False)
+            else:
+                knowledge = retrieve_knowledge(query, track=False)
             
             if knowledge and len(knowledge) > 0:
                 logger.info(f"Knowledge retrieved: {len(knowledge)} items")
                 
-                # Format the knowledge references
-                knowledge_text = "\n".join([f"- {k[:150]}..." for k in knowledge[:2]])
-                
-                # Construct an argument that incorporates this knowledge
-                # Use the agent's expertise and priorities to frame the response
-                agent_role = self._original_system_message.split('a ')[1].split(' with')[0]
-                agent_priorities = self._original_system_message.split('prioritize ')[1].split('.')[0]
-                
                 # Use reference format for consistency with knowledge integration pattern
-                return f"[REF: {topic} from {agent_role}'s perspective]"
+                return f"[REF: {query}]"
         except Exception as e:
             logger.error(f"Error in {self.name}'s knowledge retrieval: {str(e)}")
         
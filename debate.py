@@ -9,11 +9,11 @@ import time
 import logging
 import re
 from collections import Counter
-from openai import OpenAI
 from dotenv import load_dotenv
 
 # Import knowledge integration module
-from knowledge_integration import KnowledgeIntegration, process_reference_requests, retrieve_knowledge
+from knowledge_integration import KnowledgeIntegration, knowledge_service, process_reference_requests, retrieve_knowledge
+from llm_gateway import get_llm_gateway
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, 
@@ -21,6 +21,27 @@ logging.basicConfig(level=logging.INFO,
                     handlers=[logging.FileHandler("debate.log"), logging.StreamHandler()])
 logger = logging.getLogger("DebateSystem")
 
+def agent_reference_query(agent_name, problem_statement):
+    """
+    Build the knowledge query used for an agent's explicit reference.
+    
+    Args:
+        agent_name (str): Name of the agent
+        problem_statement (str): The debate topic
+        
+    Returns:
+        str: The reference query
+    """
+    if "Nova_Creative" in agent_name:
+        return f"creative innovations in {problem_statement}"
+    elif "Morgan_Business" in agent_name:
+        return f"business applications of {problem_statement}"
+    elif "Sage_Critical" in agent_name:
+        return f"risks and challenges of {problem_statement}"
+    elif "DrAda_Technical" in agent_name:
+        return f"technical implementation of {problem_statement}"
+    return problem_statement
+
 def ensure_knowledge_in_agent_message(message, agent_name, knowledge_integration, phase, problem_statement):
     """
     Ensure the agent's message contains reference to knowledge.
@@ -45,18 +66,9 @@ def ensure_knowledge_in_agent_message(message, agent_name, knowledge_integration
     if knowledge_integration:
         logger.info(f"Adding knowledge reference for {agent_name} in {phase}")
         
-        # Create reference query based on agent name and phase
-        if "Nova_Creative" in agent_name:
-            query = f"creative innovations in {problem_statement}"
-        elif "Morgan_Business" in agent_name:
-            query = f"business applications of {problem_statement}"
-        elif "Sage_Critical" in agent_name:
-            query = f"risks and challenges of {problem_statement}"
-        elif "DrAda_Technical" in agent_name:
-            query = f"technical implementation of {problem_statement}"
-        else:
-            query = problem_statement
-            
+        # Create reference query based on agent name
+        query = agent_reference_query(agent_name, problem_statement)
+        
         # Get knowledge
         results = knowledge_integration.retrieve_knowledge(query)
         
@@ -69,13 +81,12 @@ def ensure_knowledge_in_agent_message(message, agent_name, knowledge_integration
             )
             
             # Track this reference
-            if hasattr(knowledge_integration, 'client') and hasattr(knowledge_integration.client, 'knowledge_references'):
-                knowledge_integration.client.knowledge_references.append({
-                    "query": query,
-                    "source": results[0][:200] + "..." if len(results[0]) > 200 else results[0],
-                    "agent": agent_name,
-                    "phase": phase
-                })
+            knowledge_integration.record_reference(
+                query,
+                results[0][:200] + "..." if len(results[0]) > 200 else results[0],
+                agent_name,
+                phase
+            )
                 
             logger.info(f"Added knowledge reference for {agent_name} in {phase}")
             return enhanced_message
@@ -83,8 +94,44 @@ def ensure_knowledge_in_agent_message(message, agent_name, knowledge_integration
     # If we couldn't add a reference, return the original message
     return message
 
-def generate_standard_perspective(agent, client, problem_statement, knowledge_integration):
-    """Generate a standard perspective using the OpenAI API with knowledge integration."""
+def integrate_knowledge(message, agent_name, knowledge_integration, phase, problem_statement):
+    """
+    Resolve an agent message's reference requests and make sure it cites knowledge.
+    
+    Args:
+        message (str): The agent's message
+        agent_name (str): Name of the agent
+        knowledge_integration: Knowledge integration object, or None
+        phase (str): Current debate phase
+        problem_statement (str): The debate topic
+        
+    Returns:
+        str: Message with references resolved
+    """
+    if not knowledge_integration:
+        return message
+    
+    # Process any reference requests
+    message = process_reference_requests(
+        message, 
+        knowledge_integration, 
+        agent_name=agent_name, 
+        phase=phase
+    )
+    
+    # If no reference requests were detected, add one explicitly
+    if "[REF:" not in message and "[Reference for" not in message:
+        message = ensure_knowledge_in_agent_message(
+            message, 
+            agent_name, 
+            knowledge_integration, 
+            phase, 
+            problem_statement
+        )
+    return message
+
+def perspective_request(agent, problem_statement, knowledge_integration):
+    """Build the chat request for an agent's initial perspective."""
     prompt = f"""
     The moderator has asked you to share your perspective on the following problem:
     
@@ -105,39 +152,19 @@ def generate_standard_perspective(agent, client, problem_statement, knowledge_in
     
     prompt += "\nKeep your response under 150 words and focused on your area of expertise."
     
-    # Generate the perspective
-    response = client.chat.completions.create(
-        model="gpt-4o",
-        messages=[
+    return {
+        "model": "gpt-4o",
+        "messages": [
             {"role": "system", "content": agent.system_message},
             {"role": "user", "content": prompt}
         ],
-        max_tokens=300
-    )
-    
-    perspective = response.choices[0].message.content
-    
-    # Process any reference requests if knowledge integration is enabled
-    if knowledge_integration:
-        perspective = process_reference_requests(
-            perspective, 
-            knowledge_integration, 
-            agent_name=agent.name, 
-            phase="initial_perspective"
-        )
-        
-        # If no reference requests were detected, add one explicitly
-        if "[REF:" not in perspective and "[Reference for" not in perspective:
-            logger.info(f"Adding explicit reference for {agent.name}")
-            perspective = ensure_knowledge_in_agent_message(
-                perspective, 
-                agent.name, 
-                knowledge_integration, 
-                "initial_perspective", 
-                problem_statement
-            )
-    
-    return perspective
+        "max_tokens": 300
+    }
+
+def generate_standard_perspective(agent, client, problem_statement, knowledge_integration):
+    """Generate a standard perspective using the OpenAI API with knowledge integration."""
+    perspective = client.chat(**perspective_request(agent, problem_statement, knowledge_integration))
+    return integrate_knowledge(perspective, agent.name, knowledge_integration, "initial_perspective", problem_statement)
 
 class ModeratorAgent:
     """Simulated moderator agent to guide the debate."""
@@ -155,8 +182,8 @@ class ModeratorAgent:
         For example, to get information about recent AI advancements, use [REF: recent advancements in AI].
         """
     
-    def generate_message(self, client, prompt, phase_name, context=None):
-        """Generate a message from the moderator based on the given prompt and context."""
+    def build_request(self, prompt, context=None):
+        """Build the chat request for a moderator message."""
         messages = [
             {"role": "system", "content": self.system_message}
         ]
@@ -165,16 +192,10 @@ class ModeratorAgent:
             messages.append({"role": "user", "content": f"Here's the context so far:\n\n{context}"})
         
         messages.append({"role": "user", "content": prompt})
-        
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=messages,
-            max_tokens=200
-        )
-        
-        message = response.choices[0].message.content
-        
-        # Process any reference requests
+        return {"model": "gpt-4o", "messages": messages, "max_tokens": 200}
+    
+    def finish_message(self, message, phase_name):
+        """Resolve the reference requests in a generated moderator message."""
         if self.knowledge_integration:
             message = process_reference_requests(
                 message, 
@@ -185,6 +206,11 @@ class ModeratorAgent:
         
         logger.info(f"Moderator generated {phase_name} message")
         return message
+    
+    def generate_message(self, client, prompt, phase_name, context=None):
+        """Generate a message from the moderator based on the given prompt and context."""
+        message = client.chat(**self.build_request(prompt, context))
+        return self.finish_message(message, phase_name)
 
 def extract_keywords(text, count=5):
     """Extract key terms from text to track concept evolution."""
@@ -218,30 +244,34 @@ def extract_keywords(text, count=5):
     # Return the most common words
     return word_counts.most_common(count)
 
+def sentiment_request(text):
+    """Build the chat request that scores the sentiment of a text."""
+    return {
+        "model": "gpt-4o",
+        "messages": [
+            {"role": "system", "content": "You are a sentiment analysis tool. Analyze the following text and return a single number representing the sentiment. Use -1 for very negative, 0 for neutral, and +1 for very positive."},
+            {"role": "user", "content": f"Analyze the sentiment of this text: {text}"}
+        ],
+        "max_tokens": 50
+    }
+
+def parse_sentiment(result):
+    """Extract a sentiment score in [-1, 1] from a model answer, defaulting to neutral."""
+    sentiment = 0
+    
+    # Try to extract a number
+    match = re.search(r'(-?\d+(\.\d+)?)', result.strip())
+    if match:
+        sentiment = float(match.group(1))
+        # Ensure it's within -1 to 1 range
+        sentiment = max(-1, min(1, sentiment))
+        
+    return sentiment
+
 def analyze_sentiment(client, text):
     """Analyze sentiment of text to track emotional tone."""
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": "You are a sentiment analysis tool. Analyze the following text and return a single number representing the sentiment. Use -1 for very negative, 0 for neutral, and +1 for very positive."},
-                {"role": "user", "content": f"Analyze the sentiment of this text: {text}"}
-            ],
-            max_tokens=50
-        )
-        
-        # Extract the sentiment value
-        result = response.choices[0].message.content.strip()
-        sentiment = 0
-        
-        # Try to extract a number
-        match = re.search(r'(-?\d+(\.\d+)?)', result)
-        if match:
-            sentiment = float(match.group(1))
-            # Ensure it's within -1 to 1 range
-            sentiment = max(-1, min(1, sentiment))
-            
-        return sentiment
+        return parse_sentiment(client.chat(**sentiment_request(text)))
     except Exception as e:
         logger.warning(f"Sentiment analysis failed: {str(e)}")
         return 0  # Default to neutral
@@ -332,11 +362,41 @@ graph TD
     
     return mermaid
 
-def generate_idea_evolution_visualization(perspectives, critiques, responses, common_ground, final_positions, client):
+def sentiment_texts(perspectives, critiques, responses, common_ground, final_positions):
+    """Return the texts generate_idea_evolution_visualization() scores for sentiment, in order."""
+    texts = []
+    for agent_name in perspectives.keys():
+        texts.append(perspectives[agent_name])
+        critique_text = ""
+        for critic, targets in critiques.items():
+            if agent_name in targets:
+                critique_text += targets[agent_name] + " "
+        if critique_text:
+            texts.append(critique_text)
+        if agent_name in responses:
+            texts.append(responses[agent_name]['response'])
+        if agent_name in common_ground:
+            texts.append(common_ground[agent_name])
+        if agent_name in final_positions:
+            texts.append(final_positions[agent_name])
+    return texts
+
+def generate_idea_evolution_visualization(perspectives, critiques, responses, common_ground, final_positions, client,
+                                          sentiments=None, references=None):
     """
     Generate advanced visualizations of how ideas evolved throughout the debate.
     This enhanced version provides multiple views of the debate evolution.
+    
+    Args:
+        sentiments (dict, optional): Precomputed text -> sentiment scores; texts
+            missing from it are analyzed with the client
+        references (list, optional): This debate's knowledge reference ledger
     """
+    def sentiment_of(text):
+        if sentiments is not None and text in sentiments:
+            return sentiments[text]
+        return analyze_sentiment(client, text)
+    
     # Basic text visualization (from original code)
     visualization = """## How Ideas Evolved Through the Debate
 
@@ -362,7 +422,7 @@ This visualization tracks how each expert's thinking developed throughout the de
         key_concepts.update([kw[0] for kw in initial_keywords])
         
         # Analyze sentiment
-        initial_sentiment = analyze_sentiment(client, initial)
+        initial_sentiment = sentiment_of(initial)
         agent_sentiments[agent_name] = {"initial": initial_sentiment}
         
         # Visualization of key terms
@@ -393,7 +453,7 @@ This visualization tracks how each expert's thinking developed throughout the de
         if received_any:
             critique_keywords = extract_keywords(critique_text)
             agent_keywords[agent_name]["critiques"] = critique_keywords
-            critique_sentiment = analyze_sentiment(client, critique_text)
+            critique_sentiment = sentiment_of(critique_text)
             agent_sentiments[agent_name]["critiques"] = critique_sentiment
         
         # Their response
@@ -404,7 +464,7 @@ This visualization tracks how each expert's thinking developed throughout the de
             # Analyze response
             response_keywords = extract_keywords(response_text)
             agent_keywords[agent_name]["response"] = response_keywords
-            response_sentiment = analyze_sentiment(client, response_text)
+            response_sentiment = sentiment_of(response_text)
             agent_sentiments[agent_name]["response"] = response_sentiment
             
             # Show keyword changes
@@ -421,7 +481,7 @@ This visualization tracks how each expert's thinking developed throughout the de
             # Analyze common ground
             common_keywords = extract_keywords(common_text)
             agent_keywords[agent_name]["common"] = common_keywords
-            common_sentiment = analyze_sentiment(client, common_text)
+            common_sentiment = sentiment_of(common_text)
             agent_sentiments[agent_name]["common"] = common_sentiment
         
         # Final position (abbreviated)
@@ -433,7 +493,7 @@ This visualization tracks how each expert's thinking developed throughout the de
             final_keywords = extract_keywords(final_text)
             agent_keywords[agent_name]["final"] = final_keywords
             key_concepts.update([kw[0] for kw in final_keywords])
-            final_sentiment = analyze_sentiment(client, final_text)
+            final_sentiment = sentiment_of(final_text)
             agent_sentiments[agent_name]["final"] = final_sentiment
             
             # Show keyword evolution
@@ -537,11 +597,11 @@ The following chart shows how sentiment evolved for each agent throughout the de
         visualization += f"| {agent} | {initial:.2f} | {critiques} | {response} | {final:.2f} | {change_text} |\n"
     
     # Add external knowledge references used
-    if hasattr(client, 'knowledge_references') and client.knowledge_references:
+    if references:
         visualization += "\n## External Knowledge References\n\n"
         visualization += "The following external sources were referenced during the debate:\n\n"
         
-        for i, ref in enumerate(client.knowledge_references, 1):
+        for i, ref in enumerate(references, 1):
             query = ref.get('query', 'Unknown query')
             source = ref.get('source', 'Unknown source')
             agent = ref.get('agent', 'Unknown agent')
@@ -552,35 +612,38 @@ The following chart shows how sentiment evolved for each agent throughout the de
     
     return visualization
 
-def run_semi_agentic_debate(problem_statement, agents, output_dir=None, knowledge_config=None):
+# Moderator prompts for each step of the debate; "welcome" is formatted with the problem statement
+MODERATOR_PROMPTS = {
+    "welcome": "Introduce the debate on '{problem_statement}'. Explain that we'll be exploring this topic in a structured format with experts from different domains. If relevant, use [REF: {problem_statement}] to gather background information. Keep it concise but welcoming.",
+    "phase1_intro": "Introduce the first phase of the debate where each expert will provide their initial perspective. Invite them to share concise viewpoints based on their expertise.",
+    "phase1_summary": "Summarize the key points from each expert's initial perspective. Highlight areas of agreement, disagreement, and unique insights. You can reference external research if helpful with [REF: relevant query]. Then, transition to the critique phase where experts will provide constructive feedback on each other's perspectives.",
+    "phase2_summary": "Summarize the key critiques provided by the experts. Highlight patterns, tensions, and areas where experts challenged each other's thinking. Then, transition to the response phase where experts will address the critiques directed at them.",
+    "phase3_summary": "Summarize how the experts have responded to critiques. Highlight how positions have evolved or been refined. Then, transition to the common ground phase where experts will identify areas of consensus and potential for integration.",
+    "phase4_summary": "Synthesize the common ground identified by the experts. Highlight key areas of consensus and how different perspectives might complement each other. Then, transition to the final phase where experts will provide their concluding thoughts and recommendations.",
+    "conclusion": "Conclude the debate by summarizing the journey from initial perspectives to final positions. Highlight how thinking evolved and identify key insights that emerged. Thank the experts for their contributions."
+}
+
+REFERENCE_INSTRUCTION = "\n\nYou can request external information by using [REF: your query] in your response. For example: 'Studies have shown [REF: latest research on AI-generated content reliability]'"
+
+def start_debate(problem_statement, agents, output_dir, knowledge_config, client):
     """
-    Run a debate with semi-agentic properties, balancing reliability with agent autonomy.
-    
-    This approach:
-    1. Uses a simulated moderator to guide the process
-    2. Allows agents to select their critique targets 
-    3. Enables agents to decide which critiques to respond to
-    4. Preserves structured phases and reliable execution
-    5. Generates advanced visualizations of idea evolution
-    6. Integrates external knowledge sources when available
+    Set up knowledge integration, the output directory, the moderator and the results dict.
     
     Args:
         problem_statement (str): The topic for debate
         agents (list): List of agent objects
         output_dir (str, optional): Directory to save results
         knowledge_config (dict, optional): Configuration for knowledge integration
+        client (LLMGateway): Gateway used for AI-generated knowledge
+        
+    Returns:
+        tuple: (knowledge_integration or None, output_dir, moderator, results)
     """
-    # Load API key and create client
-    load_dotenv()
-    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-    
     # Initialize knowledge integration if configured
     knowledge_integration = None
     if knowledge_config:
         logging.info(f"Initializing knowledge integration with config: {knowledge_config}")
         knowledge_integration = KnowledgeIntegration(knowledge_config, client)
-        # Attach a list to track knowledge references
-        client.knowledge_references = []
         logging.info("Knowledge integration initialized successfully")
         
         # If no document directory or empty directory, log a message about fallbacks
@@ -606,88 +669,88 @@ def run_semi_agentic_debate(problem_statement, agents, output_dir=None, knowledg
         "knowledge_references": [] # To track external sources used
     }
     
-    # Welcome message from moderator
-    welcome_prompt = f"Introduce the debate on '{problem_statement}'. Explain that we'll be exploring this topic in a structured format with experts from different domains. If relevant, use [REF: {problem_statement}] to gather background information. Keep it concise but welcoming."
-    welcome_message = moderator.generate_message(client, welcome_prompt, "welcome")
-    results["moderator_messages"]["welcome"] = welcome_message
-    
-    print(f"\n🎭 Moderator: {welcome_message}\n")
-    
-    # PHASE 1: Initial Perspectives
-    # Moderator introduces the first phase
-    phase1_intro_prompt = "Introduce the first phase of the debate where each expert will provide their initial perspective. Invite them to share concise viewpoints based on their expertise."
-    phase1_intro = moderator.generate_message(client, phase1_intro_prompt, "phase1_intro")
-    results["moderator_messages"]["phase1_intro"] = phase1_intro
-    
-    print(f"\n🎭 Moderator: {phase1_intro}\n")
-    print("1️⃣ PHASE 1: Initial Perspectives")
+    # Warm the predictable knowledge queries while the welcome is generated
+    if knowledge_integration:
+        knowledge_integration.prefetch(
+            [problem_statement] + [agent_reference_query(agent.name, problem_statement) for agent in agents]
+        )
     
-    # Enhance agent system messages with knowledge retrieval capability
-    reference_instruction = "\n\nYou can request external information by using [REF: your query] in your response. For example: 'Studies have shown [REF: latest research on AI-generated content reliability]'"
+    return knowledge_integration, output_dir, moderator, results
 
+def add_reference_instructions(agents):
+    """Enhance agent system messages with knowledge retrieval capability."""
     for agent in agents:
-        if knowledge_integration:
-            # Use a temporary variable instead of trying to modify the property directly
-            updated_message = agent.system_message + reference_instruction
-            
-            # For autogen agents, we can update the llm_config's system_message
-            if hasattr(agent, 'llm_config') and isinstance(agent.llm_config, dict):
-                agent.llm_config['system_message'] = updated_message
-                logger.info(f"Updated system message for {agent.name} via llm_config")
-            # Alternatively, some agents might have an update_system_message method
-            elif hasattr(agent, 'update_system_message') and callable(getattr(agent, 'update_system_message')):
-                agent.update_system_message(updated_message)
-                logger.info(f"Updated system message for {agent.name} via update method")
-            else:
-                logger.warning(f"Could not update system message for {agent.name}. Knowledge integration instructions not added.")    
-    # Collect perspectives from each agent
-    perspectives = {}
-    
-    for agent in agents:
-        print(f"  💬 {agent.name} is sharing perspective...")
+        # Use a temporary variable instead of trying to modify the property directly
+        updated_message = agent.system_message + REFERENCE_INSTRUCTION
         
-        # Check if the agent has a generate_argument method
-        if hasattr(agent, 'generate_argument') and callable(getattr(agent, 'generate_argument')):
-            try:
-                print(f"  🧠 {agent.name} is generating argument with knowledge integration...")
-                perspective = agent.generate_argument(problem_statement)
-                logger.info(f"{agent.name} generated argument using custom method")
-            except Exception as e:
-                logger.error(f"Error in generate_argument for {agent.name}: {str(e)}")
-                # Fall back to standard method
-                perspective = generate_standard_perspective(agent, client, problem_statement, knowledge_integration)
+        # For autogen agents, we can update the llm_config's system_message
+        if hasattr(agent, 'llm_config') and isinstance(agent.llm_config, dict):
+            agent.llm_config['system_message'] = updated_message
+            logger.info(f"Updated system message for {agent.name} via llm_config")
+        # Alternatively, some agents might have an update_system_message method
+        elif hasattr(agent, 'update_system_message') and callable(getattr(agent, 'update_system_message')):
+            agent.update_system_message(updated_message)
+            logger.info(f"Updated system message for {agent.name} via update method")
         else:
-            # Use standard perspective generation
-            perspective = generate_standard_perspective(agent, client, problem_statement, knowledge_integration)
-        
-        perspectives[agent.name] = perspective
-        print(f"  ✅ {agent.name}: {perspective[:70]}...")
-    
-    # Store Phase 1 results
-    results["phases"]["initial_perspectives"] = perspectives
-    
-    # Moderator summarizes initial perspectives
-    perspectives_text = "\n\n".join([f"{name}: {content}" for name, content in perspectives.items()])
-    phase1_summary_prompt = "Summarize the key points from each expert's initial perspective. Highlight areas of agreement, disagreement, and unique insights. You can reference external research if helpful with [REF: relevant query]. Then, transition to the critique phase where experts will provide constructive feedback on each other's perspectives."
-    phase1_summary = moderator.generate_message(client, phase1_summary_prompt, "phase1_summary", perspectives_text)
-    results["moderator_messages"]["phase1_summary"] = phase1_summary
-    
-    print(f"\n🎭 Moderator: {phase1_summary}\n")
-    
-    # PHASE 2: Critiques - with agent autonomy in choosing whom to critique
-    print("2️⃣ PHASE 2: Critiques")
-    critiques = {}
+            logger.warning(f"Could not update system message for {agent.name}. Knowledge integration instructions not added.")
+
+def generate_agent_perspective(agent, client, problem_statement, knowledge_integration):
+    """
+    Get an agent's initial perspective, preferring its own generate_argument method.
     
-    # Ask agents to decide whom to critique
-    for agent in agents:
-        print(f"  💬 {agent.name} is selecting a perspective to critique...")
-        
-        # First, let the agent decide whom to critique
-        target_selection_response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": agent.system_message},
-                {"role": "user", "content": f"""
+    Returns:
+        str: The perspective with references resolved
+    """
+    # Check if the agent has a generate_argument method
+    if hasattr(agent, 'generate_argument') and callable(getattr(agent, 'generate_argument')):
+        try:
+            print(f"  🧠 {agent.name} is generating argument with knowledge integration...")
+            perspective = agent.generate_argument(problem_statement, knowledge_integration=knowledge_integration)
+            logger.info(f"{agent.name} generated argument using custom method")
+            
+            # Resolve the argument's reference request; the agent has already
+            # retrieved its knowledge, so this is answered from the cache
+            if knowledge_integration:
+                perspective = process_reference_requests(
+                    perspective,
+                    knowledge_integration,
+                    agent_name=agent.name,
+                    phase="initial_perspective"
+                )
+            return perspective
+        except Exception as e:
+            logger.error(f"Error in generate_argument for {agent.name}: {str(e)}")
+            # Fall back to standard method
+            return None
+    return None
+
+def format_perspectives(perspectives):
+    """Format Phase 1 perspectives as context for prompts."""
+    return "\n\n".join([f"{name}: {content}" for name, content in perspectives.items()])
+
+def format_critiques(critiques):
+    """Format Phase 2 critiques as context for prompts."""
+    critiques_text = ""
+    for critic_name, targets in critiques.items():
+        for target_name, critique in targets.items():
+            critiques_text += f"{critic_name} to {target_name}:\n{critique}\n\n"
+    return critiques_text
+
+def format_responses(responses):
+    """Format Phase 3 responses as context for prompts."""
+    return "\n\n".join([f"{name}:\n{data['response']}" for name, data in responses.items()])
+
+def format_contributions(contributions):
+    """Format per-agent common ground or final positions."""
+    return "\n\n".join([f"{name}:\n{content}" for name, content in contributions.items()])
+
+def target_selection_request(agent, problem_statement, perspectives_text):
+    """Build the chat request in which an agent picks whom to critique."""
+    return {
+        "model": "gpt-4o",
+        "messages": [
+            {"role": "system", "content": agent.system_message},
+            {"role": "user", "content": f"""
                 Here are the perspectives on '{problem_statement}':
                 
                 {perspectives_text}
@@ -698,37 +761,31 @@ def run_semi_agentic_debate(problem_statement, agents, output_dir=None, knowledg
                 
                 Format your response as: "I choose to critique [EXPERT NAME] because [brief reason]"
                 """}
-            ],
-            max_tokens=100
-        )
-        
-        target_selection = target_selection_response.choices[0].message.content
-        
-        # Parse the target from the response
-        target_name = None
-        for other_agent in agents:
-            if other_agent.name != agent.name and other_agent.name in target_selection:
-                target_name = other_agent.name
-                break
-        # Fallback if parsing failed
-        if not target_name:
-            # Choose first agent that's not self
-            for other_agent in agents:
-                if other_agent.name != agent.name:
-                    target_name = other_agent.name
-                    break
-        
-        print(f"  📌 {agent.name} chose to critique {target_name}")
-        
-        # Now generate the actual critique
-        critique_response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": agent.system_message},
-                {"role": "user", "content": f"""
+        ],
+        "max_tokens": 100
+    }
+
+def choose_critique_target(target_selection, agent, agents):
+    """Parse the critique target from an agent's selection, falling back to the first other agent."""
+    for other_agent in agents:
+        if other_agent.name != agent.name and other_agent.name in target_selection:
+            return other_agent.name
+    # Fallback if parsing failed: choose first agent that's not self
+    for other_agent in agents:
+        if other_agent.name != agent.name:
+            return other_agent.name
+    return None
+
+def critique_request(agent, problem_statement, target_name, target_perspective):
+    """Build the chat request for an agent's critique of another perspective."""
+    return {
+        "model": "gpt-4o",
+        "messages": [
+            {"role": "system", "content": agent.system_message},
+            {"role": "user", "content": f"""
                 You've decided to critique {target_name}'s perspective on '{problem_statement}':
                 
-                {perspectives[target_name]}
+                {target_perspective}
                 
                 You can reference external information using [REF: your query] to support your critique.
                 Provide a constructive critique based on your expertise. Identify potential limitations,
@@ -736,76 +793,29 @@ def run_semi_agentic_debate(problem_statement, agents, output_dir=None, knowledg
                 
                 Start with addressing {target_name} directly and keep your critique under 150 words.
                 """}
-            ],
-            max_tokens=300
-        )
-        
-        critique = critique_response.choices[0].message.content
-        
-        # Process any reference requests
-        if knowledge_integration:
-            critique = process_reference_requests(
-                critique, 
-                knowledge_integration, 
-                agent_name=agent.name, 
-                phase="critique"
-            )
-            
-            # Ensure there's a knowledge reference
-            if "[REF:" not in critique and "[Reference for" not in critique:
-                critique = ensure_knowledge_in_agent_message(
-                    critique, 
-                    agent.name, 
-                    knowledge_integration, 
-                    "critique", 
-                    problem_statement
-                )
-            
-        if agent.name not in critiques:
-            critiques[agent.name] = {}
-        critiques[agent.name][target_name] = critique
-        print(f"  ✅ {agent.name} critiqued {target_name}")
-    
-    # Store Phase 2 results
-    results["phases"]["critiques"] = critiques
-    
-    # Moderator summarizes critiques
-    critiques_text = ""
-    for critic_name, targets in critiques.items():
-        for target_name, critique in targets.items():
-            critiques_text += f"{critic_name} to {target_name}:\n{critique}\n\n"
-    
-    phase2_summary_prompt = "Summarize the key critiques provided by the experts. Highlight patterns, tensions, and areas where experts challenged each other's thinking. Then, transition to the response phase where experts will address the critiques directed at them."
-    phase2_summary = moderator.generate_message(client, phase2_summary_prompt, "phase2_summary", critiques_text)
-    results["moderator_messages"]["phase2_summary"] = phase2_summary
-    
-    print(f"\n🎭 Moderator: {phase2_summary}\n")
-    
-    # PHASE 3: Responses to Critiques - with agent autonomy in crafting responses
-    print("3️⃣ PHASE 3: Responses to Critiques")
-    responses = {}
-    
-    # Identify which agents received critiques
+        ],
+        "max_tokens": 300
+    }
+
+def group_critiques_by_target(critiques):
+    """Map each critiqued agent to the critiques it received, in critic order."""
     critique_targets = {}
     for critic_name, targets in critiques.items():
         for target_name, critique in targets.items():
             if target_name not in critique_targets:
                 critique_targets[target_name] = []
             critique_targets[target_name].append({"critic": critic_name, "critique": critique})
-    
-    # Have agents respond to their critiques
-    for agent in agents:
-        if agent.name in critique_targets:
-            received_critiques = critique_targets[agent.name]
-            critiques_received_text = "\n\n".join([f"From {c['critic']}:\n{c['critique']}" for c in received_critiques])
-            
-            print(f"  💬 {agent.name} is responding to critiques...")
-            
-            response_message = client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": agent.system_message},
-                    {"role": "user", "content": f"""
+    return critique_targets
+
+def response_request(agent, problem_statement, received_critiques):
+    """Build the chat request for an agent's response to its critiques (or general reflection)."""
+    if received_critiques:
+        critiques_received_text = "\n\n".join([f"From {c['critic']}:\n{c['critique']}" for c in received_critiques])
+        return {
+            "model": "gpt-4o",
+            "messages": [
+                {"role": "system", "content": agent.system_message},
+                {"role": "user", "content": f"""
                     You've received the following critiques of your perspective on '{problem_statement}':
                     
                     {critiques_received_text}
@@ -816,43 +826,15 @@ def run_semi_agentic_debate(problem_statement, agents, output_dir=None, knowledg
                     
                     Keep your response under 150 words.
                     """}
-                ],
-                max_tokens=300
-            )
-            
-            response = response_message.choices[0].message.content
-            
-            # Process any reference requests
-            if knowledge_integration:
-                response = process_reference_requests(
-                    response, 
-                    knowledge_integration, 
-                    agent_name=agent.name, 
-                    phase="response"
-                )
-                
-                # Ensure there's a knowledge reference
-                if "[REF:" not in response and "[Reference for" not in response:
-                    response = ensure_knowledge_in_agent_message(
-                        response, 
-                        agent.name, 
-                        knowledge_integration, 
-                        "response", 
-                        problem_statement
-                    )
-                
-            responses[agent.name] = {
-                "critiques_received": [c["critic"] for c in received_critiques],
-                "response": response
-            }
-            print(f"  ✅ {agent.name} responded to critiques")
-        else:
-            # For agents who didn't receive direct critiques
-            response_message = client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": agent.system_message},
-                    {"role": "user", "content": f"""
+            ],
+            "max_tokens": 300
+        }
+    # For agents who didn't receive direct critiques
+    return {
+        "model": "gpt-4o",
+        "messages": [
+            {"role": "system", "content": agent.system_message},
+            {"role": "user", "content": f"""
                     You haven't received direct critiques of your perspective on '{problem_statement}', 
                     but you've observed the critiques exchanged between others.
                     
@@ -862,55 +844,13 @@ def run_semi_agentic_debate(problem_statement, agents, output_dir=None, knowledg
                     
                     Keep your response under 120 words.
                     """}
-                ],
-                max_tokens=250
-            )
-            
-            response = response_message.choices[0].message.content
-            
-            # Process any reference requests
-            if knowledge_integration:
-                response = process_reference_requests(
-                    response, 
-                    knowledge_integration, 
-                    agent_name=agent.name, 
-                    phase="response"
-                )
-                
-                # Ensure there's a knowledge reference
-                if "[REF:" not in response and "[Reference for" not in response:
-                    response = ensure_knowledge_in_agent_message(
-                        response, 
-                        agent.name, 
-                        knowledge_integration, 
-                        "response", 
-                        problem_statement
-                    )
-                
-            responses[agent.name] = {
-                "critiques_received": [],
-                "response": response
-            }
-            print(f"  ✅ {agent.name} provided general reflections")
-    
-    # Store Phase 3 results
-    results["phases"]["responses"] = responses
-    
-    # Moderator summarizes responses
-    responses_text = "\n\n".join([f"{name}:\n{data['response']}" for name, data in responses.items()])
-    
-    phase3_summary_prompt = "Summarize how the experts have responded to critiques. Highlight how positions have evolved or been refined. Then, transition to the common ground phase where experts will identify areas of consensus and potential for integration."
-    phase3_summary = moderator.generate_message(client, phase3_summary_prompt, "phase3_summary", responses_text)
-    results["moderator_messages"]["phase3_summary"] = phase3_summary
-    
-    print(f"\n🎭 Moderator: {phase3_summary}\n")
-    
-    # PHASE 4: Common Ground - let agents independently identify common ground
-    print("4️⃣ PHASE 4: Finding Common Ground")
-    common_ground = {}
-    
-    # Compile debate context so far
-    debate_context = f"""
+        ],
+        "max_tokens": 250
+    }
+
+def build_debate_context(problem_statement, perspectives_text, critiques_text, responses_text):
+    """Compile the debate so far for the common ground phase."""
+    return f"""
     PROBLEM: '{problem_statement}'
     
     INITIAL PERSPECTIVES:
@@ -922,16 +862,14 @@ def run_semi_agentic_debate(problem_statement, agents, output_dir=None, knowledg
     RESPONSES:
     {responses_text}
     """
-    
-    # Let each agent identify common ground
-    for agent in agents:
-        print(f"  💬 {agent.name} is identifying common ground...")
-        
-        common_ground_message = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": agent.system_message},
-                {"role": "user", "content": f"""
+
+def common_ground_request(agent, debate_context):
+    """Build the chat request in which an agent identifies common ground."""
+    return {
+        "model": "gpt-4o",
+        "messages": [
+            {"role": "system", "content": agent.system_message},
+            {"role": "user", "content": f"""
                 Review the debate so far:
                 
                 {debate_context}
@@ -943,71 +881,17 @@ def run_semi_agentic_debate(problem_statement, agents, output_dir=None, knowledg
                 You can reference external information using [REF: your query] if it helps identify integration opportunities.
                 Structure your response clearly and keep it under 180 words.
                 """}
-            ],
-            max_tokens=350
-        )
-        
-        common_ground_text = common_ground_message.choices[0].message.content
-        
-        # Process any reference requests
-        if knowledge_integration:
-            common_ground_text = process_reference_requests(
-                common_ground_text, 
-                knowledge_integration, 
-                agent_name=agent.name, 
-                phase="common_ground"
-            )
-            
-            # Ensure there's a knowledge reference
-            if "[REF:" not in common_ground_text and "[Reference for" not in common_ground_text:
-                common_ground_text = ensure_knowledge_in_agent_message(
-                    common_ground_text, 
-                    agent.name, 
-                    knowledge_integration, 
-                    "common_ground", 
-                    problem_statement
-                )
-            
-        common_ground[agent.name] = common_ground_text
-        print(f"  ✅ {agent.name} identified common ground")
-    
-    # Store Phase 4 results
-    results["phases"]["common_ground"] = common_ground
-    
-    # Moderator synthesizes common ground
-    common_ground_text = "\n\n".join([f"{name}:\n{content}" for name, content in common_ground.items()])
-    
-    phase4_summary_prompt = "Synthesize the common ground identified by the experts. Highlight key areas of consensus and how different perspectives might complement each other. Then, transition to the final phase where experts will provide their concluding thoughts and recommendations."
-    phase4_summary = moderator.generate_message(client, phase4_summary_prompt, "phase4_summary", common_ground_text)
-    results["moderator_messages"]["phase4_summary"] = phase4_summary
-    
-    print(f"\n🎭 Moderator: {phase4_summary}\n")
-    
-    # PHASE 5: Final Positions - with evolved thinking
-    print("5️⃣ PHASE 5: Final Positions")
-    final_positions = {}
-    
-    # Updated debate context
-    debate_context += f"""
-    COMMON GROUND:
-    {common_ground_text}
-    
-    MODERATOR SYNTHESIS:
-    {phase4_summary}
-    """
-    
-    # Get final positions from each agent
-    for agent in agents:
-        print(f"  💬 {agent.name} is formulating final position...")
-        
-        # Extract initial perspective for reference
-        initial_perspective = perspectives[agent.name]
-        
-        final_position_message = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": agent.system_message},
-                {"role": "user", "content": f"""
+        ],
+        "max_tokens": 350
+    }
+
+def final_position_request(agent, problem_statement, initial_perspective):
+    """Build the chat request for an agent's final position."""
+    return {
+        "model": "gpt-4o",
+        "messages": [
+            {"role": "system", "content": agent.system_message},
+            {"role": "user", "content": f"""
                 The debate on '{problem_statement}' is concluding. 
                 
                 Your initial perspective was:
@@ -1024,52 +908,14 @@ def run_semi_agentic_debate(problem_statement, agents, output_dir=None, knowledg
                 
                 Keep your response under 180 words.
                 """}
-            ],
-            max_tokens=350
-        )
-        
-        final_position = final_position_message.choices[0].message.content
-        
-        # Process any reference requests
-        if knowledge_integration:
-            final_position = process_reference_requests(
-                final_position, 
-                knowledge_integration, 
-                agent_name=agent.name, 
-                phase="final_position"
-            )
-            
-            # Ensure there's a knowledge reference
-            if "[REF:" not in final_position and "[Reference for" not in final_position:
-                final_position = ensure_knowledge_in_agent_message(
-                    final_position, 
-                    agent.name, 
-                    knowledge_integration, 
-                    "final_position", 
-                    problem_statement
-                )
-            
-        final_positions[agent.name] = final_position
-        print(f"  ✅ {agent.name} provided final position")
-    
-    # Store Phase 5 results
-    results["phases"]["final_positions"] = final_positions
-    
-    # Moderator concludes the debate
-    final_positions_text = "\n\n".join([f"{name}:\n{position}" for name, position in final_positions.items()])
-    
-    conclusion_prompt = "Conclude the debate by summarizing the journey from initial perspectives to final positions. Highlight how thinking evolved and identify key insights that emerged. Thank the experts for their contributions."
-    conclusion = moderator.generate_message(client, conclusion_prompt, "conclusion", final_positions_text)
-    results["moderator_messages"]["conclusion"] = conclusion
-    
-    print(f"\n🎭 Moderator: {conclusion}\n")
-    
-    # If knowledge integration was used, store references
-    if knowledge_integration and hasattr(client, 'knowledge_references'):
-        results["knowledge_references"] = client.knowledge_references
-    
-    # FINAL REPORT GENERATION
-    print("6️⃣ Generating Final Report")
+        ],
+        "max_tokens": 350
+    }
+
+def final_report_request(moderator, results, perspectives_text, critiques_text, responses_text,
+                         common_ground_text, final_positions_text):
+    """Build the chat request for the moderator's final report."""
+    problem_statement = results["problem_statement"]
     
     # Let the moderator create the final report
     final_report_prompt = f"""
@@ -1112,99 +958,396 @@ def run_semi_agentic_debate(problem_statement, agents, output_dir=None, knowledg
     - After Common Ground: {results["moderator_messages"]["phase4_summary"]}
     """
     
-    final_report_response = client.chat.completions.create(
-        model="gpt-4o",
-        messages=[
+    return {
+        "model": "gpt-4o",
+        "messages": [
             {"role": "system", "content": moderator.system_message},
             {"role": "user", "content": f"{full_debate_context}\n\n{final_report_prompt}"}
         ],
-        max_tokens=1800
-    )
-    
-    final_report = final_report_response.choices[0].message.content
-    
-    # Process any reference requests in the final report
+        "max_tokens": 1800
+    }
+
+def record_knowledge_results(results, knowledge_integration):
+    """Store the reference ledger and retrieval statistics in the results."""
     if knowledge_integration:
-        final_report = process_reference_requests(
-            final_report, 
-            knowledge_integration, 
-            agent_name="Moderator", 
-            phase="final_report"
-        )
+        # If knowledge integration was used, store references
+        results["knowledge_references"] = knowledge_integration.references
         
-    results["final_report"] = final_report
-    print("  ✅ Final report generated")
-    
-    # Save results
+        # Record cache and index statistics for the run
+        results["knowledge_stats"] = knowledge_integration.get_stats()
+        logger.info(f"Knowledge retrieval stats: {results['knowledge_stats']}")
+
+def write_summary_report(final_report, output_dir):
+    """Write the final report to debate_summary.md and return its path."""
     report_path = os.path.join(output_dir, "debate_summary.md")
     with open(report_path, "w") as f:
         f.write("# Debate Summary\n\n")
         f.write(final_report)
+    return report_path
+
+def write_idea_evolution(phases, output_dir, client, sentiments=None, references=None):
+    """
+    Write the idea evolution visualization to idea_evolution.md.
     
-    # Generate enhanced idea evolution visualization
-    print("  📊 Generating enhanced idea evolution visualizations...")
+    Args:
+        phases (dict): Debate phases from the results
+        output_dir (str): Directory to save results
+        client (LLMGateway): Gateway for sentiment analysis not in sentiments
+        sentiments (dict, optional): Precomputed text -> sentiment scores
+        references (list, optional): This debate's knowledge reference ledger
     
-    # Text-based visualization
+    Returns:
+        tuple: (path, visualization text)
+    """
     visualization = generate_idea_evolution_visualization(
-        perspectives, critiques, responses, common_ground, final_positions, client
+        phases["initial_perspectives"], phases["critiques"], phases["responses"],
+        phases["common_ground"], phases["final_positions"], client, sentiments=sentiments,
+        references=references
     )
     visualization_path = os.path.join(output_dir, "idea_evolution.md")
     with open(visualization_path, "w") as f:
         f.write("# Evolution of Ideas Throughout the Debate\n\n")
         f.write(visualization)
-    results["idea_evolution"] = visualization
+    return visualization_path, visualization
+
+def write_debate_flow(debate_data, output_dir):
+    """
+    Write the Mermaid debate flow diagram to debate_flow.md.
     
-    # Generate Mermaid diagram
-    mermaid_diagram = generate_mermaid_diagram(results)
+    Returns:
+        tuple: (path, Mermaid diagram)
+    """
+    mermaid_diagram = generate_mermaid_diagram(debate_data)
     mermaid_path = os.path.join(output_dir, "debate_flow.md")
     with open(mermaid_path, "w") as f:
         f.write("# Debate Flow Diagram\n\n")
         f.write("```mermaid\n")
         f.write(mermaid_diagram)
         f.write("\n```")
-    results["mermaid_diagram"] = mermaid_diagram
-    
-    # Generate network graph
+    return mermaid_path, mermaid_diagram
+
+def write_influence_network(debate_data, output_dir):
+    """Write the agent influence network, returning its path or None on failure."""
     try:
-        graph_path = generate_idea_graphs(results, output_dir)
+        graph_path = generate_idea_graphs(debate_data, output_dir)
         print(f"  ✅ Generated network graph: {graph_path}")
-        results["graph_path"] = graph_path
+        return graph_path
     except Exception as e:
         print(f"  ⚠️ Could not generate graph: {str(e)}")
-    
-    # If knowledge integration was used, create references summary
-    if knowledge_integration and hasattr(client, 'knowledge_references') and client.knowledge_references:
-        references_path = os.path.join(output_dir, "knowledge_references.md")
-        with open(references_path, "w") as f:
-            f.write("# External Knowledge References\n\n")
-            f.write("The following external sources were referenced during the debate:\n\n")
-            
-            for i, ref in enumerate(client.knowledge_references, 1):
-                source_type = ref.get('source_type', 'Unknown')
-                query = ref.get('query', 'Unknown query')
-                source = ref.get('source', 'Unknown source')
-                agent = ref.get('agent', 'Unknown agent')
-                phase = ref.get('phase', 'Unknown phase')
-                
-                f.write(f"{i}. **Query:** {query}\n")
-                if source_type:
-                    f.write(f"   **Type:** {source_type}\n")
-                f.write(f"   **Source:** {source}\n")
-                f.write(f"   **Used by:** {agent}\n")
-                f.write(f"   **Phase:** {phase}\n\n")
+        return None
+
+def write_references_summary(knowledge_integration, output_dir):
+    """Write the external knowledge references to knowledge_references.md, if any were used."""
+    if not (knowledge_integration and knowledge_integration.references):
+        return None
+    
+    references_path = os.path.join(output_dir, "knowledge_references.md")
+    with open(references_path, "w") as f:
+        f.write("# External Knowledge References\n\n")
+        f.write("The following external sources were referenced during the debate:\n\n")
         
-        print(f"  ✅ Generated external knowledge references summary: {references_path}")
+        for i, ref in enumerate(knowledge_integration.references, 1):
+            source_type = ref.get('source_type', 'Unknown')
+            query = ref.get('query', 'Unknown query')
+            source = ref.get('source', 'Unknown source')
+            agent = ref.get('agent', 'Unknown agent')
+            phase = ref.get('phase', 'Unknown phase')
             
-    # Save full debate data
+            f.write(f"{i}. **Query:** {query}\n")
+            if source_type:
+                f.write(f"   **Type:** {source_type}\n")
+            f.write(f"   **Source:** {source}\n")
+            f.write(f"   **Used by:** {agent}\n")
+            f.write(f"   **Phase:** {phase}\n\n")
+    
+    print(f"  ✅ Generated external knowledge references summary: {references_path}")
+    return references_path
+
+def write_debate_data(results, output_dir):
+    """Dump the full debate results to debate_data.json and return its path."""
     data_path = os.path.join(output_dir, "debate_data.json")
     with open(data_path, "w") as f:
         json.dump(results, f, indent=2)
-    
+    return data_path
+
+def print_saved_outputs(output_dir, report_path, visualization_path, mermaid_path, data_path):
+    """Tell the user where the debate artifacts were written."""
     print(f"\n✅ Debate completed successfully!")
     print(f"Results saved to: {output_dir}")
     print(f"- Full report: {report_path}")
     print(f"- Idea evolution visualization: {visualization_path}")
     print(f"- Debate flow diagram: {mermaid_path}")
     print(f"- Complete debate data: {data_path}")
+
+def save_debate_outputs(results, output_dir, knowledge_integration, client, sentiments=None, llm_stats=None):
+    """
+    Write the report, visualizations, references and debate data for a finished debate.
     
-    return output_dir, results
\ No newline at end of file
+    Args:
+        results (dict): Debate results including the final report
+        output_dir (str): Directory to save results
+        knowledge_integration: Knowledge integration object, or None
+        client (LLMGateway): Gateway used for sentiment analysis
+        sentiments (dict, optional): Precomputed text -> sentiment scores
+        llm_stats (dict, optional): Statistics of the gateway the debate ran on,
+            if not client (e.g. the async engines' AsyncLLMGateway)
+        
+    Returns:
+        tuple: (output_dir, results)
+    """
+    # Save results
+    report_path = write_summary_report(results["final_report"], output_dir)
+    
+    # Generate enhanced idea evolution visualization
+    print("  📊 Generating enhanced idea evolution visualizations...")
+    visualization_path, results["idea_evolution"] = write_idea_evolution(
+        results["phases"], output_dir, client, sentiments=sentiments,
+        references=results["knowledge_references"]
+    )
+    
+    # Generate Mermaid diagram
+    mermaid_path, results["mermaid_diagram"] = write_debate_flow(results, output_dir)
+    
+    # Generate network graph
+    graph_path = write_influence_network(results, output_dir)
+    if graph_path:
+        results["graph_path"] = graph_path
+    
+    # If knowledge integration was used, create references summary
+    write_references_summary(knowledge_integration, output_dir)
+    
+    logger.info(f"LLM gateway stats: {llm_stats if llm_stats is not None else client.get_stats()}")
+    
+    # Save full debate data
+    data_path = write_debate_data(results, output_dir)
+    
+    print_saved_outputs(output_dir, report_path, visualization_path, mermaid_path, data_path)
+    return output_dir, results
+
+def run_semi_agentic_debate(problem_statement, agents, output_dir=None, knowledge_config=None):
+    """
+    Run a debate with semi-agentic properties, balancing reliability with agent autonomy.
+    
+    This approach:
+    1. Uses a simulated moderator to guide the process
+    2. Allows agents to select their critique targets 
+    3. Enables agents to decide which critiques to respond to
+    4. Preserves structured phases and reliable execution
+    5. Generates advanced visualizations of idea evolution
+    6. Integrates external knowledge sources when available
+    
+    Args:
+        problem_statement (str): The topic for debate
+        agents (list): List of agent objects
+        output_dir (str, optional): Directory to save results
+        knowledge_config (dict, optional): Configuration for knowledge integration
+    """
+    # Load API key; every LLM call goes through the shared, rate-limited gateway
+    load_dotenv()
+    client = get_llm_gateway()
+    
+    knowledge_integration, output_dir, moderator, results = start_debate(
+        problem_statement, agents, output_dir, knowledge_config, client
+    )
+    
+    # Agents' own knowledge lookups go through this debate's service
+    with knowledge_service(knowledge_integration):
+        run_debate_phases(problem_statement, agents, client, knowledge_integration, moderator, results)
+    
+    return save_debate_outputs(results, output_dir, knowledge_integration, client)
+
+def run_debate_phases(problem_statement, agents, client, knowledge_integration, moderator, results):
+    """
+    Run the five debate phases and the final report one call at a time, filling in results.
+    
+    Args:
+        problem_statement (str): The topic for debate
+        agents (list): List of agent objects
+        client (LLMGateway): Gateway for every chat completion
+        knowledge_integration: Knowledge integration object, or None
+        moderator (ModeratorAgent): The debate moderator
+        results (dict): Results dict from start_debate()
+    """
+    # Welcome message from moderator
+    welcome_prompt = MODERATOR_PROMPTS["welcome"].format(problem_statement=problem_statement)
+    welcome_message = moderator.generate_message(client, welcome_prompt, "welcome")
+    results["moderator_messages"]["welcome"] = welcome_message
+    
+    print(f"\n🎭 Moderator: {welcome_message}\n")
+    
+    # PHASE 1: Initial Perspectives
+    # Moderator introduces the first phase
+    phase1_intro = moderator.generate_message(client, MODERATOR_PROMPTS["phase1_intro"], "phase1_intro")
+    results["moderator_messages"]["phase1_intro"] = phase1_intro
+    
+    print(f"\n🎭 Moderator: {phase1_intro}\n")
+    print("1️⃣ PHASE 1: Initial Perspectives")
+    
+    if knowledge_integration:
+        add_reference_instructions(agents)
+    
+    # Collect perspectives from each agent
+    perspectives = {}
+    
+    for agent in agents:
+        print(f"  💬 {agent.name} is sharing perspective...")
+        perspective = generate_agent_perspective(agent, client, problem_statement, knowledge_integration)
+        if perspective is None:
+            # Use standard perspective generation
+            perspective = generate_standard_perspective(agent, client, problem_statement, knowledge_integration)
+        
+        perspectives[agent.name] = perspective
+        print(f"  ✅ {agent.name}: {perspective[:70]}...")
+    
+    # Store Phase 1 results
+    results["phases"]["initial_perspectives"] = perspectives
+    
+    # Moderator summarizes initial perspectives
+    perspectives_text = format_perspectives(perspectives)
+    phase1_summary = moderator.generate_message(client, MODERATOR_PROMPTS["phase1_summary"], "phase1_summary", perspectives_text)
+    results["moderator_messages"]["phase1_summary"] = phase1_summary
+    
+    print(f"\n🎭 Moderator: {phase1_summary}\n")
+    
+    # PHASE 2: Critiques - with agent autonomy in choosing whom to critique
+    print("2️⃣ PHASE 2: Critiques")
+    critiques = {}
+    
+    # Ask agents to decide whom to critique
+    for agent in agents:
+        print(f"  💬 {agent.name} is selecting a perspective to critique...")
+        
+        # First, let the agent decide whom to critique
+        target_selection = client.chat(**target_selection_request(agent, problem_statement, perspectives_text))
+        target_name = choose_critique_target(target_selection, agent, agents)
+        
+        print(f"  📌 {agent.name} chose to critique {target_name}")
+        
+        # Now generate the actual critique
+        critique = client.chat(**critique_request(agent, problem_statement, target_name, perspectives[target_name]))
+        critique = integrate_knowledge(critique, agent.name, knowledge_integration, "critique", problem_statement)
+        
+        if agent.name not in critiques:
+            critiques[agent.name] = {}
+        critiques[agent.name][target_name] = critique
+        print(f"  ✅ {agent.name} critiqued {target_name}")
+    
+    # Store Phase 2 results
+    results["phases"]["critiques"] = critiques
+    
+    # Moderator summarizes critiques
+    critiques_text = format_critiques(critiques)
+    phase2_summary = moderator.generate_message(client, MODERATOR_PROMPTS["phase2_summary"], "phase2_summary", critiques_text)
+    results["moderator_messages"]["phase2_summary"] = phase2_summary
+    
+    print(f"\n🎭 Moderator: {phase2_summary}\n")
+    
+    # PHASE 3: Responses to Critiques - with agent autonomy in crafting responses
+    print("3️⃣ PHASE 3: Responses to Critiques")
+    responses = {}
+    
+    # Identify which agents received critiques
+    critique_targets = group_critiques_by_target(critiques)
+    
+    # Have agents respond to their critiques
+    for agent in agents:
+        received_critiques = critique_targets.get(agent.name, [])
+        if received_critiques:
+            print(f"  💬 {agent.name} is responding to critiques...")
+        
+        response = client.chat(**response_request(agent, problem_statement, received_critiques))
+        response = integrate_knowledge(response, agent.name, knowledge_integration, "response", problem_statement)
+        
+        responses[agent.name] = {
+            "critiques_received": [c["critic"] for c in received_critiques],
+            "response": response
+        }
+        if received_critiques:
+            print(f"  ✅ {agent.name} responded to critiques")
+        else:
+            print(f"  ✅ {agent.name} provided general reflections")
+    
+    # Store Phase 3 results
+    results["phases"]["responses"] = responses
+    
+    # Moderator summarizes responses
+    responses_text = format_responses(responses)
+    phase3_summary = moderator.generate_message(client, MODERATOR_PROMPTS["phase3_summary"], "phase3_summary", responses_text)
+    results["moderator_messages"]["phase3_summary"] = phase3_summary
+    
+    print(f"\n🎭 Moderator: {phase3_summary}\n")
+    
+    # PHASE 4: Common Ground - let agents independently identify common ground
+    print("4️⃣ PHASE 4: Finding Common Ground")
+    common_ground = {}
+    
+    # Compile debate context so far
+    debate_context = build_debate_context(problem_statement, perspectives_text, critiques_text, responses_text)
+    
+    # Let each agent identify common ground
+    for agent in agents:
+        print(f"  💬 {agent.name} is identifying common ground...")
+        
+        common_ground_text = client.chat(**common_ground_request(agent, debate_context))
+        common_ground_text = integrate_knowledge(common_ground_text, agent.name, knowledge_integration,
+                                                 "common_ground", problem_statement)
+        
+        common_ground[agent.name] = common_ground_text
+        print(f"  ✅ {agent.name} identified common ground")
+    
+    # Store Phase 4 results
+    results["phases"]["common_ground"] = common_ground
+    
+    # Moderator synthesizes common ground
+    common_ground_text = format_contributions(common_ground)
+    phase4_summary = moderator.generate_message(client, MODERATOR_PROMPTS["phase4_summary"], "phase4_summary", common_ground_text)
+    results["moderator_messages"]["phase4_summary"] = phase4_summary
+    
+    print(f"\n🎭 Moderator: {phase4_summary}\n")
+    
+    # PHASE 5: Final Positions - with evolved thinking
+    print("5️⃣ PHASE 5: Final Positions")
+    final_positions = {}
+    
+    # Get final positions from each agent
+    for agent in agents:
+        print(f"  💬 {agent.name} is formulating final position...")
+        
+        final_position = client.chat(**final_position_request(agent, problem_statement, perspectives[agent.name]))
+        final_position = integrate_knowledge(final_position, agent.name, knowledge_integration,
+                                             "final_position", problem_statement)
+        
+        final_positions[agent.name] = final_position
+        print(f"  ✅ {agent.name} provided final position")
+    
+    # Store Phase 5 results
+    results["phases"]["final_positions"] = final_positions
+    
+    # Moderator concludes the debate
+    final_positions_text = format_contributions(final_positions)
+    conclusion = moderator.generate_message(client, MODERATOR_PROMPTS["conclusion"], "conclusion", final_positions_text)
+    results["moderator_messages"]["conclusion"] = conclusion
+    
+    print(f"\n🎭 Moderator: {conclusion}\n")
+    
+    record_knowledge_results(results, knowledge_integration)
+    
+    # FINAL REPORT GENERATION
+    print("6️⃣ Generating Final Report")
+    
+    final_report = client.chat(**final_report_request(
+        moderator, results, perspectives_text, critiques_text, responses_text,
+        common_ground_text, final_positions_text
+    ))
+    
+    # Process any reference requests in the final report
+    if knowledge_integration:
+        final_report = process_reference_requests(
+            final_report, 
+            knowledge_integration, 
+            agent_name="Moderator", 
+            phase="final_report"
+        )
+        
+    results["final_report"] = final_report
+    print("  ✅ Final report generated")
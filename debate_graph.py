@@ -0,0 +1,512 @@
+"""
+Dependency-graph debate scheduler.
+
+The phased engines (debate.py, async_debate.py) wait for every agent and the
+moderator summary before the next phase starts, although most of those
+dependencies don't exist: an agent's Phase 3 response only needs the
+critiques aimed at it, a final position only needs the agent's own initial
+perspective, and moderator summaries feed nothing but the final report.
+
+Here the debate is a DAG of tasks - agent calls, reference resolution,
+moderator messages, sentiment analysis and output artifacts - and TaskGraph
+starts each one as soon as its inputs are ready, so only true dependencies
+sit on the critical path. Prompts, parsing and artifact writing are shared
+with debate.py, and the results match the phased engines.
+"""
+
+import time
+import asyncio
+import logging
+import contextvars
+
+from dotenv import load_dotenv
+
+from async_debate import DEBATE_CONCURRENCY, analyze_sentiment_async, initial_perspective
+from debate import (
+    MODERATOR_PROMPTS, add_reference_instructions, build_debate_context, choose_critique_target,
+    common_ground_request, critique_request, final_position_request, final_report_request,
+    format_contributions, format_critiques, format_perspectives, format_responses, integrate_knowledge,
+    print_saved_outputs, response_request, start_debate, target_selection_request, write_debate_data,
+    write_debate_flow, write_idea_evolution, write_influence_network, write_references_summary,
+    write_summary_report
+)
+from knowledge_integration import knowledge_service, process_reference_requests
+from llm_gateway import get_async_llm_gateway, get_llm_gateway
+
+logger = logging.getLogger("DebateGraph")
+
+MODERATOR_MESSAGES = ["welcome", "phase1_intro", "phase1_summary", "phase2_summary", "phase3_summary",
+                      "phase4_summary", "conclusion"]
+
+# Name of the task whose function is running, so TaskGraph.result() can
+# record data-dependent edges
+_current_task = contextvars.ContextVar("current_task", default=None)
+
+class TaskGraph:
+    """
+    Runs named async (or blocking) tasks as soon as the tasks they depend on finish.
+
+    Each task function is called with a dict of its dependencies' results.
+    Tasks whose inputs are only known at run time can await further tasks
+    with result(); those edges are recorded like declared ones.
+    """
+
+    def __init__(self):
+        self.tasks = {}
+        self.timings = {}
+        self._futures = {}
+        self._start = None
+
+    def add(self, name, func, deps=(), blocking=False):
+        """
+        Add a task to the graph.
+
+        Args:
+            name (str): Unique task name
+            func (callable): Takes a dict of dependency results; a coroutine
+                function, or a plain function if blocking
+            deps (iterable): Names of the tasks whose results func needs
+            blocking (bool): Run func in a worker thread
+        """
+        if name in self.tasks:
+            raise ValueError(f"Duplicate task: {name}")
+        self.tasks[name] = {"func": func, "deps": list(deps), "blocking": blocking}
+
+    def _check(self):
+        """Raise ValueError if a dependency is missing or the graph has a cycle."""
+        for name, task in self.tasks.items():
+            for dep in task["deps"]:
+                if dep not in self.tasks:
+                    raise ValueError(f"Task {name} depends on unknown task {dep}")
+
+        # Kahn's algorithm: a cycle leaves tasks that never become ready
+        remaining = {name: len(task["deps"]) for name, task in self.tasks.items()}
+        dependents = {name: [] for name in self.tasks}
+        for name, task in self.tasks.items():
+            for dep in task["deps"]:
+                dependents[dep].append(name)
+        ready = [name for name, count in remaining.items() if count == 0]
+        while ready:
+            for dependent in dependents[ready.pop()]:
+                remaining[dependent] -= 1
+                if remaining[dependent] == 0:
+                    ready.append(dependent)
+        cyclic = [name for name, count in remaining.items() if count > 0]
+        if cyclic:
+            raise ValueError(f"Dependency cycle among tasks: {', '.join(sorted(cyclic))}")
+
+    async def result(self, name):
+        """Wait for a task that isn't a declared dependency and return its result."""
+        current = _current_task.get()
+        if current is not None:
+            self.timings[current]["waited"].append(name)
+        return await self._futures[name]
+
+    async def _run_task(self, name):
+        task = self.tasks[name]
+        inputs = {dep: await self._futures[dep] for dep in task["deps"]}
+
+        _current_task.set(name)
+        timing = {"start": time.perf_counter() - self._start, "waited": []}
+        self.timings[name] = timing
+        if task["blocking"]:
+            result = await asyncio.to_thread(task["func"], inputs)
+        else:
+            result = await task["func"](inputs)
+        timing["end"] = time.perf_counter() - self._start
+        return result
+
+    async def run(self):
+        """
+        Run every task, cancelling the rest if one fails.
+
+        Returns:
+            dict: Task name -> result
+        """
+        self._check()
+        self._start = time.perf_counter()
+        self.timings = {}
+        self._futures = {name: asyncio.ensure_future(self._run_task(name)) for name in self.tasks}
+        try:
+            await asyncio.gather(*self._futures.values())
+        except BaseException:
+            for future in self._futures.values():
+                future.cancel()
+            await asyncio.gather(*self._futures.values(), return_exceptions=True)
+            raise
+        return {name: future.result() for name, future in self._futures.items()}
+
+    def critical_path(self):
+        """
+        Return the chain of tasks that determined the total run time.
+
+        Returns:
+            list: (task name, seconds) pairs from the first task to the last
+        """
+        if not self.timings:
+            return []
+        name = max(self.timings, key=lambda n: self.timings[n]["end"])
+        path = []
+        while name is not None:
+            timing = self.timings[name]
+            path.append((name, timing["end"] - timing["start"]))
+            inputs = self.tasks[name]["deps"] + timing["waited"]
+            name = max(inputs, key=lambda n: self.timings[n]["end"]) if inputs else None
+        return path[::-1]
+
+def _agent_call(graph, gateway, name, request_for, deps, agent, knowledge_integration, phase, problem_statement):
+    """
+    Add an agent's chat call and its reference resolution as two tasks.
+
+    The call is "<name>:draft"; "<name>" holds the message with references resolved.
+    """
+    async def call(inputs):
+        return await gateway.chat(**request_for(inputs))
+
+    def resolve(inputs):
+        return integrate_knowledge(inputs[f"{name}:draft"], agent.name, knowledge_integration,
+                                   phase, problem_statement)
+
+    graph.add(f"{name}:draft", call, deps)
+    graph.add(name, resolve, [f"{name}:draft"], blocking=True)
+
+def _moderator_message(graph, gateway, moderator, phase_name, context_for=None, deps=()):
+    """Add a moderator message as a chat task plus a reference resolution task."""
+    prompt = MODERATOR_PROMPTS[phase_name]
+    if phase_name == "welcome":
+        prompt = prompt.format(problem_statement=moderator.problem_statement)
+
+    async def call(inputs):
+        return await gateway.chat(**moderator.build_request(prompt, context_for(inputs) if context_for else None))
+
+    def resolve(inputs):
+        message = moderator.finish_message(inputs[f"{phase_name}:draft"], phase_name)
+        print(f"\n🎭 Moderator: {message}\n")
+        return message
+
+    graph.add(f"{phase_name}:draft", call, deps)
+    graph.add(phase_name, resolve, [f"{phase_name}:draft"], blocking=True)
+
+def build_debate_graph(problem_statement, agents, client, gateway, knowledge_integration, moderator,
+                       results, output_dir):
+    """
+    Express a debate as a TaskGraph.
+
+    Args:
+        problem_statement (str): The topic for debate
+        agents (list): List of agent objects
+        client (LLMGateway): Synchronous gateway, used by agents' own generate_argument()
+        gateway (AsyncLLMGateway): Gateway for the graph's chat calls
+        knowledge_integration: Knowledge integration object, or None
+        moderator (ModeratorAgent): The debate moderator
+        results (dict): Results dict from start_debate(), filled in by the "debate_data" task
+        output_dir (str): Directory to save results
+
+    Returns:
+        TaskGraph: Graph whose "debate_data" task completes the results and writes them out
+    """
+    graph = TaskGraph()
+    names = [agent.name for agent in agents]
+
+    def phase_tasks(prefix):
+        return [f"{prefix}:{name}" for name in names]
+
+    def collect(inputs, prefix):
+        return {name: inputs[f"{prefix}:{name}"] for name in names}
+
+    perspective_tasks = phase_tasks("perspective")
+    selection_tasks = phase_tasks("selection")
+    critique_tasks = phase_tasks("critique")
+    response_tasks = phase_tasks("response")
+    common_ground_tasks = phase_tasks("common_ground")
+    final_position_tasks = phase_tasks("final_position")
+
+    def perspectives_of(inputs):
+        return collect(inputs, "perspective")
+
+    def critiques_of(inputs):
+        # Critiques are stored as critic -> {target: critique}
+        return {name: dict([inputs[f"critique:{name}"]]) for name in names}
+
+    def responses_of(inputs):
+        return collect(inputs, "response")
+
+    # Opening
+    _moderator_message(graph, gateway, moderator, "welcome")
+    _moderator_message(graph, gateway, moderator, "phase1_intro")
+
+    # Phase 1: initial perspectives need nothing but the problem statement
+    if knowledge_integration:
+        add_reference_instructions(agents)
+
+    for agent in agents:
+        async def perspective(inputs, agent=agent):
+            return await initial_perspective(gateway, client, agent, problem_statement, knowledge_integration)
+        graph.add(f"perspective:{agent.name}", perspective)
+
+    _moderator_message(graph, gateway, moderator, "phase1_summary",
+                       lambda inputs: format_perspectives(perspectives_of(inputs)), perspective_tasks)
+
+    # Phase 2: choosing a target needs every perspective; the critique itself
+    # follows as soon as that agent has chosen
+    for agent in agents:
+        async def select(inputs, agent=agent):
+            perspectives_text = format_perspectives(perspectives_of(inputs))
+            target_selection = await gateway.chat(**target_selection_request(agent, problem_statement, perspectives_text))
+            target_name = choose_critique_target(target_selection, agent, agents)
+            print(f"  📌 {agent.name} chose to critique {target_name}")
+            return target_name
+        graph.add(f"selection:{agent.name}", select, perspective_tasks)
+
+        def critique_for(inputs, agent=agent):
+            target_name = inputs[f"selection:{agent.name}"]
+            return critique_request(agent, problem_statement, target_name, inputs[f"perspective:{target_name}"])
+        _agent_call(graph, gateway, f"critique_text:{agent.name}", critique_for,
+                    [f"selection:{agent.name}"] + perspective_tasks, agent, knowledge_integration,
+                    "critique", problem_statement)
+
+        def critique(inputs, agent=agent):
+            print(f"  ✅ {agent.name} critiqued {inputs[f'selection:{agent.name}']}")
+            return inputs[f"selection:{agent.name}"], inputs[f"critique_text:{agent.name}"]
+        graph.add(f"critique:{agent.name}", critique,
+                  [f"selection:{agent.name}", f"critique_text:{agent.name}"], blocking=True)
+
+    _moderator_message(graph, gateway, moderator, "phase2_summary",
+                       lambda inputs: format_critiques(critiques_of(inputs)), critique_tasks)
+
+    # Phase 3: once every agent has chosen its target, each response waits
+    # only for the critiques aimed at that agent
+    async def received_critiques(agent_name, inputs):
+        critics = [name for name in names if inputs[f"selection:{name}"] == agent_name]
+        received = []
+        for critic in critics:
+            _, critique_text = await graph.result(f"critique:{critic}")
+            received.append({"critic": critic, "critique": critique_text})
+        return received
+
+    for agent in agents:
+        async def response_draft(inputs, agent=agent):
+            received = await received_critiques(agent.name, inputs)
+            if received:
+                print(f"  💬 {agent.name} is responding to critiques...")
+            return received, await gateway.chat(**response_request(agent, problem_statement, received))
+        graph.add(f"response:{agent.name}:draft", response_draft, selection_tasks)
+
+        def response(inputs, agent=agent):
+            received, message = inputs[f"response:{agent.name}:draft"]
+            message = integrate_knowledge(message, agent.name, knowledge_integration, "response", problem_statement)
+            if received:
+                print(f"  ✅ {agent.name} responded to critiques")
+            else:
+                print(f"  ✅ {agent.name} provided general reflections")
+            return {"critiques_received": [c["critic"] for c in received], "response": message}
+        graph.add(f"response:{agent.name}", response, [f"response:{agent.name}:draft"], blocking=True)
+
+    _moderator_message(graph, gateway, moderator, "phase3_summary",
+                       lambda inputs: format_responses(responses_of(inputs)), response_tasks)
+
+    # Phase 4: common ground reviews the whole debate so far
+    def debate_context_of(inputs):
+        return build_debate_context(problem_statement, format_perspectives(perspectives_of(inputs)),
+                                    format_critiques(critiques_of(inputs)), format_responses(responses_of(inputs)))
+
+    for agent in agents:
+        _agent_call(graph, gateway, f"common_ground:{agent.name}",
+                    lambda inputs, agent=agent: common_ground_request(agent, debate_context_of(inputs)),
+                    perspective_tasks + critique_tasks + response_tasks, agent, knowledge_integration,
+                    "common_ground", problem_statement)
+
+    _moderator_message(graph, gateway, moderator, "phase4_summary",
+                       lambda inputs: format_contributions(collect(inputs, "common_ground")), common_ground_tasks)
+
+    # Phase 5: a final position only restates the agent's own initial perspective
+    for agent in agents:
+        _agent_call(graph, gateway, f"final_position:{agent.name}",
+                    lambda inputs, agent=agent: final_position_request(agent, problem_statement,
+                                                                       inputs[f"perspective:{agent.name}"]),
+                    [f"perspective:{agent.name}"], agent, knowledge_integration, "final_position", problem_statement)
+
+    _moderator_message(graph, gateway, moderator, "conclusion",
+                       lambda inputs: format_contributions(collect(inputs, "final_position")), final_position_tasks)
+
+    debate_tasks = (perspective_tasks + critique_tasks + response_tasks + common_ground_tasks + final_position_tasks)
+    summary_tasks = ["phase1_summary", "phase2_summary", "phase3_summary", "phase4_summary"]
+
+    def phases_of(inputs):
+        return {
+            "initial_perspectives": perspectives_of(inputs),
+            "critiques": critiques_of(inputs),
+            "responses": responses_of(inputs),
+            "common_ground": collect(inputs, "common_ground"),
+            "final_positions": collect(inputs, "final_position")
+        }
+
+    # Retrieval statistics are taken before the final report resolves its
+    # references, as in the phased engines
+    def knowledge_stats(inputs):
+        return knowledge_integration.get_stats() if knowledge_integration else None
+    graph.add("knowledge_stats", knowledge_stats, debate_tasks + MODERATOR_MESSAGES, blocking=True)
+
+    # Final report: uses the phase 1-4 summaries but not the conclusion
+    async def final_report_draft(inputs):
+        phases = phases_of(inputs)
+        return await gateway.chat(**final_report_request(
+            moderator,
+            {"problem_statement": problem_statement,
+             "moderator_messages": {name: inputs[name] for name in summary_tasks}},
+            format_perspectives(phases["initial_perspectives"]), format_critiques(phases["critiques"]),
+            format_responses(phases["responses"]), format_contributions(phases["common_ground"]),
+            format_contributions(phases["final_positions"])
+        ))
+    graph.add("final_report:draft", final_report_draft, debate_tasks + summary_tasks)
+
+    def final_report(inputs):
+        report = inputs["final_report:draft"]
+        if knowledge_integration:
+            report = process_reference_requests(report, knowledge_integration,
+                                                agent_name="Moderator", phase="final_report")
+        print("  ✅ Final report generated")
+        return report
+    graph.add("final_report", final_report, ["final_report:draft", "knowledge_stats"], blocking=True)
+
+    # Sentiment of each text shown in the idea evolution report, analyzed as
+    # soon as the text exists; identical texts share one call
+    sentiment_calls = {}
+
+    def sentiment_of(text):
+        if text not in sentiment_calls:
+            sentiment_calls[text] = asyncio.ensure_future(analyze_sentiment_async(gateway, text))
+        return sentiment_calls[text]
+
+    sentiment_tasks = []
+    for name in names:
+        texts = {
+            "perspective": lambda inputs, name=name: inputs[f"perspective:{name}"],
+            "response": lambda inputs, name=name: inputs[f"response:{name}"]["response"],
+            "common_ground": lambda inputs, name=name: inputs[f"common_ground:{name}"],
+            "final_position": lambda inputs, name=name: inputs[f"final_position:{name}"]
+        }
+        for prefix, text_of in texts.items():
+            async def score(inputs, text_of=text_of):
+                text = text_of(inputs)
+                return {text: await sentiment_of(text)}
+            graph.add(f"sentiment:{prefix}:{name}", score, [f"{prefix}:{name}"])
+            sentiment_tasks.append(f"sentiment:{prefix}:{name}")
+
+        # All critiques aimed at the agent, concatenated
+        async def critiques_score(inputs, name=name):
+            critique_text = ""
+            for critic in names:
+                if inputs[f"selection:{critic}"] == name:
+                    _, text = await graph.result(f"critique:{critic}")
+                    critique_text += text + " "
+            return {critique_text: await sentiment_of(critique_text)} if critique_text else {}
+        graph.add(f"sentiment:critiques:{name}", critiques_score, selection_tasks)
+        sentiment_tasks.append(f"sentiment:critiques:{name}")
+
+    # Artifacts, each written once its own inputs exist
+    def summary_report(inputs):
+        return write_summary_report(inputs["final_report"], output_dir)
+    graph.add("artifact:summary", summary_report, ["final_report"], blocking=True)
+
+    def debate_flow(inputs):
+        return write_debate_flow({"agents": names, "phases": {
+            "initial_perspectives": perspectives_of(inputs),
+            "final_positions": collect(inputs, "final_position")
+        }}, output_dir)
+    graph.add("artifact:debate_flow", debate_flow, perspective_tasks + final_position_tasks, blocking=True)
+
+    def influence_network(inputs):
+        return write_influence_network({"agents": names, "phases": {"critiques": critiques_of(inputs)}}, output_dir)
+    graph.add("artifact:influence_network", influence_network, critique_tasks, blocking=True)
+
+    # The idea evolution report lists the reference ledger, which is complete
+    # once the final report's references are resolved
+    def idea_evolution(inputs):
+        print("  📊 Generating enhanced idea evolution visualizations...")
+        sentiments = {}
+        for task in sentiment_tasks:
+            sentiments.update(inputs[task])
+        return write_idea_evolution(phases_of(inputs), output_dir, client, sentiments=sentiments,
+                                    references=knowledge_integration.references if knowledge_integration else None)
+    graph.add("artifact:idea_evolution", idea_evolution, debate_tasks + sentiment_tasks + ["final_report"],
+              blocking=True)
+
+    def references(inputs):
+        return write_references_summary(knowledge_integration, output_dir)
+    graph.add("artifact:references", references, ["final_report"], blocking=True)
+
+    # Debate data: assembled in the phased engines' key order and written last
+    def debate_data(inputs):
+        for name in MODERATOR_MESSAGES:
+            results["moderator_messages"][name] = inputs[name]
+        results["phases"].update(phases_of(inputs))
+        if knowledge_integration:
+            results["knowledge_references"] = knowledge_integration.references
+            results["knowledge_stats"] = inputs["knowledge_stats"]
+        results["final_report"] = inputs["final_report"]
+        _, results["idea_evolution"] = inputs["artifact:idea_evolution"]
+        _, results["mermaid_diagram"] = inputs["artifact:debate_flow"]
+        if inputs["artifact:influence_network"]:
+            results["graph_path"] = inputs["artifact:influence_network"]
+        return write_debate_data(results, output_dir)
+    graph.add("debate_data", debate_data, debate_tasks + MODERATOR_MESSAGES + [
+        "knowledge_stats", "final_report", "artifact:summary", "artifact:idea_evolution",
+        "artifact:debate_flow", "artifact:influence_network", "artifact:references"
+    ], blocking=True)
+
+    return graph
+
+async def _run_graph(problem_statement, agents, client, knowledge_integration, moderator, results, output_dir,
+                     max_concurrency):
+    """
+    Build and run the debate graph, logging its critical path.
+
+    Returns:
+        tuple: (task name -> result, statistics of the async gateway)
+    """
+    gateway = get_async_llm_gateway(max_concurrency)
+    try:
+        graph = build_debate_graph(problem_statement, agents, client, gateway, knowledge_integration,
+                                   moderator, results, output_dir)
+        outputs = await graph.run()
+
+        path = graph.critical_path()
+        total = max(timing["end"] for timing in graph.timings.values())
+        logger.info(f"Debate graph ran {len(graph.tasks)} tasks in {total:.2f}s; critical path: "
+                    + " -> ".join(f"{name} ({seconds:.2f}s)" for name, seconds in path))
+        return outputs, gateway.get_stats()
+    finally:
+        await gateway.aclose()
+
+def run_graph_debate(problem_statement, agents, output_dir=None, knowledge_config=None,
+                     max_concurrency=DEBATE_CONCURRENCY):
+    """
+    Run the semi-agentic debate as a dependency graph, without per-phase barriers.
+
+    Args:
+        problem_statement (str): The topic for debate
+        agents (list): List of agent objects
+        output_dir (str, optional): Directory to save results
+        knowledge_config (dict, optional): Configuration for knowledge integration
+        max_concurrency (int): LLM calls allowed in flight at once
+
+    Returns:
+        tuple: (output_dir, results), as from run_semi_agentic_debate()
+    """
+    load_dotenv()
+    client = get_llm_gateway()
+
+    knowledge_integration, output_dir, moderator, results = start_debate(
+        problem_statement, agents, output_dir, knowledge_config, client
+    )
+
+    with knowledge_service(knowledge_integration):
+        outputs, llm_stats = asyncio.run(_run_graph(
+            problem_statement, agents, client, knowledge_integration, moderator, results, output_dir, max_concurrency
+        ))
+    logger.info(f"LLM gateway stats: {llm_stats}")
+
+    print_saved_outputs(output_dir, outputs["artifact:summary"], outputs["artifact:idea_evolution"][0],
+                        outputs["artifact:debate_flow"][0], outputs["debate_data"])
+    return output_dir, results
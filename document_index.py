@@ -0,0 +1,486 @@
+"""
+Persistent inverted index over the local document corpus.
+
+Documents are split into overlapping passages at ingestion time and every
+term is mapped to the passages that contain it, so a knowledge lookup can be
+answered by ranking passages with BM25 instead of re-reading and
+re-extracting every file in the document directory. Documents that are
+near-duplicates of one already indexed are recorded but contribute no
+passages, so each piece of content is indexed and returned once.
+
+The index stores passage spans, each document's distinct terms (so removing
+a document only touches its own postings) and its (size, mtime, sha256)
+fingerprint, not the document text. Text is re-read when a passage is
+displayed (PDF and DOCX text through the extracted-text cache) and the
+most recently used documents are kept in memory.
+"""
+
+import os
+import json
+import math
+import re
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+from near_duplicates import MinHasher, NearDuplicateIndex
+from text_cache import file_content_hash
+
+logger = logging.getLogger("DocumentIndex")
+
+INDEX_VERSION = 6
+
+TOKEN_PATTERN = re.compile(r'\b\w+\b')
+
+# Terms that carry no retrieval signal; kept out of postings and queries
+STOP_WORDS = frozenset([
+    'a', 'an', 'the', 'and', 'or', 'but', 'if', 'of', 'at', 'by', 'for', 'with',
+    'about', 'into', 'through', 'to', 'from', 'in', 'out', 'on', 'off', 'over',
+    'under', 'is', 'are', 'was', 'were', 'be', 'been', 'being', 'have', 'has',
+    'had', 'do', 'does', 'did', 'it', 'its', 'this', 'that', 'these', 'those',
+    'as', 'so', 'than', 'too', 'very', 'can', 'will', 'just', 'should', 'how',
+    'what', 'which', 'who', 'whom', 'we', 'our', 'you', 'your', 'they', 'their'
+])
+
+def tokenize(text):
+    """
+    Split text into index terms with their character offsets.
+
+    Args:
+        text (str): Text to tokenize
+
+    Returns:
+        list: (term, offset) tuples, lowercased and without stop words
+    """
+    tokens = []
+    for match in TOKEN_PATTERN.finditer(text):
+        term = match.group(0).lower()
+        if len(term) > 1 and term not in STOP_WORDS:
+            tokens.append((term, match.start()))
+    return tokens
+
+def split_passages(text, passage_size=120, overlap=30):
+    """
+    Split text into overlapping passages of roughly passage_size words.
+
+    Args:
+        text (str): Document text
+        passage_size (int): Words per passage
+        overlap (int): Words shared by consecutive passages
+
+    Returns:
+        list: (start, end) character spans of the passages
+    """
+    words = [(m.start(), m.end()) for m in TOKEN_PATTERN.finditer(text)]
+    if not words:
+        return []
+
+    step = max(1, passage_size - overlap)
+    spans = []
+    for first in range(0, len(words), step):
+        last = min(first + passage_size, len(words)) - 1
+        spans.append((words[first][0], words[last][1]))
+        if last == len(words) - 1:
+            break
+    return spans
+
+def load_document_text(path):
+    """Re-extract a document's text, using the extracted-text cache for PDF and DOCX files."""
+    # Import at function level to avoid circular imports
+    from knowledge_integration import extract_text
+    return extract_text(path)
+
+class DocumentIndex:
+    """Inverted index (term -> passage postings) with BM25 passage ranking."""
+
+    def __init__(self, k1=1.5, b=0.75, min_match_ratio=0.5, passage_size=120, passage_overlap=30,
+                 dedup_threshold=0.9, text_loader=None, max_cached_texts=32):
+        """
+        Initialize an empty index.
+
+        Args:
+            k1 (float): BM25 term-frequency saturation parameter
+            b (float): BM25 passage-length normalization parameter
+            min_match_ratio (float): Fraction of distinct query terms a passage
+                must contain to be returned
+            passage_size (int): Words per passage
+            passage_overlap (int): Words shared by consecutive passages
+            dedup_threshold (float): Estimated Jaccard similarity above which a
+                document is collapsed into an indexed near-duplicate; 0 disables
+            text_loader (callable, optional): path -> document text, used to
+                re-read a document when one of its passages is displayed;
+                defaults to load_document_text()
+            max_cached_texts (int): Document texts kept in memory
+        """
+        self.k1 = k1
+        self.b = b
+        self.min_match_ratio = min_match_ratio
+        self.passage_size = passage_size
+        self.passage_overlap = passage_overlap
+        self.dedup_threshold = dedup_threshold
+        self.text_loader = text_loader or load_document_text
+        self.max_cached_texts = max_cached_texts
+        self.documents = {}  # doc_id -> document metadata and fingerprint
+        self.passages = {}   # passage_id -> {doc_id, start, end, length}
+        self.postings = {}   # term -> {passage_id: term frequency}
+        self.paths = {}      # path -> doc_id
+        self.next_id = 0
+        self.total_length = 0
+        self._corpus_version = None
+        self._hasher = MinHasher()
+        self._near_duplicates = NearDuplicateIndex(threshold=dedup_threshold)
+        self._texts = OrderedDict()  # doc_id -> text, least recently used first
+        self._texts_lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.documents)
+
+    def find_document(self, path):
+        """Return the id of the document indexed from path, or None."""
+        return self.paths.get(path)
+
+    def add_document(self, path, text, size=None, mtime=None, content_hash=None):
+        """
+        Split a document into passages and add them to the index, replacing
+        any previous version of the document. A near-duplicate of an indexed
+        document is recorded without passages.
+
+        Args:
+            path (str): Path of the source file
+            text (str): Extracted text of the document
+            size (int, optional): File size in bytes at indexing time
+            mtime (float, optional): File modification time at indexing time
+            content_hash (str, optional): SHA-256 of the file contents
+
+        Returns:
+            str: The id assigned to the document
+        """
+        self.remove_document(path)
+        self._corpus_version = None
+
+        doc_id = str(self.next_id)
+        self.next_id += 1
+
+        fingerprint = self._hasher.signature(text) if self.dedup_threshold else []
+        original_id, similarity = self._near_duplicates.find(fingerprint)
+        if original_id is not None:
+            logger.info(f"'{path}' is a near-duplicate ({similarity:.2f}) of "
+                        f"'{self.documents[original_id]['path']}'; not indexing its passages")
+            self.documents[doc_id] = {
+                "path": path,
+                "name": os.path.basename(path),
+                "size": size,
+                "mtime": mtime,
+                "hash": content_hash,
+                "passages": [],
+                "duplicate_of": original_id
+            }
+            self.paths[path] = doc_id
+            return doc_id
+
+        passage_ids = []
+        doc_terms = set()
+        for number, (start, end) in enumerate(split_passages(text, self.passage_size, self.passage_overlap)):
+            passage_id = f"{doc_id}:{number}"
+            terms = tokenize(text[start:end])
+            for term, _ in terms:
+                doc_terms.add(term)
+                postings = self.postings.setdefault(term, {})
+                postings[passage_id] = postings.get(passage_id, 0) + 1
+            self.passages[passage_id] = {"doc_id": doc_id, "start": start, "end": end, "length": len(terms)}
+            self.total_length += len(terms)
+            passage_ids.append(passage_id)
+
+        self.documents[doc_id] = {
+            "path": path,
+            "name": os.path.basename(path),
+            "size": size,
+            "mtime": mtime,
+            "hash": content_hash,
+            "passages": passage_ids,
+            "terms": sorted(doc_terms),
+            "fingerprint": fingerprint
+        }
+        self.paths[path] = doc_id
+        self._near_duplicates.add(doc_id, fingerprint)
+        self._remember_text(doc_id, text)
+        return doc_id
+
+    def manifest(self):
+        """Return path -> {size, mtime, hash} for every indexed document."""
+        return {doc["path"]: {"size": doc["size"], "mtime": doc["mtime"], "hash": doc["hash"]}
+                for doc in self.documents.values()}
+
+    def corpus_version(self):
+        """Return a digest identifying the indexed contents and passage settings."""
+        if self._corpus_version is not None:
+            return self._corpus_version
+        digest = hashlib.sha1(f"{self.passage_size}:{self.passage_overlap}".encode("utf-8"))
+        for path in sorted(self.paths):
+            doc = self.documents[self.paths[path]]
+            digest.update(f"\n{path}:{doc['hash'] or doc['mtime']}".encode("utf-8"))
+        self._corpus_version = digest.hexdigest()
+        return self._corpus_version
+
+    def duplicates_of(self, path):
+        """Return the paths of documents collapsed into the document at path."""
+        doc_id = self.find_document(path)
+        if doc_id is None:
+            return []
+        return [doc["path"] for doc in self.documents.values() if doc.get("duplicate_of") == doc_id]
+
+    def duplicate_count(self):
+        """Return the number of documents collapsed into a near-duplicate."""
+        return sum(1 for doc in self.documents.values() if doc.get("duplicate_of") is not None)
+
+    def dedup_ratio(self):
+        """Return the fraction of documents collapsed into a near-duplicate."""
+        return self.duplicate_count() / len(self.documents) if self.documents else 0.0
+
+    def touch_document(self, path, size, mtime):
+        """Record new stat information for a document whose contents are unchanged."""
+        doc_id = self.find_document(path)
+        if doc_id is not None:
+            self.documents[doc_id]["size"] = size
+            self.documents[doc_id]["mtime"] = mtime
+
+    def remove_document(self, path):
+        """
+        Remove a document, its passages and their postings from the index.
+
+        Args:
+            path (str): Path of the source file
+
+        Returns:
+            bool: True if the document was indexed and has been removed
+        """
+        doc_id = self.find_document(path)
+        if doc_id is None:
+            return False
+
+        doc = self.documents.pop(doc_id)
+        del self.paths[path]
+        self._corpus_version = None
+        self._near_duplicates.remove(doc_id)
+        with self._texts_lock:
+            self._texts.pop(doc_id, None)
+        if not doc["passages"]:
+            return True
+
+        # The text may have changed on disk already, so the postings are found
+        # through the document's recorded terms rather than by re-tokenizing it
+        passage_ids = set(doc["passages"])
+        for passage_id in passage_ids:
+            self.total_length -= self.passages.pop(passage_id)["length"]
+        for term in doc["terms"]:
+            postings = self.postings.get(term)
+            if postings is None:
+                continue
+            for passage_id in passage_ids.intersection(postings):
+                del postings[passage_id]
+            if not postings:
+                del self.postings[term]
+        return True
+
+    def search(self, query, top_k=3):
+        """
+        Rank indexed passages against a query using BM25.
+
+        Overlapping passages from the same document are collapsed so each
+        result adds new text.
+
+        Args:
+            query (str): The search query
+            top_k (int): Maximum number of passages to return
+
+        Returns:
+            list: Result dicts with passage_id, doc_id, name, path, score,
+                start and end, best match first
+        """
+        query_terms = list(dict.fromkeys(term for term, _ in tokenize(query)))
+        if not query_terms or not self.passages:
+            return []
+
+        passage_count = len(self.passages)
+        avg_length = self.total_length / passage_count if passage_count else 0
+        required_matches = max(1, math.ceil(len(query_terms) * self.min_match_ratio))
+
+        scores = {}
+        matched_terms = {}
+        for term in query_terms:
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (passage_count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for passage_id, tf in postings.items():
+                length = self.passages[passage_id]["length"]
+                norm = 1 - self.b + self.b * (length / avg_length if avg_length else 0)
+                scores[passage_id] = scores.get(passage_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + self.k1 * norm)
+                matched_terms[passage_id] = matched_terms.get(passage_id, 0) + 1
+
+        ranked = sorted(
+            (passage_id for passage_id in scores if matched_terms[passage_id] >= required_matches),
+            key=lambda passage_id: scores[passage_id],
+            reverse=True
+        )
+
+        results = []
+        for passage_id in ranked:
+            if len(results) >= top_k:
+                break
+            passage = self.passages[passage_id]
+            if any(hit["doc_id"] == passage["doc_id"] and hit["start"] < passage["end"] and passage["start"] < hit["end"]
+                   for hit in results):
+                continue
+            doc = self.documents[passage["doc_id"]]
+            results.append({
+                "passage_id": passage_id,
+                "doc_id": passage["doc_id"],
+                "name": doc["name"],
+                "path": doc["path"],
+                "score": scores[passage_id],
+                "start": passage["start"],
+                "end": passage["end"]
+            })
+        return results
+
+    def passage_text(self, passage_id):
+        """
+        Return the whitespace-normalized text of a passage.
+
+        Returns:
+            str: The passage text, or "" if the document can no longer be read
+                as it was indexed
+        """
+        passage = self.passages[passage_id]
+        text = self.document_text(passage["doc_id"])
+        if text is None:
+            return ""
+        return " ".join(text[passage["start"]:passage["end"]].split())
+
+    def document_text(self, doc_id):
+        """
+        Return the text a document was indexed from, re-reading it if it is
+        not held in memory.
+
+        Args:
+            doc_id (str): Id of an indexed document
+
+        Returns:
+            str: The document text, or None if the file is gone or no longer
+                matches its indexed fingerprint
+        """
+        with self._texts_lock:
+            text = self._texts.get(doc_id)
+            if text is not None:
+                self._texts.move_to_end(doc_id)
+                return text
+
+        doc = self.documents[doc_id]
+        if not self._matches_fingerprint(doc):
+            logger.warning(f"'{doc['path']}' changed since it was indexed; refresh the index to search it again")
+            return None
+        try:
+            text = self.text_loader(doc["path"])
+        except Exception as e:
+            logger.error(f"Could not re-read '{doc['path']}': {e}")
+            return None
+        if text is not None:
+            self._remember_text(doc_id, text)
+        return text
+
+    def _matches_fingerprint(self, doc):
+        """Return True if a document's file still has the size and contents it was indexed with."""
+        try:
+            stat = os.stat(doc["path"])
+        except OSError:
+            return False
+        if doc["size"] is not None and stat.st_size != doc["size"]:
+            return False
+        if doc["mtime"] is None or stat.st_mtime == doc["mtime"]:
+            return True
+        if doc["hash"] is None:
+            return False
+        # Touched but possibly unchanged: verify against the content hash
+        return file_content_hash(doc["path"]) == doc["hash"]
+
+    def _remember_text(self, doc_id, text):
+        """Keep a document's text in memory, evicting the least recently used."""
+        with self._texts_lock:
+            self._texts[doc_id] = text
+            self._texts.move_to_end(doc_id)
+            while len(self._texts) > self.max_cached_texts:
+                self._texts.popitem(last=False)
+
+    def save(self, index_path):
+        """
+        Write the index to disk atomically.
+
+        Args:
+            index_path (str): Destination file
+        """
+        directory = os.path.dirname(index_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        data = {
+            "version": INDEX_VERSION,
+            "k1": self.k1,
+            "b": self.b,
+            "min_match_ratio": self.min_match_ratio,
+            "passage_size": self.passage_size,
+            "passage_overlap": self.passage_overlap,
+            "dedup_threshold": self.dedup_threshold,
+            "next_id": self.next_id,
+            "total_length": self.total_length,
+            "documents": self.documents,
+            "passages": self.passages,
+            "postings": self.postings
+        }
+
+        tmp_path = f"{index_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, index_path)
+        logger.info(f"Saved index with {len(self.documents)} documents, {len(self.passages)} passages and {len(self.postings)} terms to '{index_path}'")
+
+    @classmethod
+    def load(cls, index_path, text_loader=None):
+        """
+        Load an index previously written with save().
+
+        Args:
+            index_path (str): Index file
+            text_loader (callable, optional): path -> document text, as for __init__
+
+        Returns:
+            DocumentIndex: The loaded index, or None if missing or incompatible
+        """
+        if not os.path.exists(index_path):
+            return None
+
+        try:
+            with open(index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.warning(f"Could not read index '{index_path}': {e}")
+            return None
+
+        if data.get("version") != INDEX_VERSION:
+            logger.info(f"Index '{index_path}' has an old format version. Ignoring it.")
+            return None
+
+        index = cls(k1=data["k1"], b=data["b"], min_match_ratio=data["min_match_ratio"],
+                    passage_size=data["passage_size"], passage_overlap=data["passage_overlap"],
+                    dedup_threshold=data["dedup_threshold"], text_loader=text_loader)
+        index.next_id = data["next_id"]
+        index.total_length = data["total_length"]
+        index.documents = data["documents"]
+        index.passages = data["passages"]
+        index.postings = data["postings"]
+        index.paths = {doc["path"]: doc_id for doc_id, doc in index.documents.items()}
+        for doc_id, doc in index.documents.items():
+            index._near_duplicates.add(doc_id, doc.get("fingerprint"))
+        logger.info(f"Loaded index with {len(index.documents)} documents from '{index_path}'")
+        return index
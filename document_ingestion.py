@@ -0,0 +1,235 @@
+"""
+Parallel ingestion of the local document corpus.
+
+Text extraction (PyPDF2 in particular) is CPU-bound, so ingestion fans the
+files out across a process pool and streams extracted documents back in
+input order. Only a bounded window of files is in flight at once. Files
+whose text is already in the extracted-text cache are served from it
+without touching the pool, and their text is read only when yielded.
+
+Can also be run as a command to (re)build the index for a directory:
+  python document_ingestion.py --document_dir documents --workers 8
+"""
+
+import os
+import sys
+import time
+import argparse
+import logging
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from knowledge_integration import (
+    KnowledgeIntegration, CACHED_EXTENSIONS, extract_text, get_text_cache, list_document_files
+)
+from text_cache import file_content_hash
+
+logger = logging.getLogger("DocumentIngestion")
+
+class IngestionReport:
+    """Counters and throughput for one ingestion run."""
+
+    def __init__(self):
+        self.files = 0
+        self.bytes = 0
+        self.cached = 0
+        self.failed = 0
+        self.duplicates = 0
+        self.start_time = time.time()
+        self.end_time = None
+
+    @property
+    def elapsed(self):
+        return (self.end_time or time.time()) - self.start_time
+
+    @property
+    def files_per_second(self):
+        return self.files / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def mb_per_second(self):
+        return self.bytes / (1024 * 1024) / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def dedup_ratio(self):
+        return self.duplicates / self.files if self.files else 0.0
+
+    def as_dict(self):
+        return {
+            "files": self.files,
+            "bytes": self.bytes,
+            "cached": self.cached,
+            "failed": self.failed,
+            "duplicates": self.duplicates,
+            "dedup_ratio": self.dedup_ratio,
+            "elapsed": self.elapsed,
+            "files_per_second": self.files_per_second,
+            "mb_per_second": self.mb_per_second
+        }
+
+    def summary(self):
+        summary = (f"Ingested {self.files} files ({self.bytes / (1024 * 1024):.1f} MB, "
+                   f"{self.cached} from cache, {self.failed} failed) in {self.elapsed:.2f}s: "
+                   f"{self.files_per_second:.1f} files/s, {self.mb_per_second:.2f} MB/s")
+        if self.duplicates:
+            summary += f"; {self.duplicates} near-duplicates collapsed (dedup ratio {self.dedup_ratio:.2f})"
+        return summary
+
+def _extract_document(file_path):
+    """
+    Extract one document in a worker process.
+
+    Args:
+        file_path (str): Path of the document
+
+    Returns:
+        dict: Extracted text with the size and mtime the file had before
+            extraction, and its content hash
+    """
+    stat = os.stat(file_path)
+    return {
+        "path": file_path,
+        "text": extract_text(file_path, use_cache=False),
+        "size": stat.st_size,
+        "mtime": stat.st_mtime,
+        # Hashed after the stat, so a later edit shows up as a stat mismatch
+        "hash": file_content_hash(file_path),
+        "cached": False
+    }
+
+def ingest_documents(file_paths, max_workers=None, use_cache=True, report=None):
+    """
+    Extract text from documents in parallel, yielding them in input order.
+
+    Documents are yielded in the order of file_paths no matter which worker
+    finishes first, so an index built from them (including which of two
+    near-duplicates becomes canonical) doesn't depend on worker timing or on
+    which files happened to be cached.
+
+    Args:
+        file_paths (list): Document paths to ingest
+        max_workers (int, optional): Worker processes; defaults to the CPU count
+        use_cache (bool): Serve and store text through the extracted-text cache
+        report (IngestionReport, optional): Report to update while ingesting
+
+    Yields:
+        dict: path, text, size, mtime, content hash and whether it came from the cache
+    """
+    report = report if report is not None else IngestionReport()
+    cache = get_text_cache() if use_cache else None
+
+    # Only check which files are cached here; their text is read as they are yielded
+    cached = set()
+    pending = []
+    for file_path in file_paths:
+        if cache is not None and file_path.lower().endswith(CACHED_EXTENSIONS) and cache.contains(file_path):
+            cached.add(file_path)
+        else:
+            pending.append(file_path)
+
+    max_workers = max_workers or os.cpu_count() or 1
+    if max_workers == 1 or len(pending) <= 1:
+        # Not worth starting a pool for a single worker or file
+        results = (_extract_pending(file_path) for file_path in pending)
+    else:
+        results = _extract_in_pool(pending, max_workers)
+
+    for file_path in file_paths:
+        if file_path in cached:
+            stat = os.stat(file_path)
+            text = cache.get(file_path)
+            if text is not None:
+                report.files += 1
+                report.bytes += stat.st_size
+                report.cached += 1
+                yield {"path": file_path, "text": text, "size": stat.st_size,
+                       "mtime": stat.st_mtime, "hash": cache.cached_hash(file_path), "cached": True}
+                continue
+            # Evicted or changed since it was checked
+            document = _extract_pending(file_path)
+        else:
+            document = next(results)
+
+        if document is None:
+            report.failed += 1
+            continue
+        if document["text"] is None:
+            continue
+        if cache and document["path"].lower().endswith(CACHED_EXTENSIONS):
+            try:
+                cache.put(document["path"], document["text"], content_hash=document["hash"],
+                          size=document["size"], mtime=document["mtime"])
+            except OSError as e:
+                logger.warning(f"Could not cache extracted text for {document['path']}: {e}")
+        report.files += 1
+        report.bytes += document["size"]
+        yield document
+
+    report.end_time = time.time()
+    if pending:
+        logger.info(report.summary())
+
+def _extract_pending(file_path):
+    """Extract a document in-process, returning None on failure."""
+    try:
+        return _extract_document(file_path)
+    except Exception as e:
+        logger.error(f"Error ingesting {file_path}: {e}")
+        return None
+
+def _extract_in_pool(file_paths, max_workers):
+    """
+    Run extraction across a process pool, yielding documents in input order.
+
+    Only max_workers * 2 files are submitted ahead of the one being yielded,
+    so results that finish behind a slow file stay bounded in number instead
+    of growing with the corpus.
+    """
+    remaining = iter(file_paths)
+    with ProcessPoolExecutor(max_workers=min(max_workers, len(file_paths))) as executor:
+        window = deque((file_path, executor.submit(_extract_document, file_path))
+                       for file_path in islice(remaining, max_workers * 2))
+        while window:
+            file_path, future = window.popleft()
+            try:
+                document = future.result()
+            except Exception as e:
+                logger.error(f"Error ingesting {file_path}: {e}")
+                document = None
+            # Keep the pool busy while the caller handles this document
+            next_path = next(remaining, None)
+            if next_path is not None:
+                window.append((next_path, executor.submit(_extract_document, next_path)))
+            yield document
+
+def main():
+    """Build the document index for a directory and report ingestion throughput."""
+    parser = argparse.ArgumentParser(description='Ingest documents and build the knowledge index')
+    parser.add_argument(
+        '--document_dir',
+        type=str,
+        default=os.getenv("DOCUMENT_DIR", "documents"),
+        help='Directory containing knowledge base documents (PDFs, DOCXs, TXTs)'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=None,
+        help='Number of worker processes (default: CPU count)'
+    )
+    args = parser.parse_args()
+
+    if not list_document_files(args.document_dir):
+        logger.error(f"No document files (.pdf, .docx, .txt) found in '{args.document_dir}'.")
+        sys.exit(1)
+
+    knowledge_integration = KnowledgeIntegration({
+        "document_dir": args.document_dir,
+        "use_index": False
+    })
+    report = knowledge_integration.ingest_documents(max_workers=args.workers)
+    print(report.summary())
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,25 @@
 import os
 import json
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import logging
 from dotenv import load_dotenv 
 import re
-from openai import OpenAI
 import time
+import codecs
+import mmap
+import hashlib
+import threading
+import contextvars
+from contextlib import contextmanager
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+
+from document_index import DocumentIndex
+from text_cache import ExtractedTextCache, file_content_hash
+from vector_index import VectorIndex, NUMPY_SUPPORT, feature_keys
+from query_cache import QueryCache, normalize_query
+from llm_gateway import get_llm_gateway
 
 # Try to import PDF and DOCX libraries, but handle if not available
 try:
@@ -26,32 +40,49 @@ except ImportError:
 load_dotenv()
 
 DOCUMENT_DIR = os.getenv("DOCUMENT_DIR", "documents")
+KNOWLEDGE_CACHE_DIR = os.getenv("KNOWLEDGE_CACHE_DIR", ".knowledge_cache")
+TEXT_CACHE_MAX_MB = int(os.getenv("TEXT_CACHE_MAX_MB", "512"))
+SUPPORTED_EXTENSIONS = ('.pdf', '.docx', '.txt')
+# Formats whose extraction is expensive enough to be worth caching
+CACHED_EXTENSIONS = ('.pdf', '.docx')
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 GOOGLE_CX = os.getenv("GOOGLE_CX")
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+GOOGLE_CSE_URL = "https://www.googleapis.com/customsearch/v1"
+GOOGLE_SEARCH_ENDPOINT = os.getenv("GOOGLE_SEARCH_ENDPOINT", GOOGLE_CSE_URL)
+WEB_CONNECT_TIMEOUT = float(os.getenv("WEB_CONNECT_TIMEOUT", "3.05"))
+WEB_READ_TIMEOUT = float(os.getenv("WEB_READ_TIMEOUT", "10"))
+WEB_MAX_RETRIES = int(os.getenv("WEB_MAX_RETRIES", "3"))
+REFERENCE_WORKERS = int(os.getenv("REFERENCE_WORKERS", "8"))
+TXT_CHUNK_SIZE = 1024 * 1024
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
 logger = logging.getLogger("KnowledgeIntegration")
 
-def extract_text_from_pdf(pdf_path):
-    """Extract text from a PDF file."""
+def iter_pdf_pages(pdf_path):
+    """
+    Yield the text of a PDF one page at a time, each followed by a newline.
+    
+    Pages are parsed lazily, so a consumer that stops early never pays for
+    the rest of the document.
+    """
     if not PDF_SUPPORT:
         logger.warning("PDF support is disabled. Install PyPDF2 to enable.")
-        return ""
+        return
         
     try:
         with open(pdf_path, "rb") as f:
             reader = PdfReader(f)
-            text = ""
             for page in reader.pages:
                 page_text = page.extract_text()
                 if page_text:
-                    text += page_text + "\n"
-            return text
+                    yield page_text + "\n"
     except Exception as e:
         logger.error(f"Error reading PDF {pdf_path}: {e}")
-        return ""
+
+def extract_text_from_pdf(pdf_path):
+    """Extract text from a PDF file."""
+    return "".join(iter_pdf_pages(pdf_path))
 
 def extract_text_from_docx(docx_path):
     """Extract text from a DOCX file."""
@@ -83,42 +114,443 @@ def extract_text_from_txt(txt_path):
         logger.error(f"Error reading TXT {txt_path}: {e}")
         return ""
 
-def search_local_documents(query):
-    """Search local PDFs, DOCX, and TXT files for relevant content."""
-    if not os.path.exists(DOCUMENT_DIR):
-        logger.warning(f"Document directory '{DOCUMENT_DIR}' not found. Skipping local search.")
+def iter_txt_chunks(txt_path, chunk_size=TXT_CHUNK_SIZE):
+    """
+    Yield the text of a plain text file in chunks of about chunk_size bytes.
+    
+    The file is decoded as UTF-8; from the first invalid byte on, the rest is
+    decoded as Latin-1, mirroring extract_text_from_txt's fallback.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    try:
+        with open(txt_path, "rb") as f:
+            for data in iter(lambda: f.read(chunk_size), b""):
+                buffered = decoder.getstate()[0]
+                try:
+                    text = decoder.decode(data)
+                except UnicodeDecodeError:
+                    decoder = codecs.getincrementaldecoder("latin-1")()
+                    text = decoder.decode(buffered + data)
+                if text:
+                    yield text
+            buffered = decoder.getstate()[0]
+            if buffered:
+                # A multi-byte sequence cut off at the end of the file
+                yield buffered.decode("latin-1")
+    except Exception as e:
+        logger.error(f"Error reading TXT {txt_path}: {e}")
+
+_text_cache = None
+
+def get_text_cache():
+    """Return the shared extracted-text cache, creating it on first use."""
+    global _text_cache
+    if _text_cache is None:
+        _text_cache = ExtractedTextCache(
+            os.path.join(KNOWLEDGE_CACHE_DIR, "texts"),
+            max_bytes=TEXT_CACHE_MAX_MB * 1024 * 1024
+        )
+    return _text_cache
+
+def extract_text(file_path, use_cache=True):
+    """
+    Extract text from a supported document, or return None for other file types.
+    
+    PDF and DOCX text is served from the extracted-text cache when the file
+    is unchanged, and stored there after a fresh extraction.
+    """
+    filename = file_path.lower()
+    if filename.endswith(".pdf") and PDF_SUPPORT:
+        extractor = extract_text_from_pdf
+    elif filename.endswith(".docx") and DOCX_SUPPORT:
+        extractor = extract_text_from_docx
+    elif filename.endswith(".txt"):
+        return extract_text_from_txt(file_path)
+    else:
+        return None
+    
+    if not use_cache:
+        return extractor(file_path)
+    
+    cache = get_text_cache()
+    text = cache.get(file_path)
+    if text is not None:
+        return text
+    
+    # Stat before extracting, so an edit made meanwhile isn't recorded against this text
+    stat = os.stat(file_path)
+    text = extractor(file_path)
+    try:
+        cache.put(file_path, text, size=stat.st_size, mtime=stat.st_mtime)
+    except OSError as e:
+        logger.warning(f"Could not cache extracted text for {file_path}: {e}")
+    return text
+
+def iter_document_text(file_path, use_cache=True):
+    """
+    Yield a document's text piece by piece: page by page for a PDF, in
+    chunks for a TXT file, and in one piece for a DOCX. Yields nothing for
+    unsupported file types.
+    
+    A PDF that is not in the extracted-text cache is parsed lazily and only
+    cached if the consumer reads it to the end.
+    """
+    filename = file_path.lower()
+    if filename.endswith(".txt"):
+        yield from iter_txt_chunks(file_path)
+        return
+    if not (filename.endswith(".pdf") and PDF_SUPPORT):
+        text = extract_text(file_path, use_cache=use_cache)
+        if text:
+            yield text
+        return
+    
+    cache = get_text_cache() if use_cache else None
+    text = cache.get(file_path) if cache is not None else None
+    if text is not None:
+        yield text
+        return
+    
+    stat = os.stat(file_path)
+    pages = []
+    for page in iter_pdf_pages(file_path):
+        pages.append(page)
+        yield page
+    if cache is not None:
+        try:
+            cache.put(file_path, "".join(pages), size=stat.st_size, mtime=stat.st_mtime)
+        except OSError as e:
+            logger.warning(f"Could not cache extracted text for {file_path}: {e}")
+
+def find_snippet(chunks, query, before=100, after=300):
+    """
+    Scan streamed text for the first occurrence of query, stopping as soon
+    as it and its surrounding context have been read.
+    
+    Args:
+        chunks (iterable): Pieces of the text in order
+        query (str): Text to look for, case-insensitively
+        before (int): Characters of context before the match
+        after (int): Characters from the start of the match to include
+        
+    Returns:
+        str: The snippet around the first match, or None if there is none
+    """
+    needle = query.lower()
+    chunks = iter(chunks)
+    window = ""
+    for chunk in chunks:
+        window += chunk
+        position = window.lower().find(needle)
+        if position == -1:
+            # Keep enough text for a match spanning the next chunk and its context
+            window = window[-(len(needle) + before):]
+            continue
+        
+        while len(window) < position + after:
+            chunk = next(chunks, None)
+            if chunk is None:
+                break
+            window += chunk
+        return window[max(0, position - before):position + after]
+    return None
+
+def find_in_txt(txt_path, query):
+    """
+    Find the first case-insensitive occurrence of query in a plain text file.
+    
+    ASCII queries are matched as bytes in a memory-mapped view of the file,
+    so no decoded or lowercased copy of it is made; the query is matched in
+    both its UTF-8 and Latin-1 encodings. Bytes matching only folds ASCII
+    case, so other queries are matched against the decoded, lowercased text
+    one chunk at a time.
+    
+    Args:
+        txt_path (str): Path of the text file
+        query (str): Text to look for
+        
+    Returns:
+        tuple: (start, end) byte offsets of the match, or None if there is none
+    """
+    if not query.isascii():
+        return _find_in_decoded_txt(txt_path, query)
+    
+    encodings = []
+    for encoding in ("utf-8", "latin-1"):
+        try:
+            encoded = query.encode(encoding)
+        except UnicodeEncodeError:
+            continue
+        if encoded and encoded not in encodings:
+            encodings.append(encoded)
+    if not encodings:
+        return None
+    pattern = re.compile(b"|".join(re.escape(encoded) for encoded in encodings), re.IGNORECASE)
+    
+    try:
+        with open(txt_path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return None
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                match = pattern.search(mapped)
+                return (match.start(), match.end()) if match else None
+    except (OSError, ValueError) as e:
+        logger.error(f"Error searching TXT {txt_path}: {e}")
+        return None
+
+def _find_in_decoded_txt(txt_path, query, chunk_size=TXT_CHUNK_SIZE):
+    """
+    Find the first occurrence of query in a plain text file with full-Unicode
+    case folding (str.lower()), decoding the file like iter_txt_chunks.
+    
+    The file is scanned chunk by chunk, and each chunk is searched together
+    with the tail of the one before it, so matches across a chunk boundary
+    are found and memory use doesn't grow with the file.
+    
+    Returns:
+        tuple: (start, end) byte offsets of the match, or None if there is none
+    """
+    needle = query.lower()
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    encoding = "utf-8"
+    carry = ""
+    carry_start = 0  # byte offset of carry in the file
+    read = 0
+    try:
+        with open(txt_path, "rb") as f:
+            for data in iter(lambda: f.read(chunk_size), b""):
+                buffered = decoder.getstate()[0]
+                try:
+                    text = decoder.decode(data)
+                except UnicodeDecodeError:
+                    # From the first invalid byte on the file is read as Latin-1
+                    decoder = codecs.getincrementaldecoder("latin-1")()
+                    encoding = "latin-1"
+                    text = decoder.decode(buffered + data)
+                    carry, carry_start = "", read - len(buffered)
+                read += len(data)
+                
+                window = carry + text
+                position = _find_lowered(window, needle)
+                if position is not None:
+                    start = carry_start + len(window[:position].encode(encoding))
+                    return start, start + len(window[position:position + len(query)].encode(encoding))
+                
+                # Keep enough of the window for a match that continues in the next chunk
+                carry = window[-len(needle):]
+                carry_start += len(window.encode(encoding)) - len(carry.encode(encoding))
+    except OSError as e:
+        logger.error(f"Error searching TXT {txt_path}: {e}")
+    return None
+
+def _find_lowered(text, needle):
+    """Return the index in text of the first match of the lowercase needle in text.lower(), or None."""
+    lowered = text.lower()
+    position = lowered.find(needle)
+    if position < 0:
+        return None
+    if len(lowered) != len(text):
+        # A few characters (such as 'İ') lowercase to two; map the offset back
+        consumed = chars = 0
+        while consumed < position:
+            consumed += len(text[chars].lower())
+            chars += 1
+        position = chars
+    return position
+
+def read_txt_snippet(txt_path, offset, before=100, after=300):
+    """
+    Read the text around a byte offset of a plain text file.
+    
+    Args:
+        txt_path (str): Path of the text file
+        offset (int): Byte offset of the match
+        before (int): Bytes of context before the match
+        after (int): Bytes from the start of the match to include
+        
+    Returns:
+        str: The decoded snippet
+    """
+    start = max(0, offset - before)
+    with open(txt_path, "rb") as f:
+        f.seek(start)
+        data = f.read(offset + after - start)
+    
+    try:
+        # Drop partial UTF-8 characters cut off at either end
+        first = 0
+        while first < min(3, len(data)) and 0x80 <= data[first] <= 0xBF:
+            first += 1
+        last = len(data)
+        for back in range(1, min(4, len(data)) + 1):
+            lead = data[len(data) - back]
+            if lead >= 0xC0:
+                if back < (2 if lead < 0xE0 else 3 if lead < 0xF0 else 4):
+                    last = len(data) - back
+                break
+            if lead < 0x80:
+                break
+        return data[first:last].decode("utf-8")
+    except UnicodeDecodeError:
+        return data.decode("latin-1")
+
+def search_txt_file(txt_path, query, before=100, after=300):
+    """
+    Return the snippet around the first match of query in a plain text file,
+    or None; see find_in_txt(). Memory use does not depend on the file size.
+    """
+    span = find_in_txt(txt_path, query)
+    if span is None:
+        return None
+    return read_txt_snippet(txt_path, span[0], before=before, after=after)
+
+def list_document_files(document_dir):
+    """List paths of the supported document files directly inside document_dir."""
+    if not os.path.exists(document_dir):
+        return []
+    return [os.path.join(document_dir, f) for f in sorted(os.listdir(document_dir))
+            if os.path.isfile(os.path.join(document_dir, f)) and
+            f.lower().endswith(SUPPORTED_EXTENSIONS)]
+
+def directory_signature(document_dir):
+    """Return a digest of the names, sizes and mtimes of the documents in a directory."""
+    digest = hashlib.sha1()
+    for file_path in list_document_files(document_dir):
+        stat = os.stat(file_path)
+        digest.update(f"{file_path}:{stat.st_size}:{stat.st_mtime}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+def default_index_path(document_dir):
+    """Return the index location for a document directory inside the knowledge cache."""
+    digest = hashlib.sha1(os.path.abspath(document_dir).encode("utf-8")).hexdigest()[:12]
+    return os.path.join(KNOWLEDGE_CACHE_DIR, f"index_{digest}.json")
+
+def build_document_index(document_dir, max_workers=None, report=None, passage_size=120, passage_overlap=30,
+                         dedup_threshold=0.9):
+    """
+    Build a fresh inverted index over every supported document in a directory.
+    
+    Args:
+        document_dir (str): Directory containing PDF, DOCX and TXT files
+        max_workers (int, optional): Worker processes used for text extraction
+        report (IngestionReport, optional): Report to fill with ingestion throughput
+        passage_size (int): Words per indexed passage
+        passage_overlap (int): Words shared by consecutive passages
+        dedup_threshold (float): Similarity at which near-duplicate documents
+            are collapsed; 0 disables deduplication
+        
+    Returns:
+        DocumentIndex: The populated index
+    """
+    # Import at function level to avoid circular imports
+    from document_ingestion import ingest_documents
+    
+    start_time = time.time()
+    index = DocumentIndex(passage_size=passage_size, passage_overlap=passage_overlap, dedup_threshold=dedup_threshold)
+    for document in ingest_documents(list_document_files(document_dir), max_workers=max_workers, report=report):
+        index.add_document(document["path"], document["text"], size=document["size"],
+                           mtime=document["mtime"], content_hash=document["hash"])
+    if report is not None:
+        report.duplicates += index.duplicate_count()
+    logger.info(f"Indexed {len(index)} documents from '{document_dir}' in {time.time() - start_time:.2f}s "
+                f"({index.duplicate_count()} near-duplicates collapsed, dedup ratio {index.dedup_ratio():.2f})")
+    return index
+
+def index_hits(index, query, top_k=3):
+    """Probe a DocumentIndex and return (score, formatted passage) pairs, best first."""
+    results = []
+    for hit in index.search(query, top_k=top_k):
+        text = index.passage_text(hit["passage_id"])
+        # Skip passages of files that changed since they were indexed
+        if text:
+            results.append((hit["score"], f"📄 {hit['name']} (score {hit['score']:.2f}): {text}..."))
+    return results
+
+def search_index(index, query, top_k=3):
+    """Probe a DocumentIndex and format the top-ranked passages with their scores."""
+    return [result for _, result in index_hits(index, query, top_k=top_k)]
+
+def dense_hits(query, vector_index, document_index, top_k=3, min_score=0.1):
+    """
+    Search the local corpus by hashing TF-IDF similarity.
+    
+    Args:
+        query (str): The search query
+        vector_index (VectorIndex): Passage vectors
+        document_index (DocumentIndex): Index holding the passage text
+        top_k (int): Maximum passages to return
+        min_score (float): Minimum cosine similarity for a result
+        
+    Returns:
+        list: (similarity, formatted passage) pairs, best first; empty if
+            nothing is similar enough
+    """
+    query_keys = set(feature_keys(query))
+    results = []
+    for passage_id, score in vector_index.search(query, top_k=top_k, min_score=min_score):
+        passage = document_index.passages.get(passage_id)
+        if passage is None:
+            continue
+        # Discard matches that only come from hash collisions
+        if query_keys.isdisjoint(feature_keys(document_index.passage_text(passage_id))):
+            continue
+        name = document_index.documents[passage["doc_id"]]["name"]
+        results.append((score, f"📄 {name} (similarity {score:.2f}): {document_index.passage_text(passage_id)}..."))
+    
+    if results:
+        logger.info(f"Dense retrieval found {len(results)} passages for '{query}'.")
+    else:
+        logger.info(f"Dense retrieval found nothing for '{query}'.")
+    return results
+
+def search_dense_documents(query, vector_index, document_index, top_k=3, min_score=0.1):
+    """Search the local corpus by hashing TF-IDF similarity; see dense_hits()."""
+    return [result for _, result in dense_hits(query, vector_index, document_index, top_k=top_k, min_score=min_score)]
+
+def search_local_documents(query, index=None, top_k=3, document_dir=None):
+    """
+    Search local PDFs, DOCX, and TXT files for relevant content.
+    
+    When an index is given the lookup ranks the index's passages with BM25
+    and returns the top_k; otherwise every document in document_dir
+    (default DOCUMENT_DIR) is extracted and scanned for the exact query string.
+    
+    Returns:
+        list: Formatted matches, an empty list if the corpus has none, or
+            None if the document directory could not be searched
+    """
+    if index is not None:
+        results = search_index(index, query, top_k=top_k)
+        if results:
+            logger.info(f"Local knowledge found for '{query}' in index. Found {len(results)} matches.")
+        else:
+            logger.info(f"No local knowledge found for '{query}' in index.")
+        return results
+    
+    document_dir = document_dir or DOCUMENT_DIR
+    if not os.path.exists(document_dir):
+        logger.warning(f"Document directory '{document_dir}' not found. Skipping local search.")
         return None
         
     # Check if directory is empty
-    files = os.listdir(DOCUMENT_DIR)
+    files = os.listdir(document_dir)
     if not files:
-        logger.warning(f"Document directory '{DOCUMENT_DIR}' is empty. Skipping local search.")
+        logger.warning(f"Document directory '{document_dir}' is empty. Skipping local search.")
         return None
 
     results = []
     for filename in files:
-        file_path = os.path.join(DOCUMENT_DIR, filename)
+        file_path = os.path.join(document_dir, filename)
         if not os.path.isfile(file_path):
             continue
             
-        text = ""
-        if filename.lower().endswith(".pdf") and PDF_SUPPORT:
-            text = extract_text_from_pdf(file_path)
-        elif filename.lower().endswith(".docx") and DOCX_SUPPORT:
-            text = extract_text_from_docx(file_path)
-        elif filename.lower().endswith(".txt"):
-            text = extract_text_from_txt(file_path)
+        # Simple keyword search, reading the document only as far as the first match
+        if filename.lower().endswith(".txt"):
+            snippet = search_txt_file(file_path, query)
         else:
-            continue
-            
-        # Simple keyword search
-        if query.lower() in text.lower():
-            # Find a relevant snippet
-            query_pos = text.lower().find(query.lower())
-            start = max(0, query_pos - 100)
-            end = min(len(text), query_pos + 300)
-            snippet = text[start:end].replace("\n", " ").strip()
-            
+            snippet = find_snippet(iter_document_text(file_path), query)
+        if snippet is not None:
+            snippet = snippet.replace("\n", " ").strip()
             results.append(f"📄 {filename}: {snippet}...")
 
     if results:
@@ -126,24 +558,69 @@ def search_local_documents(query):
     else:
         logger.info(f"No local knowledge found for '{query}'.")
 
-    return results if results else None
+    return results
 
-def search_web(query):
-    """Search the web using Google Custom Search API."""
-    if not GOOGLE_API_KEY or not GOOGLE_CX:
+_web_session = None
+_web_session_lock = threading.Lock()
+
+def get_web_session():
+    """
+    Return the shared HTTP session used for web search, creating it on first use.
+    
+    The session keeps connections alive across lookups and retries 429 and
+    5xx responses with exponential backoff (honouring Retry-After).
+    """
+    global _web_session
+    with _web_session_lock:
+        if _web_session is None:
+            retry = Retry(
+                total=WEB_MAX_RETRIES,
+                backoff_factor=0.5,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=("GET",),
+                respect_retry_after_header=True,
+                raise_on_status=False
+            )
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retry)
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _web_session = session
+        return _web_session
+
+def search_web(query, endpoint=None):
+    """
+    Search the web using Google Custom Search API.
+    
+    Args:
+        query (str): The search query
+        endpoint (str, optional): Search endpoint URL; defaults to
+            GOOGLE_SEARCH_ENDPOINT so a local stand-in server can replace Google
+        
+    Returns:
+        list: Formatted web results, an empty list if the search found
+            nothing, or None if the search could not be performed
+    """
+    endpoint = endpoint or GOOGLE_SEARCH_ENDPOINT
+    if endpoint == GOOGLE_CSE_URL and (not GOOGLE_API_KEY or not GOOGLE_CX):
         logger.warning("Google API key or CSE ID is missing. Web search cannot be performed.")
         return None
 
-    url = f"https://www.googleapis.com/customsearch/v1?q={query}&key={GOOGLE_API_KEY}&cx={GOOGLE_CX}"
+    params = {"q": query, "key": GOOGLE_API_KEY, "cx": GOOGLE_CX}
     
     try:
-        response = requests.get(url)
+        response = get_web_session().get(
+            endpoint,
+            params=params,
+            timeout=(WEB_CONNECT_TIMEOUT, WEB_READ_TIMEOUT)
+        )
+        response.raise_for_status()
         data = response.json()
 
         results = data.get("items", [])
         if not results:
             logger.info(f"No relevant web results found for '{query}'.")
-            return None
+            return []
 
         formatted_results = []
         for res in results[:5]:  # Limit to top 5 results
@@ -159,38 +636,29 @@ def search_web(query):
         logger.error(f"Web search error: {e}")
         return None
 
+KNOWLEDGE_SYSTEM_PROMPT = (
+    "You are a knowledge base that provides factual, concise information. " +
+    "When asked about a topic, provide 3-5 key points that would be helpful " +
+    "for a debate or discussion. Focus on current understanding, trends, and " +
+    "important considerations. Format as bullet points."
+)
+
 def generate_knowledge(query, client=None):
     """Generate knowledge using OpenAI API when no other sources are available."""
-    # Create a client if none was provided
-    if not client:
-        if not OPENAI_API_KEY:
-            logger.error("OpenAI API key is missing. Cannot generate knowledge.")
-            return None
-            
-        try:
-            client = OpenAI(api_key=OPENAI_API_KEY)
-        except Exception as e:
-            logger.error(f"Failed to initialize OpenAI client: {e}")
-            return None
+    # Use the shared gateway if none was provided
+    client = client or get_llm_gateway()
     
     try:
         logger.info(f"Generating knowledge for '{query}' using OpenAI API")
-        response = client.chat.completions.create(
+        generated_content = client.chat(
             model="gpt-4o",
             messages=[
-                {"role": "system", "content": 
-                 "You are a knowledge base that provides factual, concise information. " +
-                 "When asked about a topic, provide 3-5 key points that would be helpful " +
-                 "for a debate or discussion. Focus on current understanding, trends, and " +
-                 "important considerations. Format as bullet points."
-                },
+                {"role": "system", "content": KNOWLEDGE_SYSTEM_PROMPT},
                 {"role": "user", "content": f"Provide current knowledge about: {query}"}
             ],
             max_tokens=500
         )
         
-        generated_content = response.choices[0].message.content
-        
         # Format the result
         result = f"🤖 AI-Generated Knowledge: {generated_content}"
         
@@ -201,36 +669,95 @@ def generate_knowledge(query, client=None):
         logger.error(f"Error generating knowledge: {e}")
         return None
 
-class KnowledgeIntegration:
-    """Class to handle knowledge integration from various sources."""
+def generate_knowledge_batch(queries, client=None):
+    """
+    Generate knowledge for several queries with a single OpenAI call.
     
-    def __init__(self, config=None, client=None):
+    The model answers every numbered query in one JSON object, which is split
+    back per query. Queries the batch answer leaves out are generated one at
+    a time.
+    
+    Args:
+        queries (list): The queries to generate knowledge for
+        client (LLMGateway, optional): Gateway to use; defaults to the shared one
+        
+    Returns:
+        dict: query -> list of results (as from generate_knowledge), or None
+    """
+    if len(queries) == 1:
+        return {queries[0]: generate_knowledge(queries[0], client)}
+    
+    client = client or get_llm_gateway()
+    
+    numbered = "\n".join(f"{number}. {query}" for number, query in enumerate(queries, 1))
+    answers = {}
+    try:
+        logger.info(f"Generating knowledge for {len(queries)} queries in one OpenAI call")
+        content = client.chat(
+            model="gpt-4o",
+            messages=[
+                {"role": "system", "content": KNOWLEDGE_SYSTEM_PROMPT +
+                 " Answer each numbered topic separately. Respond with a JSON object that maps " +
+                 "each topic number, as a string, to the bullet points for that topic."},
+                {"role": "user", "content": f"Provide current knowledge about each of these topics:\n{numbered}"}
+            ],
+            max_tokens=min(500 * len(queries), 4000),
+            response_format={"type": "json_object"}
+        )
+        answers = json.loads(content)
+    except Exception as e:
+        logger.error(f"Error generating batched knowledge: {e}")
+    
+    results = {}
+    for number, query in enumerate(queries, 1):
+        content = answers.get(str(number)) if isinstance(answers, dict) else None
+        if isinstance(content, list):
+            content = "\n".join(f"- {point}" for point in content)
+        if content:
+            results[query] = [f"🤖 AI-Generated Knowledge: {content}"]
+        else:
+            results[query] = generate_knowledge(query, client)
+    return results
+
+class KnowledgeCorpus:
+    """One named document directory (shard) with its own index and dense vectors."""
+    
+    def __init__(self, name, document_dir, config=None):
         """
-        Initialize the knowledge integration system.
+        Initialize the corpus and load or build its index.
         
         Args:
-            config (dict): Configuration options
-            client: OpenAI client instance to track references
+            name (str): Name of the corpus
+            document_dir (str): Directory containing its documents
+            config (dict): Index settings (use_index, index_path, passage_size,
+                passage_overlap, retrieval_mode, dense_dim, dense_memory_map,
+                ingest_workers)
         """
         self.config = config or {}
-        self.client = client
-        self.document_dir = self.config.get("document_dir", DOCUMENT_DIR)
-        self.use_web_search = self.config.get("use_web_search", True)
-        self.use_ai_generation = self.config.get("use_ai_generation", True)
-        
-        # Set document directory in environment if specified in config
-        if "document_dir" in self.config:
-            os.environ["DOCUMENT_DIR"] = self.config["document_dir"]
-        
-        # Initialize a list to track references if client doesn't have one
-        if self.client and not hasattr(self.client, 'knowledge_references'):
-            self.client.knowledge_references = []
-            
-        logger.info(f"Knowledge Integration initialized with: document_dir={self.document_dir}, " +
-                    f"use_web_search={self.use_web_search}, use_ai_generation={self.use_ai_generation}")
+        self.name = name
+        self.document_dir = document_dir
+        self.use_index = self.config.get("use_index", True)
+        self.index_path = self.config.get("index_path") or default_index_path(self.document_dir)
+        self.ingest_workers = self.config.get("ingest_workers")
+        self.passage_size = self.config.get("passage_size", 120)
+        self.passage_overlap = self.config.get("passage_overlap", 30)
+        self.dedup_threshold = self.config.get("dedup_threshold", 0.9)
+        self.retrieval_mode = self.config.get("retrieval_mode", "hybrid")
+        self.dense_dim = self.config.get("dense_dim", 2048)
+        self.dense_memory_map = self.config.get("dense_memory_map", False)
+        self.vector_path = os.path.splitext(self.index_path)[0] + "_vectors"
+        self.vector_index = None
+        self.index = None
+        self._lock = threading.RLock()
+        self._refresh_lock = threading.Lock()
         
         # Check if document directory exists and has files
-        self._check_document_directory()
+        if self._check_document_directory() and self.use_index:
+            self.index = self._load_or_build_index()
+            self._sync_vector_index()
+    
+    def __len__(self):
+        return len(self.index) if self.index is not None else 0
     
     def _check_document_directory(self):
         """Check if document directory exists and contains files."""
@@ -238,9 +765,7 @@ class KnowledgeIntegration:
             logger.warning(f"Document directory '{self.document_dir}' not found.")
             return False
             
-        files = [f for f in os.listdir(self.document_dir) 
-                if os.path.isfile(os.path.join(self.document_dir, f)) and 
-                f.lower().endswith(('.pdf', '.docx', '.txt'))]
+        files = list_document_files(self.document_dir)
                 
         if not files:
             logger.warning(f"No document files (.pdf, .docx, .txt) found in '{self.document_dir}'.")
@@ -249,87 +774,800 @@ class KnowledgeIntegration:
         logger.info(f"Found {len(files)} document files in '{self.document_dir}'.")
         return True
     
-    def retrieve_knowledge(self, query):
+    def _load_or_build_index(self):
+        """
+        Load the on-disk index for the document directory and bring it up to
+        date, or build it from scratch if there is no usable index yet.
+        
+        Returns:
+            DocumentIndex: Index over the document directory
+        """
+        index = DocumentIndex.load(self.index_path)
+        settings = (self.passage_size, self.passage_overlap, self.dedup_threshold)
+        if index is not None and (index.passage_size, index.passage_overlap, index.dedup_threshold) != settings:
+            logger.info(f"Passage or deduplication settings changed since '{self.index_path}' was built")
+            index = None
+        if index is None:
+            logger.info(f"Building document index for '{self.document_dir}'")
+            return self._build_and_save_index()
+        
+        self.index = index
+        self.refresh()
+        return self.index
+    
+    def _build_and_save_index(self, report=None):
+        """Build the index with parallel ingestion and persist it."""
+        index = build_document_index(self.document_dir, max_workers=self.ingest_workers, report=report,
+                                     passage_size=self.passage_size, passage_overlap=self.passage_overlap,
+                                     dedup_threshold=self.dedup_threshold)
+        try:
+            index.save(self.index_path)
+        except OSError as e:
+            logger.warning(f"Could not save document index to '{self.index_path}': {e}")
+        return index
+    
+    def ingest(self, report=None):
+        """
+        Re-ingest the whole document directory and replace the index.
+        
+        Args:
+            report (IngestionReport, optional): Report to fill with throughput
+        """
+        with self._refresh_lock:
+            index = self._build_and_save_index(report=report)
+            with self._lock:
+                self.index = index
+            self._sync_vector_index()
+    
+    def refresh(self):
+        """
+        Bring the index up to date with the document directory.
+        
+        The directory is diffed against the index manifest (path, size, mtime,
+        hash). Files whose stat information changed are hashed, and only files
+        that are new or whose contents really changed are re-ingested; the
+        index is updated in place and saved if anything changed.
+        
+        Diffing and text extraction happen without holding the corpus lock,
+        so searches keep running; the lock is only held while the changes are
+        applied to the index. Changed files are extracted in-process rather
+        than in a process pool, since a refresh can run next to other threads.
+        
+        Returns:
+            dict: Lists of added, updated and removed paths
+        """
+        # Import at function level to avoid circular imports
+        from document_ingestion import ingest_documents
+        
+        # Only one refresh or rebuild changes the index at a time; searches
+        # only wait on self._lock
+        with self._refresh_lock:
+            changes = {"added": [], "updated": [], "removed": []}
+            
+            if self.index is None:
+                if list_document_files(self.document_dir):
+                    index = self._build_and_save_index()
+                    with self._lock:
+                        self.index = index
+                    self._sync_vector_index()
+                    changes["added"] = list(index.paths)
+                return changes
+            
+            with self._lock:
+                manifest = self.index.manifest()
+            current = list_document_files(self.document_dir)
+            touched = []
+            
+            for file_path in current:
+                stat = os.stat(file_path)
+                entry = manifest.get(file_path)
+                if entry is None:
+                    changes["added"].append(file_path)
+                elif (entry["size"], entry["mtime"]) != (stat.st_size, stat.st_mtime):
+                    if entry["size"] == stat.st_size and entry["hash"] == file_content_hash(file_path):
+                        touched.append((file_path, stat.st_size, stat.st_mtime))
+                    else:
+                        changes["updated"].append(file_path)
+            
+            current_paths = set(current)
+            for file_path in manifest:
+                if file_path not in current_paths:
+                    changes["removed"].append(file_path)
+            
+            # Documents collapsed into a changed or removed document are re-ingested
+            # so one of them can take its place
+            changed = set(changes["updated"] + changes["removed"])
+            with self._lock:
+                orphans = [duplicate for file_path in changed for duplicate in self.index.duplicates_of(file_path)
+                           if duplicate not in changed]
+            
+            batches = [list(ingest_documents(batch, max_workers=1))
+                       for batch in (changes["added"] + changes["updated"], orphans)]
+            
+            with self._lock:
+                for file_path, size, mtime in touched:
+                    self.index.touch_document(file_path, size, mtime)
+                for file_path in changes["removed"] + orphans:
+                    self.index.remove_document(file_path)
+                # Orphans go in a second pass: re-ingested alongside the updated
+                # originals, one could collapse into an original's old doc_id just
+                # before the original replaces it
+                for batch in batches:
+                    for document in batch:
+                        self.index.add_document(document["path"], document["text"], size=document["size"],
+                                                mtime=document["mtime"], content_hash=document["hash"])
+            
+            for file_path in changes["removed"]:
+                get_text_cache().invalidate(file_path)
+            
+            if touched or orphans or any(changes.values()):
+                logger.info(f"Refreshed document index for '{self.document_dir}': "
+                            f"{len(changes['added'])} added, {len(changes['updated'])} updated, "
+                            f"{len(changes['removed'])} removed")
+                try:
+                    self.index.save(self.index_path)
+                except OSError as e:
+                    logger.warning(f"Could not save document index to '{self.index_path}': {e}")
+            
+            if orphans or any(changes.values()):
+                self._sync_vector_index()
+            
+            return changes
+    
+    def _sync_vector_index(self):
+        """
+        Make the dense vector index match the document index, loading the saved
+        matrix when it was built from the same corpus and rebuilding it otherwise.
+        """
+        if self.retrieval_mode == "lexical" or not NUMPY_SUPPORT or self.index is None:
+            self.vector_index = None
+            return
+        
+        corpus_version = self.index.corpus_version()
+        if self.vector_index is not None and self.vector_index.corpus_version == corpus_version:
+            return
+        
+        vector_index = VectorIndex.load(self.vector_path, memory_map=self.dense_memory_map)
+        if vector_index is None or vector_index.corpus_version != corpus_version or vector_index.dim != self.dense_dim:
+            vector_index = VectorIndex.build(self.index, dim=self.dense_dim)
+            try:
+                vector_index.save(self.vector_path)
+                if self.dense_memory_map:
+                    vector_index = VectorIndex.load(self.vector_path, memory_map=True) or vector_index
+            except OSError as e:
+                logger.warning(f"Could not save vector index to '{self.vector_path}': {e}")
+        self.vector_index = vector_index
+    
+    def version(self):
+        """Return a string that changes whenever the corpus contents change."""
+        with self._lock:
+            if self.index is None:
+                return f"scan:{directory_signature(self.document_dir)}"
+            return self.index.corpus_version()
+    
+    def has_vectors(self):
+        """Return True if dense retrieval is available for this corpus."""
+        return self.vector_index is not None
+    
+    def search_lexical(self, query, top_k=3):
+        """
+        Rank passages with BM25, or scan the directory when there is no index.
+        
+        Returns:
+            list: (score, formatted passage) pairs; directory-scan matches score 0
+        """
+        with self._lock:
+            if self.index is not None:
+                return index_hits(self.index, query, top_k=top_k)
+        results = search_local_documents(query, top_k=top_k, document_dir=self.document_dir)
+        return [(0.0, result) for result in results or []]
+    
+    def search_dense(self, query, top_k=3, min_score=0.1):
+        """
+        Rank passages by hashing TF-IDF similarity.
+        
+        Returns:
+            list: (score, formatted passage) pairs; empty without dense vectors
+        """
+        with self._lock:
+            if self.vector_index is None:
+                return []
+            return dense_hits(query, self.vector_index, self.index, top_k=top_k, min_score=min_score)
+
+class KnowledgeIntegration:
+    """Class to handle knowledge integration from various sources."""
+    
+    def __init__(self, config=None, client=None):
+        """
+        Initialize the knowledge integration system.
+        
+        Args:
+            config (dict): Configuration options
+            client: LLM gateway used for AI generation
+        """
+        self.config = config or {}
+        self.client = client
+        self.document_dir = self.config.get("document_dir", DOCUMENT_DIR)
+        self.use_web_search = self.config.get("use_web_search", True)
+        self.web_search_endpoint = self.config.get("web_search_endpoint", GOOGLE_SEARCH_ENDPOINT)
+        self.reference_deadline = self.config.get("reference_deadline", 30)
+        self.hedged_retrieval = self.config.get("hedged_retrieval", False)
+        self.latency_budget = self.config.get("latency_budget", 10)
+        self.hedge_delay = self.config.get("hedge_delay", 0.5)
+        self._hedge_executor = None
+        self._corpus_executor = None
+        self.use_ai_generation = self.config.get("use_ai_generation", True)
+        self.use_index = self.config.get("use_index", True)
+        self.refresh_interval = self.config.get("refresh_interval", 60)
+        self.top_k = self.config.get("top_k", 3)
+        self.retrieval_mode = self.config.get("retrieval_mode", "hybrid")
+        self.dense_min_score = self.config.get("dense_min_score", 0.1)
+        self.query_cache = None
+        if self.config.get("query_cache", True):
+            self.query_cache = QueryCache(
+                db_path=self.config.get("query_cache_path", os.path.join(KNOWLEDGE_CACHE_DIR, "query_cache.sqlite")),
+                max_memory_entries=self.config.get("query_cache_size", 512),
+                ttls=self.config.get("cache_ttl"),
+                negative_ttls=self.config.get("negative_cache_ttl")
+            )
+        
+        # Lookups in progress, keyed by normalised query, shared by concurrent callers
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+        self.coalesced_lookups = 0
+        self._last_refresh = time.time()
+        self._refresh_thread = None
+        self._refresh_thread_lock = threading.Lock()
+        
+        # Ledger of references used in this debate
+        self.references = []
+        
+        logger.info(f"Knowledge Integration initialized with: document_dir={self.document_dir}, " +
+                    f"use_web_search={self.use_web_search}, use_ai_generation={self.use_ai_generation}")
+        
+        self.corpora = self._create_corpora()
+    
+    def _create_corpora(self):
+        """
+        Create a KnowledgeCorpus per configured shard.
+        
+        The "corpora" config key maps corpus names to a document directory or
+        to a dict with a "document_dir" and per-corpus overrides of the index
+        settings; without it there is a single corpus over document_dir.
+        
+        Returns:
+            list: The corpora, in configuration order
+        """
+        shards = self.config.get("corpora") or {"default": self.document_dir}
+        corpora = []
+        for name, shard in shards.items():
+            shard = {"document_dir": shard} if isinstance(shard, str) else dict(shard)
+            settings = dict(self.config)
+            if len(shards) > 1:
+                # A single index_path cannot serve several corpora
+                settings.pop("index_path", None)
+            settings.update(shard)
+            corpora.append(KnowledgeCorpus(name, settings["document_dir"], settings))
+        return corpora
+    
+    def ingest_documents(self, max_workers=None):
+        """
+        Re-ingest every corpus across a process pool and replace the indexes
+        with the result.
+        
+        Args:
+            max_workers (int, optional): Worker processes; defaults to the
+                ingest_workers config value or the CPU count
+            
+        Returns:
+            IngestionReport: File counts and throughput (files/s, MB/s)
+        """
+        # Import at function level to avoid circular imports
+        from document_ingestion import IngestionReport
+        
+        report = IngestionReport()
+        for corpus in self.corpora:
+            if max_workers is not None:
+                corpus.ingest_workers = max_workers
+            corpus.ingest(report=report)
+        report.end_time = time.time()
+        logger.info(report.summary())
+        return report
+    
+    def refresh_documents(self):
+        """
+        Bring every corpus index up to date with its document directory;
+        see KnowledgeCorpus.refresh().
+        
+        Returns:
+            dict: Lists of added, updated and removed paths
+        """
+        self._last_refresh = time.time()
+        changes = {"added": [], "updated": [], "removed": []}
+        for corpus in self.corpora:
+            if not corpus.use_index:
+                continue
+            for kind, paths in corpus.refresh().items():
+                changes[kind].extend(paths)
+        return changes
+    
+    def _maybe_refresh(self):
+        """
+        Start a background refresh of the index if refresh_interval seconds
+        have passed since the last check and none is running. Lookups don't
+        wait for it; they keep searching the current index.
+        """
+        if not self.use_index or not self.refresh_interval:
+            return
+        with self._refresh_thread_lock:
+            if time.time() - self._last_refresh < self.refresh_interval:
+                return
+            if self._refresh_thread is not None and self._refresh_thread.is_alive():
+                return
+            self._last_refresh = time.time()
+            self._refresh_thread = threading.Thread(target=self._refresh_in_background,
+                                                    name="knowledge-refresh", daemon=True)
+            self._refresh_thread.start()
+    
+    def _refresh_in_background(self):
+        """Body of the background refresh thread."""
+        try:
+            self.refresh_documents()
+        except Exception as e:
+            logger.error(f"Error refreshing document index: {e}")
+    
+    def retrieve_knowledge(self, query, track=True, generate=True):
         """
         Retrieve knowledge based on the query, with fallbacks.
         
+        Concurrent calls for the same (normalised) query share a single
+        lookup: the first caller runs it and the others wait for its result.
+        A caller passing generate=False also joins a lookup that may generate
+        (such as a prefetch), so the query is generated at most once. A caller
+        that may generate but joined a lookup that could not finishes the
+        lookup itself, with the local and web misses already cached.
+        
         Args:
             query (str): The search query
+            track (bool): Record the result in the reference ledger
+            generate (bool): Fall back to AI generation if it is enabled; pass
+                False to batch the generation with generate_knowledge_batch()
             
         Returns:
             list: List of knowledge results or None
         """
+        key = normalize_query(query)
+        with self._inflight_lock:
+            entry = self._inflight.get(key)
+            leader = entry is None
+            if leader:
+                entry = (Future(), generate)
+                self._inflight[key] = entry
+            else:
+                self.coalesced_lookups += 1
+        future, leader_generates = entry
+        
+        if leader:
+            try:
+                future.set_result(self._retrieve_knowledge(query, generate))
+            except BaseException as e:
+                future.set_exception(e)
+            finally:
+                with self._inflight_lock:
+                    del self._inflight[key]
+        else:
+            logger.info(f"Waiting for in-flight lookup of '{query}'")
+        
+        source_type, results = future.result()
+        if not results and generate and not leader_generates and self.use_ai_generation:
+            source_type, results = self._retrieve_knowledge(query, generate)
+        if track and results:
+            self._track_reference(query, source_type, results[0])
+        return results
+    
+    def prefetch(self, queries):
+        """
+        Start looking up queries in the background so later requests for them
+        are answered from the query cache (or join the lookup still in flight).
+        Prefetched results are not recorded in the reference ledger.
+        
+        Args:
+            queries (list): Queries to warm
+            
+        Returns:
+            list: Futures of the lookups, one per distinct query
+        """
+        queries = list(dict.fromkeys(query for query in queries if query))
+        if not queries:
+            return []
+        executor = ThreadPoolExecutor(max_workers=min(len(queries), REFERENCE_WORKERS),
+                                      thread_name_prefix="knowledge-prefetch")
+        futures = [executor.submit(self.retrieve_knowledge, query, track=False) for query in queries]
+        executor.shutdown(wait=False)
+        logger.info(f"Prefetching knowledge for {len(futures)} queries")
+        return futures
+    
+    def _retrieve_knowledge(self, query, generate=True):
+        """
+        Run one lookup through the local, web and AI tiers; see retrieve_knowledge().
+        
+        Returns:
+            tuple: (reference label, results), or (None, None) if nothing was found
+        """
         logger.info(f"Knowledge request: '{query}'")
         
         # Record start time for performance tracking
         start_time = time.time()
         
+        # Pick up added, changed or deleted documents in the background
+        self._maybe_refresh()
+        
+        if self.hedged_retrieval:
+            return self._retrieve_hedged(query, start_time, generate)
+        
         # Try local documents first
-        local_results = search_local_documents(query)
+        local_results = self._lookup_tier(query, "local", self._search_local)
         if local_results:
             logger.info(f"Found {len(local_results)} local document results in {time.time() - start_time:.2f}s")
             
-            # Track the reference
-            self._track_reference(query, "Local Document", local_results[0])
-            
-            return local_results
+            return "Local Document", local_results
         
         # Fall back to web search if enabled
         if self.use_web_search:
             logger.info("No local results, trying web search")
-            web_results = search_web(query)
+            web_results = self._lookup_tier(query, "web", lambda q: search_web(q, endpoint=self.web_search_endpoint))
             if web_results:
                 logger.info(f"Found {len(web_results)} web results in {time.time() - start_time:.2f}s")
                 
-                # Track the reference
-                self._track_reference(query, "Web Search", web_results[0])
-                
-                return web_results
+                return "Web Search", web_results
                 
             logger.warning("Web search returned no results")
         
         # Fall back to AI generation if enabled
-        if self.use_ai_generation:
+        if self.use_ai_generation and generate:
             logger.info("No local or web results, generating knowledge with AI")
-            generated_results = generate_knowledge(query, self.client)
+            generated_results = self._lookup_tier(query, "ai", lambda q: generate_knowledge(q, self.client))
             if generated_results:
                 logger.info(f"Generated AI knowledge in {time.time() - start_time:.2f}s")
                 
-                # Track the reference
-                self._track_reference(query, "AI Generated", generated_results[0])
-                
-                return generated_results
+                return "AI Generated", generated_results
                 
             logger.warning("AI generation failed")
         
         logger.warning(f"No knowledge found for '{query}' after trying all sources")
-        return None
+        return None, None
+    
+    def generate_knowledge_batch(self, queries, track=True):
+        """
+        Generate AI knowledge for several queries in one call, answering
+        queries already in the query cache without the model.
+        
+        Args:
+            queries (list): The queries to generate knowledge for
+            track (bool): Record the results in the reference ledger
+            
+        Returns:
+            dict: query -> list of results, or None
+        """
+        _, version = self._cache_version("ai")
+        results = {}
+        pending = []
+        for query in queries:
+            cached = self.query_cache.get(query, "ai", version) if self.query_cache is not None else None
+            if cached:
+                results[query] = cached
+            else:
+                pending.append(query)
+        
+        if pending:
+            for query, generated in generate_knowledge_batch(pending, self.client).items():
+                if generated and self.query_cache is not None:
+                    self.query_cache.put(query, "ai", generated, version)
+                results[query] = generated
+        
+        if track:
+            for query, generated in results.items():
+                if generated:
+                    self._track_reference(query, "AI Generated", generated[0])
+        return results
+    
+    def _knowledge_tiers(self, generate=True):
+        """Return the enabled (tier, reference label, fetch) source tiers in priority order."""
+        tiers = [("local", "Local Document", self._search_local)]
+        if self.use_web_search:
+            tiers.append(("web", "Web Search", lambda q: search_web(q, endpoint=self.web_search_endpoint)))
+        if self.use_ai_generation and generate:
+            tiers.append(("ai", "AI Generated", lambda q: generate_knowledge(q, self.client)))
+        return tiers
+    
+    def _retrieve_hedged(self, query, start_time, generate=True):
+        """
+        Race the source tiers under the latency budget.
+        
+        The local tier gets a head start of hedge_delay seconds; if it has not
+        produced results by then, the web and AI tiers are launched in
+        parallel. A tier's results are used as soon as every higher-priority
+        tier has come back empty; once the budget is spent the best results
+        that have arrived win. Losing tiers that have not started are
+        cancelled, and those already running finish in the background, which
+        still fills the query cache for the next lookup.
+        
+        Args:
+            query (str): The search query
+            start_time (float): When the lookup started
+            generate (bool): Include the AI generation tier
+            
+        Returns:
+            tuple: (reference label, results) of the winning tier, or (None, None)
+        """
+        tiers = self._knowledge_tiers(generate)
+        deadline = start_time + self.latency_budget
+        
+        with self._inflight_lock:
+            if self._hedge_executor is None:
+                self._hedge_executor = ThreadPoolExecutor(max_workers=REFERENCE_WORKERS * len(tiers),
+                                                          thread_name_prefix="knowledge-tier")
+        executor = self._hedge_executor
+        
+        tier, _, fetch = tiers[0]
+        futures = [executor.submit(self._lookup_tier, query, tier, fetch)]
+        wait(futures, timeout=self.hedge_delay)
+        if not (futures[0].done() and self._tier_results(futures[0])):
+            futures += [executor.submit(self._lookup_tier, query, tier, fetch) for tier, _, fetch in tiers[1:]]
+        
+        winner = None
+        while winner is None:
+            pending = [future for future in futures if not future.done()]
+            # Highest-priority tier with results, unless a tier above it is still running
+            for position, future in enumerate(futures):
+                if not future.done():
+                    break
+                if self._tier_results(future):
+                    winner = position
+                    break
+            if winner is not None or not pending:
+                break
+            
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                # Budget spent: settle for the best results that have arrived
+                winner = next((position for position, future in enumerate(futures)
+                               if future.done() and self._tier_results(future)), None)
+                logger.warning(f"Latency budget of {self.latency_budget}s spent for '{query}'")
+                break
+            wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+        
+        for future in futures:
+            future.cancel()
+        
+        if winner is None:
+            logger.warning(f"No knowledge found for '{query}' after trying all sources")
+            return None, None
+        
+        tier, label, _ = tiers[winner]
+        results = futures[winner].result()
+        logger.info(f"Using {len(results)} {tier} results for '{query}' after {time.time() - start_time:.2f}s")
+        return label, results
+    
+    def _tier_results(self, future):
+        """Return the results of a finished tier lookup, or None if it failed."""
+        try:
+            return future.result()
+        except Exception as e:
+            logger.error(f"Knowledge tier lookup failed: {e}")
+            return None
+    
+    def _cache_version(self, tier):
+        """
+        Return (cacheable, version) for a tier's query cache entries.
+        
+        Local results depend on the indexed corpora and retrieval settings, so
+        they are keyed by corpus versions and invalidate when one changes; in
+        directory-scan mode the version is derived from the files' stat
+        information. Web and AI results only expire; web results are also
+        keyed by endpoint so a stand-in server's answers never mix with Google's.
+        """
+        if tier == "web":
+            return True, self.web_search_endpoint
+        if tier != "local":
+            return True, None
+        versions = ",".join(f"{corpus.name}={corpus.version()}" for corpus in self.corpora)
+        return True, f"{versions}:{self.retrieval_mode}:{self.top_k}"
+    
+    def _lookup_tier(self, query, tier, fetch):
+        """
+        Resolve a query against one source tier through the query cache.
+        
+        Args:
+            query (str): The search query
+            tier (str): "local", "web" or "ai"
+            fetch (callable): Performs the uncached lookup for the tier
+            
+        Returns:
+            list: Results from the cache or the tier; empty or None when the
+                tier has nothing
+        """
+        cacheable, version = self._cache_version(tier)
+        if self.query_cache is None or not cacheable:
+            return fetch(query)
+        
+        results = self.query_cache.get(query, tier, version)
+        if results is not None:
+            if results:
+                logger.info(f"Query cache hit for '{query}' ({tier})")
+            else:
+                logger.info(f"Cached miss for '{query}' ({tier}), skipping the tier")
+            return results
+        
+        results = fetch(query)
+        # An empty list is a genuine miss and is cached; None means the tier failed
+        if results is not None:
+            self.query_cache.put(query, tier, results, version)
+        return results
+    
+    def get_stats(self):
+        """Return knowledge retrieval statistics for the run."""
+        duplicates = sum(corpus.index.duplicate_count() for corpus in self.corpora if corpus.index is not None)
+        documents = sum(len(corpus) for corpus in self.corpora)
+        stats = {
+            "documents_indexed": documents,
+            "near_duplicates": duplicates,
+            "dedup_ratio": duplicates / documents if documents else 0.0,
+            "corpora": {corpus.name: len(corpus) for corpus in self.corpora},
+            "coalesced_lookups": self.coalesced_lookups
+        }
+        if self.query_cache is not None:
+            stats["query_cache"] = self.query_cache.stats()
+        return stats
+    
+    def _search_local(self, query):
+        """
+        Search the local corpora with the configured retrieval mode.
+        
+        "lexical" ranks passages with BM25, "dense" uses the hashing TF-IDF
+        vectors, and "hybrid" tries BM25 first and falls back to the vectors
+        when no passage matches enough query terms. Every corpus is searched
+        in parallel and the results are merged by score.
+        """
+        dense_ready = any(corpus.has_vectors() for corpus in self.corpora)
+        if self.retrieval_mode != "dense" or not dense_ready:
+            results = self._search_corpora(lambda corpus: corpus.search_lexical(query, top_k=self.top_k))
+            if results or self.retrieval_mode == "lexical" or not dense_ready:
+                return results
+        
+        return self._search_corpora(
+            lambda corpus: corpus.search_dense(query, top_k=self.top_k, min_score=self.dense_min_score)
+        )
+    
+    def _search_corpora(self, search):
+        """
+        Run a search on every corpus and merge the results.
+        
+        Args:
+            search (callable): Takes a KnowledgeCorpus and returns (score, result) pairs
+            
+        Returns:
+            list: The top_k results across all corpora, best first
+        """
+        if len(self.corpora) == 1:
+            hits = search(self.corpora[0])
+        else:
+            with self._inflight_lock:
+                if self._corpus_executor is None:
+                    self._corpus_executor = ThreadPoolExecutor(max_workers=min(len(self.corpora), REFERENCE_WORKERS),
+                                                               thread_name_prefix="knowledge-corpus")
+            hits = []
+            for corpus_hits in self._corpus_executor.map(search, self.corpora):
+                hits.extend(corpus_hits)
+        hits.sort(key=lambda hit: hit[0], reverse=True)
+        return [result for _, result in hits[:self.top_k]]
     
     def _track_reference(self, query, source_type, content):
         """Track a reference for documentation."""
-        if not self.client or not hasattr(self.client, 'knowledge_references'):
-            return
-            
         # Truncate content for storage
         content_preview = content[:200] + "..." if len(content) > 200 else content
         
-        self.client.knowledge_references.append({
+        self.references.append({
             "query": query,
             "source_type": source_type,
             "source": content_preview,
             "timestamp": time.time()
         })
+    
+    def record_reference(self, query, source, agent_name, phase):
+        """
+        Record a reference used in an agent's message.
+        
+        Args:
+            query (str): The reference query
+            source (str): Text of the reference, truncated for storage
+            agent_name (str): Name of the agent that used the reference
+            phase (str): Debate phase in which it was used
+        """
+        self.references.append({
+            "query": query,
+            "source": source,
+            "agent": agent_name,
+            "phase": phase
+        })
+
+def _resolve_references(queries, knowledge_integration, deadline):
+    """
+    Resolve reference queries through the local and web tiers concurrently,
+    then generate AI knowledge for every query still unresolved in one
+    batched call.
+    
+    Args:
+        queries (list): Distinct reference queries
+        knowledge_integration (KnowledgeIntegration): Knowledge integration instance
+        deadline (float): Seconds to wait for all lookups
+        
+    Returns:
+        dict: query -> ("reference" or "ai", results); queries that found
+            nothing or did not finish in time are left out
+    """
+    end_time = time.time() + deadline
+    executor = ThreadPoolExecutor(max_workers=min(len(queries), REFERENCE_WORKERS))
+    futures = {}
+    for query in queries:
+        logger.info(f"Processing reference request: '{query}'")
+        futures[query] = executor.submit(knowledge_integration.retrieve_knowledge, query, generate=False)
+    wait(futures.values(), timeout=deadline)
+    # Don't hold the message up for stragglers
+    executor.shutdown(wait=False, cancel_futures=True)
+    
+    resolved = {}
+    pending = []
+    for query, future in futures.items():
+        if not future.done():
+            logger.warning(f"Reference request '{query}' did not finish within {deadline}s")
+            continue
+        try:
+            results = future.result()
+        except Exception as e:
+            logger.error(f"Error resolving reference '{query}': {e}")
+            continue
+        if results:
+            resolved[query] = ("reference", results)
+        else:
+            pending.append(query)
+    
+    if pending:
+        # AI generation counts as a retrieved reference when it is an enabled tier,
+        # and as a last-resort fallback otherwise
+        kind = "reference" if knowledge_integration.use_ai_generation else "ai"
+        executor = ThreadPoolExecutor(max_workers=1)
+        future = executor.submit(knowledge_integration.generate_knowledge_batch, pending,
+                                 track=knowledge_integration.use_ai_generation)
+        executor.shutdown(wait=False)
+        try:
+            generated = future.result(timeout=max(0, end_time - time.time()))
+        except Exception as e:
+            logger.warning(f"AI generation for {len(pending)} references did not finish: {e!r}")
+            generated = {}
+        for query, results in generated.items():
+            if results:
+                resolved[query] = (kind, results)
+    
+    return resolved
 
-def process_reference_requests(text, knowledge_integration, agent_name="unknown", phase="unknown"):
+def process_reference_requests(text, knowledge_integration, agent_name="unknown", phase="unknown", deadline=None):
     """
     Process reference requests in the format [REF: query] and replace them with information.
     Also track references for documentation.
     
+    Distinct queries are resolved concurrently, so a message costs as much as
+    its slowest lookup rather than the sum, and queries that need AI
+    generation share one batched call; lookups still running when the
+    deadline passes are reported as not found.
+    
     Args:
         text (str): Text potentially containing reference requests
         knowledge_integration (KnowledgeIntegration): Knowledge integration instance
         agent_name (str): Name of the agent making the request
         phase (str): Current phase of the debate
+        deadline (float, optional): Seconds to wait for all lookups; defaults to
+            the integration's reference_deadline
         
     Returns:
         str: Text with reference requests replaced with actual information
@@ -343,80 +1581,131 @@ def process_reference_requests(text, knowledge_integration, agent_name="unknown"
     
     logger.info(f"Found {len(matches)} reference requests in text from {agent_name}")
     
-    for query in matches:
-        query = query.strip()
-        logger.info(f"Processing reference request: '{query}'")
-        
-        # Get information from knowledge base
-        results = knowledge_integration.retrieve_knowledge(query)
+    queries = list(dict.fromkeys(query.strip() for query in matches))
+    if deadline is None:
+        deadline = getattr(knowledge_integration, "reference_deadline", 30)
+    
+    resolved = _resolve_references(queries, knowledge_integration, deadline)
+    
+    replacements = {}
+    for query in queries:
+        kind, results = resolved.get(query, (None, None))
         
-        if results:
+        if kind == "reference":
             # Format the reference information
             reference_text = f"[Reference for '{query}': "
             reference_text += results[0]
             if len(results) > 1:
                 reference_text += f" (+ {len(results)-1} more references)"
             reference_text += "]"
-            
-            # Replace the reference request with the information
-            text = text.replace(f"[REF:{query}]", reference_text)
+            replacements[query] = reference_text
             
             # Track this reference for later documentation
-            if hasattr(knowledge_integration, 'client') and hasattr(knowledge_integration.client, 'knowledge_references'):
-                knowledge_integration.client.knowledge_references.append({
-                    "query": query,
-                    "source": results[0][:200] + "..." if len(results[0]) > 200 else results[0],
-                    "agent": agent_name,
-                    "phase": phase
-                })
+            knowledge_integration.record_reference(
+                query,
+                results[0][:200] + "..." if len(results[0]) > 200 else results[0],
+                agent_name,
+                phase
+            )
             
             logger.info(f"Successfully replaced reference with information")
-        else:
-            # Replace with AI-generated knowledge as a last resort
-            ai_knowledge = generate_knowledge(query, knowledge_integration.client)
+        elif kind == "ai":
+            # AI-generated knowledge was used as a last resort
+            replacements[query] = f"[AI-generated knowledge for '{query}': {results[0]}]"
             
-            if ai_knowledge:
-                reference_text = f"[AI-generated knowledge for '{query}': {ai_knowledge[0]}]"
-                text = text.replace(f"[REF:{query}]", reference_text)
+            # Track this reference
+            knowledge_integration.record_reference(
+                query, "AI-generated: " + results[0][:150] + "...", agent_name, phase
+            )
                 
-                # Track this reference
-                if hasattr(knowledge_integration, 'client') and hasattr(knowledge_integration.client, 'knowledge_references'):
-                    knowledge_integration.client.knowledge_references.append({
-                        "query": query,
-                        "source": "AI-generated: " + ai_knowledge[0][:150] + "...",
-                        "agent": agent_name,
-                        "phase": phase
-                    })
-                    
-                logger.info(f"Used AI-generated knowledge as fallback")
-            else:
-                # If all else fails, just remove the reference request
-                text = text.replace(f"[REF:{query}]", f"[No reference information found for '{query}']")
-                logger.warning(f"No reference information found for '{query}'")
+            logger.info(f"Used AI-generated knowledge as fallback")
+        else:
+            # If all else fails, just remove the reference request
+            replacements[query] = f"[No reference information found for '{query}']"
+            logger.warning(f"No reference information found for '{query}'")
     
-    return text
+    # Substitute every request in a single pass
+    return re.sub(pattern, lambda match: replacements.get(match.group(1).strip(), match.group(0)), text)
+
+# The knowledge service of the debate running in the current context. A
+# ContextVar follows a debate into its asyncio tasks and asyncio.to_thread()
+# workers without leaking into debates running in other threads or tasks.
+_knowledge_service = contextvars.ContextVar("knowledge_service", default=None)
+_default_service = None
+_default_service_lock = threading.Lock()
+
+def set_knowledge_service(knowledge_integration):
+    """
+    Install the knowledge service used by retrieve_knowledge() in the current context.
+    
+    Args:
+        knowledge_integration (KnowledgeIntegration): The service to use, or
+            None to go back to the default service
+            
+    Returns:
+        contextvars.Token: Token for restoring the previous service with
+            reset_knowledge_service()
+    """
+    return _knowledge_service.set(knowledge_integration)
+
+def reset_knowledge_service(token):
+    """Restore the knowledge service that was installed before set_knowledge_service()."""
+    _knowledge_service.reset(token)
+
+@contextmanager
+def knowledge_service(knowledge_integration):
+    """
+    Route retrieve_knowledge() calls in the current context to a debate's
+    knowledge service for the duration of the block.
+    
+    A service already installed in this context is kept, and the previous
+    state is restored when the block exits.
+    
+    Args:
+        knowledge_integration (KnowledgeIntegration): The debate's service, or None
+    """
+    if knowledge_integration is None or _knowledge_service.get() is not None:
+        yield
+        return
+    token = set_knowledge_service(knowledge_integration)
+    try:
+        yield
+    finally:
+        reset_knowledge_service(token)
+
+def get_knowledge_service():
+    """
+    Return the knowledge service installed in the current context, or a
+    default KnowledgeIntegration over DOCUMENT_DIR shared by the process.
+    
+    Returns:
+        KnowledgeIntegration: The service to use
+    """
+    service = _knowledge_service.get()
+    if service is not None:
+        return service
+    
+    global _default_service
+    with _default_service_lock:
+        if _default_service is None:
+            _default_service = KnowledgeIntegration()
+        return _default_service
 
 # Function to retrieve knowledge (used by agents)
-def retrieve_knowledge(query):
+def retrieve_knowledge(query, track=True):
     """
     Simplified function to retrieve knowledge based on a query.
     This is used directly by agents that don't have access to the KnowledgeIntegration instance.
     
+    Lookups go through the knowledge service of the debate running in the
+    current context (see knowledge_service()), so they share its client,
+    index, query cache, settings and reference ledger.
+    
     Args:
         query (str): The search query
+        track (bool): Record the result in the service's reference ledger
         
     Returns:
         list: List of knowledge results or None
     """
-    # Try local documents
-    local_results = search_local_documents(query)
-    if local_results:
-        return local_results
-    
-    # Try web search
-    web_results = search_web(query)
-    if web_results:
-        return web_results
-    
-    # Try AI generation as a last resort
-    return generate_knowledge(query)
\ No newline at end of file
+    return get_knowledge_service().retrieve_knowledge(query, track=track)
@@ -0,0 +1,165 @@
+"""
+On-disk cache of chat completion responses.
+
+Re-running a debate on the same problem with the same agents repeats many
+prompts exactly (the welcome, Phase 1 perspectives, sentiment analysis).
+With the cache enabled those calls are answered from a SQLite table
+instead of the API. Entries are keyed by a hash of the model, messages and
+sampling parameters, and the least recently used responses are evicted
+once the stored text exceeds the size budget.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+
+logger = logging.getLogger("LLMCache")
+
+def response_key(model, messages, max_tokens=None, temperature=None, **params):
+    """
+    Return the cache key for a chat completion request.
+
+    Args:
+        model (str): Model name
+        messages (list): Chat messages
+        max_tokens (int, optional): Completion token limit
+        temperature (float, optional): Sampling temperature
+        **params: Any other request parameters (e.g. response_format)
+
+    Returns:
+        str: SHA-256 hex digest of the canonical request
+    """
+    request = {
+        "model": model,
+        "messages": messages,
+        "max_tokens": max_tokens,
+        "temperature": temperature,
+        "params": params
+    }
+    raw = json.dumps(request, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+class LLMResponseCache:
+    """Size-bounded SQLite cache of completion text with LRU eviction."""
+
+    def __init__(self, db_path, max_bytes=256 * 1024 * 1024):
+        """
+        Open (or create) the cache database.
+
+        Args:
+            db_path (str): SQLite file
+            max_bytes (int): Upper bound on the total size of stored responses
+        """
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "key TEXT PRIMARY KEY, model TEXT, response TEXT, bytes INTEGER, "
+            "created REAL, last_access REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS llm_cache_access ON llm_cache (last_access)")
+        self._db.commit()
+        self._bytes = self._db.execute("SELECT COALESCE(SUM(bytes), 0) FROM llm_cache").fetchone()[0]
+
+    def get(self, key):
+        """
+        Look up a cached response.
+
+        Args:
+            key (str): Key from response_key()
+
+        Returns:
+            str: The cached completion text, or None on a miss
+        """
+        with self._lock:
+            try:
+                row = self._db.execute("SELECT response FROM llm_cache WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    self.misses += 1
+                    return None
+                self._db.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (time.time(), key))
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"Could not read LLM cache entry: {e}")
+                self.misses += 1
+                return None
+            self.hits += 1
+            return row[0]
+
+    def put(self, key, model, response):
+        """
+        Store a response and evict old entries if over budget.
+
+        Args:
+            key (str): Key from response_key()
+            model (str): Model that produced the response
+            response (str): Completion text
+        """
+        if response is None:
+            return
+        size = len(response.encode("utf-8"))
+        now = time.time()
+
+        with self._lock:
+            try:
+                row = self._db.execute("SELECT bytes FROM llm_cache WHERE key = ?", (key,)).fetchone()
+                self._db.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, model, response, bytes, created, last_access) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, model, response, size, now, now)
+                )
+                self._bytes += size - (row[0] if row else 0)
+                self._evict()
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"Could not write LLM cache entry: {e}")
+
+    def _evict(self):
+        """Drop least recently used responses until the cache fits in max_bytes."""
+        while self._bytes > self.max_bytes:
+            rows = self._db.execute(
+                "SELECT key, bytes FROM llm_cache ORDER BY last_access LIMIT 64"
+            ).fetchall()
+            if not rows:
+                self._bytes = 0
+                return
+            for key, size in rows:
+                if self._bytes <= self.max_bytes:
+                    break
+                self._db.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._bytes -= size
+                self.evictions += 1
+
+    def clear(self):
+        """Remove every cached response."""
+        with self._lock:
+            self._db.execute("DELETE FROM llm_cache")
+            self._db.commit()
+            self._bytes = 0
+
+    def stats(self):
+        """Return hit/miss counters, the hit rate and the current cache size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            entries = self._db.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": entries,
+                "bytes": self._bytes
+            }
@@ -0,0 +1,452 @@
+"""
+Single entry point for every chat completion the debate system makes.
+
+All call sites share one OpenAI client (and so one keep-alive connection
+pool). Each call waits on token buckets sized to the account's requests-
+and tokens-per-minute limits, runs with a timeout, and retries 429, 5xx,
+timeout and connection errors with jittered exponential backoff, so a
+transient failure part-way through a debate no longer ends the run.
+Responses can optionally be served from an on-disk cache (llm_cache.py)
+so repeated prompts cost nothing.
+"""
+
+import os
+import time
+import asyncio
+import random
+import logging
+import threading
+
+import openai
+from openai import AsyncOpenAI, OpenAI
+
+from llm_cache import LLMResponseCache, response_key
+from mock_llm import AsyncMockChatClient, MockChatClient
+
+logger = logging.getLogger("LLMGateway")
+
+LLM_RPM_LIMIT = int(os.getenv("LLM_RPM_LIMIT", "500"))
+LLM_TPM_LIMIT = int(os.getenv("LLM_TPM_LIMIT", "30000"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "5"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "1.0"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "30"))
+LLM_CACHE_MAX_MB = int(os.getenv("LLM_CACHE_MAX_MB", "256"))
+
+DEFAULT_MODEL = "gpt-4o"
+
+class LLMError(Exception):
+    """A chat completion failed and was not (or could no longer be) retried."""
+
+class LLMRateLimitError(LLMError):
+    """The API kept answering 429 until the retries ran out."""
+
+class LLMTimeoutError(LLMError):
+    """The call kept timing out until the retries ran out."""
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at a per-minute rate."""
+
+    def __init__(self, per_minute):
+        """
+        Initialize a full bucket.
+
+        Args:
+            per_minute (float): Capacity, refilled over one minute; 0 or None
+                disables the limit
+        """
+        self.unlimited = not per_minute or per_minute <= 0
+        self.capacity = 0.0 if self.unlimited else float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount=1):
+        """
+        Take tokens from the bucket, blocking until they are available.
+
+        Requests larger than the bucket wait for a full bucket and take it all.
+
+        Args:
+            amount (float): Tokens to take
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        waited = 0.0
+        while True:
+            delay = self.try_acquire(amount)
+            if not delay:
+                return waited
+            time.sleep(delay)
+            waited += delay
+
+    async def acquire_async(self, amount=1):
+        """Like acquire(), but waits with asyncio.sleep() instead of blocking the thread."""
+        waited = 0.0
+        while True:
+            delay = self.try_acquire(amount)
+            if not delay:
+                return waited
+            await asyncio.sleep(delay)
+            waited += delay
+
+    def try_acquire(self, amount=1):
+        """
+        Take tokens if they are available now.
+
+        Returns:
+            float: 0 if the tokens were taken, else the seconds until they will be
+        """
+        if self.unlimited:
+            return 0.0
+        amount = min(amount, self.capacity)
+        with self._lock:
+            self._refill()
+            if self.tokens >= amount:
+                self.tokens -= amount
+                return 0.0
+            return (amount - self.tokens) / self.rate
+
+    def adjust(self, amount):
+        """Return (positive) or charge (negative) tokens after the fact."""
+        if self.unlimited:
+            return
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+def estimate_tokens(messages, max_tokens):
+    """Estimate the tokens a call will consume: about 4 characters per prompt token plus the completion budget."""
+    prompt_chars = sum(len(message.get("content") or "") for message in messages)
+    return prompt_chars // 4 + len(messages) * 4 + (max_tokens or 0)
+
+def retry_after(error):
+    """Return the Retry-After delay (in seconds) sent with an API error, if any."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+def is_retryable(error):
+    """Return True for errors worth retrying: 429, 5xx, timeouts and dropped connections."""
+    if isinstance(error, (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError)):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code >= 500
+
+class LLMGateway:
+    """Rate-limited, retrying chat completion client shared by the whole process."""
+
+    def __init__(self, client=None, rpm_limit=LLM_RPM_LIMIT, tpm_limit=LLM_TPM_LIMIT, timeout=LLM_TIMEOUT,
+                 max_retries=LLM_MAX_RETRIES, backoff_base=LLM_BACKOFF_BASE, backoff_max=LLM_BACKOFF_MAX,
+                 cache=None):
+        """
+        Initialize the gateway.
+
+        Args:
+            client (optional): OpenAI client, or anything with the same
+                chat.completions.create() surface such as MockChatClient; by
+                default an OpenAI client is created on first use from OPENAI_API_KEY
+            rpm_limit (int): Requests per minute allowed; 0 disables the limit
+            tpm_limit (int): Tokens (prompt plus completion) per minute allowed; 0 disables the limit
+            timeout (float): Default per-call timeout in seconds
+            max_retries (int): Retries after the first attempt
+            backoff_base (float): First backoff delay in seconds, doubled per retry
+            backoff_max (float): Upper bound on a single backoff delay
+            cache (LLMResponseCache, optional): Response cache consulted before
+                calling the API; disabled when None
+        """
+        self._client = client
+        self._client_lock = threading.Lock()
+        self.requests = TokenBucket(rpm_limit)
+        self.tokens = TokenBucket(tpm_limit)
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.cache = cache
+        self._stats_lock = threading.Lock()
+        self.calls = 0
+        self.retries = 0
+        self.failures = 0
+        self.throttled_seconds = 0.0
+        self.total_tokens = 0
+
+    @property
+    def client(self):
+        """The underlying OpenAI client, created on first use."""
+        with self._client_lock:
+            if self._client is None:
+                api_key = os.getenv("OPENAI_API_KEY")
+                if not api_key:
+                    raise LLMError("OPENAI_API_KEY is not set")
+                # Retries are handled here so they share the rate limiter
+                self._client = OpenAI(api_key=api_key, max_retries=0)
+            return self._client
+
+    def _backoff(self, attempt, error):
+        """Return the delay before the next attempt: Retry-After if sent, else full-jitter exponential."""
+        delay = retry_after(error)
+        if delay is None:
+            delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        return min(delay, self.backoff_max)
+
+    def chat(self, messages, model=DEFAULT_MODEL, max_tokens=None, temperature=None, timeout=None, **kwargs):
+        """
+        Run a chat completion and return the text of the first choice.
+
+        Args:
+            messages (list): Chat messages ({"role": ..., "content": ...})
+            model (str): Model name
+            max_tokens (int, optional): Completion token limit
+            temperature (float, optional): Sampling temperature; API default if None
+            timeout (float, optional): Per-call timeout; defaults to the gateway's
+            **kwargs: Further chat.completions.create() arguments (e.g. response_format)
+
+        Returns:
+            str: The completion text, from the response cache when enabled
+
+        Raises:
+            LLMRateLimitError, LLMTimeoutError, LLMError: When the call fails
+                permanently or the retries run out
+        """
+        params, estimate, key, cached = self._prepare(messages, model, max_tokens, temperature, kwargs)
+        if cached is not None:
+            return cached
+
+        attempt = 0
+        while True:
+            waited = self.requests.acquire(1) + self.tokens.acquire(estimate)
+            try:
+                response = self.client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    timeout=timeout or self.timeout,
+                    **params
+                )
+            except Exception as e:
+                delay = self._failed(e, attempt, model, waited)
+                time.sleep(delay)
+                attempt += 1
+                continue
+            return self._succeeded(response, model, estimate, waited, key)
+
+    def _prepare(self, messages, model, max_tokens, temperature, kwargs):
+        """
+        Build the request parameters and token estimate, and consult the response cache.
+
+        Returns:
+            tuple: (params, token estimate, cache key or None, cached text or None)
+        """
+        params = dict(kwargs)
+        if max_tokens is not None:
+            params["max_tokens"] = max_tokens
+        if temperature is not None:
+            params["temperature"] = temperature
+        estimate = estimate_tokens(messages, max_tokens)
+
+        key = None
+        cached = None
+        if self.cache is not None:
+            key = response_key(model, messages, max_tokens=max_tokens, temperature=temperature, **kwargs)
+            cached = self.cache.get(key)
+        return params, estimate, key, cached
+
+    def _failed(self, error, attempt, model, waited):
+        """
+        Record a failed attempt and return the delay before retrying.
+
+        Raises:
+            LLMRateLimitError, LLMTimeoutError, LLMError: When the error is not
+                retryable or the retries have run out
+        """
+        if not is_retryable(error) or attempt >= self.max_retries:
+            with self._stats_lock:
+                self.failures += 1
+                self.throttled_seconds += waited
+            if isinstance(error, openai.RateLimitError):
+                raise LLMRateLimitError(f"Rate limited after {attempt + 1} attempts: {error}") from error
+            if isinstance(error, openai.APITimeoutError):
+                raise LLMTimeoutError(f"Timed out after {attempt + 1} attempts: {error}") from error
+            raise LLMError(str(error)) from error
+        delay = self._backoff(attempt, error)
+        logger.warning(f"{model} call failed ({type(error).__name__}); retrying in {delay:.1f}s "
+                       f"(attempt {attempt + 1} of {self.max_retries})")
+        with self._stats_lock:
+            self.retries += 1
+            self.throttled_seconds += waited
+        return delay
+
+    def _succeeded(self, response, model, estimate, waited, key):
+        """Settle the token bucket, count the call, cache the response and return its text."""
+        usage = getattr(response, "usage", None)
+        used = getattr(usage, "total_tokens", None) or estimate
+        # Settle the token bucket with what the call actually consumed
+        self.tokens.adjust(estimate - used)
+        with self._stats_lock:
+            self.calls += 1
+            self.throttled_seconds += waited
+            self.total_tokens += used
+        content = response.choices[0].message.content
+        if key is not None:
+            self.cache.put(key, model, content)
+        return content
+
+    def get_stats(self):
+        """Return call, retry and throttling counters, plus cache and mock backend statistics when in use."""
+        with self._stats_lock:
+            stats = {
+                "calls": self.calls,
+                "retries": self.retries,
+                "failures": self.failures,
+                "throttled_seconds": round(self.throttled_seconds, 3),
+                "total_tokens": self.total_tokens
+            }
+        if self.cache is not None:
+            stats["cache"] = self.cache.stats()
+        if isinstance(self._client, MockChatClient):
+            stats["mock"] = self._client.stats()
+        return stats
+
+class AsyncLLMGateway(LLMGateway):
+    """asyncio counterpart of LLMGateway with a cap on concurrent calls."""
+
+    def __init__(self, client=None, max_concurrency=8, **kwargs):
+        """
+        Initialize the gateway.
+
+        Args:
+            client (optional): AsyncOpenAI client, or anything with the same
+                awaitable chat.completions.create() surface such as
+                AsyncMockChatClient; by default one is created on first use
+            max_concurrency (int): Calls allowed in flight at once
+            **kwargs: Limits, retry settings and cache as for LLMGateway
+        """
+        super().__init__(client=client, **kwargs)
+        self.max_concurrency = max_concurrency
+        self._semaphore = None
+
+    @property
+    def client(self):
+        """The underlying AsyncOpenAI client, created on first use."""
+        with self._client_lock:
+            if self._client is None:
+                api_key = os.getenv("OPENAI_API_KEY")
+                if not api_key:
+                    raise LLMError("OPENAI_API_KEY is not set")
+                self._client = AsyncOpenAI(api_key=api_key, max_retries=0)
+            return self._client
+
+    async def chat(self, messages, model=DEFAULT_MODEL, max_tokens=None, temperature=None, timeout=None, **kwargs):
+        """Run a chat completion without blocking the event loop; see LLMGateway.chat()."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        params, estimate, key, cached = self._prepare(messages, model, max_tokens, temperature, kwargs)
+        if cached is not None:
+            return cached
+
+        attempt = 0
+        while True:
+            waited = await self.requests.acquire_async(1) + await self.tokens.acquire_async(estimate)
+            try:
+                async with self._semaphore:
+                    response = await self.client.chat.completions.create(
+                        model=model,
+                        messages=messages,
+                        timeout=timeout or self.timeout,
+                        **params
+                    )
+            except Exception as e:
+                delay = self._failed(e, attempt, model, waited)
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            return self._succeeded(response, model, estimate, waited, key)
+
+    async def aclose(self):
+        """Close the underlying client's connections."""
+        close = getattr(self._client, "close", None)
+        if close is not None:
+            result = close()
+            if asyncio.iscoroutine(result):
+                await result
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+def get_llm_gateway():
+    """
+    Return the process-wide LLM gateway, creating it on first use.
+
+    The response cache is enabled when LLM_CACHE_PATH names a SQLite file.
+    LLM_BACKEND=mock sends calls to the offline MockChatClient instead of
+    the OpenAI API.
+    """
+    global _gateway
+    with _gateway_lock:
+        if _gateway is None:
+            client = None
+            limits = {}
+            if os.getenv("LLM_BACKEND", "openai").lower() == "mock":
+                client = MockChatClient.from_env()
+                # Mock calls are only rate limited when limits are set explicitly
+                limits = {
+                    "rpm_limit": int(os.getenv("LLM_RPM_LIMIT", "0")),
+                    "tpm_limit": int(os.getenv("LLM_TPM_LIMIT", "0"))
+                }
+                logger.info("Using the offline mock LLM backend")
+            cache = None
+            cache_path = os.getenv("LLM_CACHE_PATH")
+            if cache_path:
+                try:
+                    cache = LLMResponseCache(cache_path, max_bytes=LLM_CACHE_MAX_MB * 1024 * 1024)
+                    logger.info(f"LLM response cache enabled at '{cache_path}'")
+                except Exception as e:
+                    logger.warning(f"Could not open LLM response cache '{cache_path}': {e}")
+            _gateway = LLMGateway(client=client, cache=cache, **limits)
+        return _gateway
+
+def set_llm_gateway(gateway):
+    """
+    Replace the process-wide LLM gateway.
+
+    Args:
+        gateway (LLMGateway): The gateway to use, or None to create a default one on next use
+    """
+    global _gateway
+    with _gateway_lock:
+        _gateway = gateway
+
+def get_async_llm_gateway(max_concurrency=8):
+    """
+    Create an AsyncLLMGateway for one event loop.
+
+    It shares the process-wide gateway's rate limiters and response cache, so
+    sync and async calls together stay within the configured limits. A new
+    gateway is returned on each call because async clients are bound to the
+    loop they are used on.
+
+    Args:
+        max_concurrency (int): Calls allowed in flight at once
+
+    Returns:
+        AsyncLLMGateway: The gateway
+    """
+    gateway = get_llm_gateway()
+    client = None
+    if isinstance(gateway._client, MockChatClient):
+        client = AsyncMockChatClient.from_env()
+    async_gateway = AsyncLLMGateway(client=client, max_concurrency=max_concurrency, timeout=gateway.timeout,
+                                    max_retries=gateway.max_retries, backoff_base=gateway.backoff_base,
+                                    backoff_max=gateway.backoff_max, cache=gateway.cache)
+    async_gateway.requests = gateway.requests
+    async_gateway.tokens = gateway.tokens
+    return async_gateway
@@ -34,6 +34,8 @@ try:
     from critical_agent import CriticalAgent
     from technical_agent import TechnicalAgent
     from debate import run_semi_agentic_debate
+    from async_debate import run_async_debate, DEBATE_CONCURRENCY
+    from debate_graph import run_graph_debate
     logger.info("Successfully imported all required modules")
 except ImportError as e:
     logger.error(f"Failed to import required modules: {str(e)}")
@@ -113,6 +115,37 @@ Examples:
         help='Disable AI generation fallback (only use local documents and web search)'
     )
 
+    parser.add_argument(
+        '--llm_cache',
+        type=str,
+        help='SQLite file for caching LLM responses across runs (default: disabled)'
+    )
+
+    parser.add_argument(
+        '--mock_llm',
+        action='store_true',
+        help='Use the offline mock LLM backend instead of the OpenAI API (no API key needed)'
+    )
+
+    parser.add_argument(
+        '--async_debate',
+        action='store_true',
+        help="Run each phase's per-agent LLM calls concurrently"
+    )
+
+    parser.add_argument(
+        '--debate_graph',
+        action='store_true',
+        help='Schedule the debate as a dependency graph so tasks start as soon as their inputs are ready'
+    )
+
+    parser.add_argument(
+        '--max_concurrency',
+        type=int,
+        default=DEBATE_CONCURRENCY,
+        help=f'Maximum LLM calls in flight with --async_debate or --debate_graph (default: {DEBATE_CONCURRENCY})'
+    )
+
     parser.add_argument(
     '--interactive',
     action='store_true',
@@ -158,19 +191,31 @@ def main():
     """Main function to run the debate system."""
     logger.info("Starting Multi-Agent Debate System...")
     
+    # Parse arguments
+    args = parse_arguments()
+    if args.debug:
+        logger.setLevel(logging.DEBUG)
+        logger.debug("Debug mode enabled")
+    
     # Ensure OpenAI API key is set
     load_dotenv()
+    if args.mock_llm:
+        os.environ["LLM_BACKEND"] = "mock"
     api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
+    if os.getenv("LLM_BACKEND", "openai").lower() == "mock":
+        # Agents still construct an OpenAI config, but no call ever uses this key
+        os.environ.setdefault("OPENAI_API_KEY", "mock-key")
+        logger.info("Using the offline mock LLM backend")
+    elif not api_key:
         logger.error("Error: OPENAI_API_KEY not found in environment variables or .env file")
         sys.exit(1)
-    logger.info("API key loaded successfully")
+    else:
+        logger.info("API key loaded successfully")
     
-    # Parse arguments
-    args = parse_arguments()
-    if args.debug:
-        logger.setLevel(logging.DEBUG)
-        logger.debug("Debug mode enabled")
+    # Reuse LLM responses for repeated prompts across runs
+    if args.llm_cache:
+        os.environ["LLM_CACHE_PATH"] = os.path.abspath(args.llm_cache)
+        logger.info(f"LLM response cache enabled at: {os.environ['LLM_CACHE_PATH']}")
     
     # Configure knowledge integration
     knowledge_config = None
@@ -315,16 +360,34 @@ def main():
     
     # Run the debate
     try:
-        logger.info("Calling run_semi_agentic_debate()...")
         start_time = time.time()
         
-    
-        output_dir, results = run_semi_agentic_debate(
-            problem_statement=args.problem, 
-            agents=agents,
-            output_dir=args.output,
-            knowledge_config=knowledge_config  # Pass knowledge configuration
-        )
+        if args.debate_graph:
+            logger.info(f"Calling run_graph_debate() with max_concurrency={args.max_concurrency}...")
+            output_dir, results = run_graph_debate(
+                problem_statement=args.problem,
+                agents=agents,
+                output_dir=args.output,
+                knowledge_config=knowledge_config,
+                max_concurrency=args.max_concurrency
+            )
+        elif args.async_debate:
+            logger.info(f"Calling run_async_debate() with max_concurrency={args.max_concurrency}...")
+            output_dir, results = run_async_debate(
+                problem_statement=args.problem,
+                agents=agents,
+                output_dir=args.output,
+                knowledge_config=knowledge_config,
+                max_concurrency=args.max_concurrency
+            )
+        else:
+            logger.info("Calling run_semi_agentic_debate()...")
+            output_dir, results = run_semi_agentic_debate(
+                problem_statement=args.problem, 
+                agents=agents,
+                output_dir=args.output,
+                knowledge_config=knowledge_config  # Pass knowledge configuration
+            )
         
         end_time = time.time()
         duration = end_time - start_time
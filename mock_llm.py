@@ -0,0 +1,323 @@
+"""
+Offline stand-in for the OpenAI chat completions API.
+
+MockChatClient has the same client.chat.completions.create() surface the
+LLM gateway calls, so a whole debate can run without an API key or network
+access. Completions are deterministic for a given prompt and seed and are
+shaped to satisfy every call site: sentiment scores, "I choose to critique
+..." target selections, "Final Position:" statements, the markdown final
+report, JSON knowledge batches and [REF: ...] requests. Latency, token
+counts and injected 429s and timeouts are configurable, which makes the
+mock suitable for measuring orchestration, retrieval and artifact costs in
+isolation.
+
+Enable it with LLM_BACKEND=mock (or --mock_llm on main.py).
+"""
+
+import os
+import re
+import asyncio
+import json
+import math
+import time
+import random
+import hashlib
+import logging
+import threading
+from types import SimpleNamespace
+
+import openai
+
+logger = logging.getLogger("MockLLM")
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "normal", "lognormal")
+
+STOP_WORDS = set("""
+a an and are as at be by can each for from has have how in into is it its of on or our that the their
+them these this those to was we what when which who will with you your about after before between
+provide response keep under words based should would could other your include using expert experts
+""".split())
+
+FILLER = [
+    "evidence", "trade-offs", "stakeholders", "adoption", "governance", "scalability", "costs",
+    "feedback loops", "incentives", "risks", "safeguards", "measurement", "iteration", "user needs"
+]
+
+def _fake_response(status_code, headers=None):
+    """Minimal HTTP response carrying what openai's APIStatusError reads."""
+    return SimpleNamespace(status_code=status_code, headers=headers or {}, request=None)
+
+class MockChatClient:
+    """Deterministic, prompt-aware fake of OpenAI's chat completions client."""
+
+    def __init__(self, seed=0, latency=0.0, latency_spread=0.0, latency_distribution="lognormal",
+                 token_latency=0.0, rate_limit_rate=0.0, timeout_rate=0.0, reference_rate=0.7):
+        """
+        Initialize the mock.
+
+        Args:
+            seed (int): Seed for completions, latencies and injected errors
+            latency (float): Mean seconds per call before token generation
+            latency_spread (float): Spread of the latency distribution (standard
+                deviation for normal/lognormal, half-width for uniform)
+            latency_distribution (str): One of "fixed", "uniform", "normal", "lognormal"
+            token_latency (float): Extra seconds per completion token
+            rate_limit_rate (float): Fraction of calls failing with a 429
+            timeout_rate (float): Fraction of calls failing with a timeout
+            reference_rate (float): Chance a completion includes a [REF: ...]
+                request when the prompt invites one
+        """
+        if latency_distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution '{latency_distribution}'")
+        self.seed = seed
+        self.latency = latency
+        self.latency_spread = latency_spread
+        self.latency_distribution = latency_distribution
+        self.token_latency = token_latency
+        self.rate_limit_rate = rate_limit_rate
+        self.timeout_rate = timeout_rate
+        self.reference_rate = reference_rate
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.rate_limited = 0
+        self.timed_out = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.simulated_seconds = 0.0
+
+    @classmethod
+    def from_env(cls):
+        """Create a mock configured from MOCK_LLM_* environment variables."""
+        return cls(
+            seed=int(os.getenv("MOCK_LLM_SEED", "0")),
+            latency=float(os.getenv("MOCK_LLM_LATENCY", "0")),
+            latency_spread=float(os.getenv("MOCK_LLM_LATENCY_SPREAD", "0")),
+            latency_distribution=os.getenv("MOCK_LLM_LATENCY_DISTRIBUTION", "lognormal"),
+            token_latency=float(os.getenv("MOCK_LLM_TOKEN_LATENCY", "0")),
+            rate_limit_rate=float(os.getenv("MOCK_LLM_RATE_LIMIT_RATE", "0")),
+            timeout_rate=float(os.getenv("MOCK_LLM_TIMEOUT_RATE", "0")),
+            reference_rate=float(os.getenv("MOCK_LLM_REFERENCE_RATE", "0.7"))
+        )
+
+    def _sample_latency(self, rng):
+        """Draw a base latency from the configured distribution."""
+        if self.latency <= 0:
+            return 0.0
+        if self.latency_distribution == "fixed" or self.latency_spread <= 0:
+            return self.latency
+        if self.latency_distribution == "uniform":
+            return max(0.0, rng.uniform(self.latency - self.latency_spread, self.latency + self.latency_spread))
+        if self.latency_distribution == "normal":
+            return max(0.0, rng.gauss(self.latency, self.latency_spread))
+        # Lognormal with the requested mean and standard deviation
+        sigma = math.sqrt(math.log1p((self.latency_spread / self.latency) ** 2))
+        mu = math.log(self.latency) - sigma ** 2 / 2
+        return rng.lognormvariate(mu, sigma)
+
+    def create(self, model, messages, max_tokens=None, temperature=None, timeout=None, response_format=None,
+               **kwargs):
+        """
+        Return a fake chat completion shaped like openai's ChatCompletion.
+
+        Raises:
+            openai.RateLimitError, openai.APITimeoutError: When error injection fires
+        """
+        delay, outcome = self._respond(model, messages, max_tokens, timeout, response_format)
+        if delay:
+            time.sleep(delay)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    def _respond(self, model, messages, max_tokens, timeout, response_format):
+        """
+        Decide the outcome of one call.
+
+        Returns:
+            tuple: (seconds of simulated latency, completion or exception to raise)
+        """
+        with self._lock:
+            self.calls += 1
+            call_latency = self._sample_latency(self._rng)
+            failure = self._rng.random()
+
+        prompt_text = "\n".join(message.get("content") or "" for message in messages)
+        prompt_tokens = len(prompt_text) // 4 + len(messages) * 4
+
+        if failure < self.rate_limit_rate:
+            with self._lock:
+                self.rate_limited += 1
+            logger.debug("Injecting a rate limit error")
+            return 0.0, openai.RateLimitError("Mock rate limit exceeded", body=None,
+                                              response=_fake_response(429, {"retry-after": "0"}))
+        if failure < self.rate_limit_rate + self.timeout_rate:
+            wait = min(call_latency, timeout) if timeout else call_latency
+            with self._lock:
+                self.timed_out += 1
+                self.simulated_seconds += wait
+            logger.debug("Injecting a timeout")
+            return wait, openai.APITimeoutError(request=None)
+
+        content = self.complete(messages, max_tokens=max_tokens, json_mode=bool(response_format))
+        completion_tokens = max(1, round(len(content.split()) * 4 / 3))
+        delay = call_latency + completion_tokens * self.token_latency
+
+        with self._lock:
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+            self.simulated_seconds += delay
+
+        digest = hashlib.sha1(prompt_text.encode("utf-8")).hexdigest()
+        return delay, SimpleNamespace(
+            id=f"mock-{digest[:12]}",
+            object="chat.completion",
+            created=int(time.time()),
+            model=model,
+            choices=[SimpleNamespace(
+                index=0,
+                finish_reason="stop",
+                message=SimpleNamespace(role="assistant", content=content)
+            )],
+            usage=SimpleNamespace(
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                total_tokens=prompt_tokens + completion_tokens
+            )
+        )
+
+    def complete(self, messages, max_tokens=None, json_mode=False):
+        """
+        Produce the completion text for a conversation.
+
+        The same messages and seed always give the same text.
+
+        Args:
+            messages (list): Chat messages
+            max_tokens (int, optional): Completion token limit the text stays within
+            json_mode (bool): Answer with a JSON object
+
+        Returns:
+            str: The completion
+        """
+        system = (messages[0].get("content") or "") if messages and messages[0].get("role") == "system" else ""
+        prompt = (messages[-1].get("content") or "") if messages else ""
+        digest = hashlib.sha256(f"{self.seed}\n{json.dumps(messages, sort_keys=True)}".encode("utf-8")).digest()
+        rng = random.Random(int.from_bytes(digest[:8], "big"))
+        word_budget = max(8, int((max_tokens or 300) * 0.75 * rng.uniform(0.5, 0.85)))
+
+        speaker_match = re.search(r"You are ([^,\n]+),", system)
+        speaker = speaker_match.group(1).strip() if speaker_match else "Moderator"
+        topic_match = re.search(r"'([^'\n]{3,})'", f"{prompt}\n{system}")
+        topic = topic_match.group(1) if topic_match else "the topic"
+        terms = self._key_terms(prompt, rng)
+
+        if json_mode:
+            topics = re.findall(r"^\s*(\d+)\.\s+(.+?)\s*$", prompt, flags=re.MULTILINE)
+            return json.dumps({number: self._bullets(query, rng, word_budget // max(1, len(topics)))
+                               for number, query in topics})
+
+        if "sentiment analysis" in system.lower():
+            return f"{rng.uniform(-0.4, 0.9):.1f}"
+
+        if "I choose to critique" in prompt:
+            return self._target_selection(prompt, speaker, terms, rng)
+
+        if "knowledge base" in system.lower():
+            return self._bullets(prompt.split(":", 1)[-1].strip(), rng, word_budget)
+
+        body = self._paragraph(speaker, topic, terms, rng, word_budget)
+        if '"Final Position:"' in prompt:
+            recommendations = "\n".join(f"{i}. Prioritise {term} when addressing {topic}."
+                                        for i, term in enumerate(terms[:3], 1))
+            body = (f"Final Position: {body}\n\nRecommendations:\n{recommendations}\n\n"
+                    f"My thinking has evolved to give more weight to {terms[-1]}.")
+        elif "Executive Summary" in prompt:
+            sections = ["Executive Summary", "Key Perspectives", "Evolution of Ideas",
+                        "Areas of Agreement and Disagreement", "Integrated Solution",
+                        "Implementation Considerations", "Recommendations for Further Research"]
+            per_section = max(8, word_budget // len(sections))
+            body = "\n\n".join(f"## {section}\n\n{self._paragraph(speaker, topic, terms, rng, per_section)}"
+                               for section in sections)
+
+        if "[REF:" in f"{system}\n{prompt}" and rng.random() < self.reference_rate:
+            body += f" This is supported by [REF: {terms[0]} in {topic}]."
+        return body
+
+    @staticmethod
+    def _key_terms(text, rng, count=6):
+        """Pick the most frequent content words of a prompt, padded with filler terms."""
+        counts = {}
+        for word in re.findall(r"[a-z][a-z\-]{4,}", text.lower()):
+            if word not in STOP_WORDS:
+                counts[word] = counts.get(word, 0) + 1
+        terms = [word for word, _ in sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:count]]
+        while len(terms) < count:
+            terms.append(rng.choice(FILLER))
+        return terms
+
+    @staticmethod
+    def _paragraph(speaker, topic, terms, rng, word_budget):
+        """Build deterministic prose about the topic within a word budget."""
+        templates = [
+            "As {speaker}, I see {a} as central to {topic}.",
+            "The link between {a} and {b} deserves closer scrutiny.",
+            "Without attention to {a}, gains in {b} are unlikely to last.",
+            "A pragmatic path balances {a} against {b}.",
+            "Evidence on {a} suggests {b} matters more than assumed."
+        ]
+        words = []
+        while len(words) < word_budget:
+            a, b = rng.sample(terms, 2)
+            words.extend(rng.choice(templates).format(speaker=speaker, topic=topic, a=a, b=b).split())
+        return " ".join(words[:word_budget]).rstrip(".,") + "."
+
+    @staticmethod
+    def _bullets(query, rng, word_budget):
+        """Build 3-5 bullet points about a knowledge query."""
+        points = []
+        for _ in range(rng.randint(3, 5)):
+            aspect = rng.choice(FILLER)
+            points.append(f"- {query}: current work emphasises {aspect} and {rng.choice(FILLER)}.")
+        return "\n".join(points)[:max(80, word_budget * 8)]
+
+    @staticmethod
+    def _target_selection(prompt, speaker, terms, rng):
+        """Choose another expert named in the perspectives block."""
+        names = []
+        for name in re.findall(r"(?:^|\n\s*\n)\s*([A-Za-z][\w\-]*):", prompt):
+            if name != speaker and name not in names:
+                names.append(name)
+        if not names:
+            return f"I choose to critique the other expert because their view of {terms[0]} is incomplete."
+        return f"I choose to critique {rng.choice(names)} because their view of {terms[0]} underplays {terms[1]}."
+
+    def stats(self):
+        """Return call, injected-error, token and simulated-latency counters."""
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "rate_limited": self.rate_limited,
+                "timed_out": self.timed_out,
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+                "simulated_seconds": round(self.simulated_seconds, 3)
+            }
+
+class AsyncMockChatClient(MockChatClient):
+    """MockChatClient whose chat.completions.create() is awaitable, standing in for AsyncOpenAI."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, model, messages, max_tokens=None, temperature=None, timeout=None, response_format=None,
+                     **kwargs):
+        """Awaitable version of MockChatClient.create(); simulated latency does not block the loop."""
+        delay, outcome = self._respond(model, messages, max_tokens, timeout, response_format)
+        if delay:
+            await asyncio.sleep(delay)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
@@ -0,0 +1,153 @@
+"""
+Near-duplicate detection for documents using MinHash over word shingles.
+
+Each document is reduced to a short MinHash signature whose agreement with
+another signature estimates the Jaccard similarity of their shingle sets.
+Signatures are bucketed with locality-sensitive hashing (banding), so
+finding the near-duplicates of a new document only compares it with the
+few documents that share a band, not with the whole corpus.
+"""
+
+import re
+import zlib
+import random
+import logging
+
+try:
+    import numpy as np
+    NUMPY_SUPPORT = True
+except ImportError:
+    NUMPY_SUPPORT = False
+
+logger = logging.getLogger("NearDuplicates")
+
+WORD_PATTERN = re.compile(r'\w+')
+
+# Mersenne prime modulus for the permutation hashes
+PRIME = (1 << 31) - 1
+
+def shingles(text, size=5):
+    """
+    Return the hashed word shingles of a text.
+
+    Args:
+        text (str): Text to shingle
+        size (int): Words per shingle
+
+    Returns:
+        set: crc32 hashes of the lowercased word n-grams
+    """
+    words = WORD_PATTERN.findall(text.lower())
+    if len(words) < size:
+        return {zlib.crc32(" ".join(words).encode("utf-8"))} if words else set()
+    return {zlib.crc32(" ".join(words[i:i + size]).encode("utf-8")) for i in range(len(words) - size + 1)}
+
+class MinHasher:
+    """Computes fixed-length MinHash signatures from shingle sets."""
+
+    def __init__(self, num_perm=64, seed=1):
+        """
+        Initialize the hash permutations.
+
+        Args:
+            num_perm (int): Signature length
+            seed (int): Seed for the permutation parameters
+        """
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self.a = [rng.randrange(1, PRIME) for _ in range(num_perm)]
+        self.b = [rng.randrange(0, PRIME) for _ in range(num_perm)]
+
+    def signature(self, text, shingle_size=5):
+        """
+        Compute the MinHash signature of a text.
+
+        Args:
+            text (str): Text to fingerprint
+            shingle_size (int): Words per shingle
+
+        Returns:
+            list: num_perm integers; empty for a text without words
+        """
+        hashes = shingles(text, shingle_size)
+        if not hashes:
+            return []
+        if NUMPY_SUPPORT:
+            values = np.fromiter(hashes, dtype=np.int64, count=len(hashes))
+            a = np.asarray(self.a, dtype=np.int64)[:, None]
+            b = np.asarray(self.b, dtype=np.int64)[:, None]
+            return ((a * values[None, :] + b) % PRIME).min(axis=1).tolist()
+        return [min((a * h + b) % PRIME for h in hashes) for a, b in zip(self.a, self.b)]
+
+def estimate_similarity(first, second):
+    """Estimate the Jaccard similarity of two documents from their signatures."""
+    if not first or len(first) != len(second):
+        return 0.0
+    return sum(1 for x, y in zip(first, second) if x == y) / len(first)
+
+class NearDuplicateIndex:
+    """LSH buckets of MinHash signatures for finding near-duplicate documents."""
+
+    def __init__(self, bands=16, threshold=0.9):
+        """
+        Initialize an empty index.
+
+        Args:
+            bands (int): Number of LSH bands the signature is split into
+            threshold (float): Estimated Jaccard similarity at which two
+                documents count as near-duplicates
+        """
+        self.bands = bands
+        self.threshold = threshold
+        self.buckets = {}     # (band, band values) -> set of keys
+        self.signatures = {}  # key -> signature
+
+    def _band_keys(self, signature):
+        rows = max(1, len(signature) // self.bands)
+        return [(band, tuple(signature[band * rows:(band + 1) * rows])) for band in range(self.bands)]
+
+    def add(self, key, signature):
+        """Index a document's signature under key."""
+        if not signature:
+            return
+        self.signatures[key] = signature
+        for band_key in self._band_keys(signature):
+            self.buckets.setdefault(band_key, set()).add(key)
+
+    def remove(self, key):
+        """Drop a document from the index."""
+        signature = self.signatures.pop(key, None)
+        if signature is None:
+            return
+        for band_key in self._band_keys(signature):
+            bucket = self.buckets.get(band_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self.buckets[band_key]
+
+    def find(self, signature):
+        """
+        Find the indexed document most similar to a signature.
+
+        Args:
+            signature (list): MinHash signature of the new document
+
+        Returns:
+            tuple: (key, estimated similarity) of the best match at or above
+                the threshold, or (None, 0.0)
+        """
+        if not signature:
+            return None, 0.0
+        candidates = set()
+        for band_key in self._band_keys(signature):
+            candidates.update(self.buckets.get(band_key, ()))
+
+        best_key, best_similarity = None, 0.0
+        for key in candidates:
+            similarity = estimate_similarity(signature, self.signatures[key])
+            if similarity > best_similarity:
+                best_key, best_similarity = key, similarity
+        if best_similarity >= self.threshold:
+            return best_key, best_similarity
+        return None, 0.0
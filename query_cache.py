@@ -0,0 +1,199 @@
+"""
+Two-level cache of knowledge query results.
+
+Results are kept in an in-memory LRU in front of an on-disk SQLite table so
+repeated queries are answered without another local search, web search or
+AI generation call, both within a debate and across debates. Entries are
+keyed by normalised query, source tier and corpus version, and each tier
+has its own time-to-live. Lookups that found nothing are cached too, with a
+shorter time-to-live, so a repeated miss skips straight to the next tier.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger("QueryCache")
+
+# Seconds before a cached result expires; None keeps it until the corpus changes
+DEFAULT_TTLS = {
+    "local": None,
+    "web": 24 * 3600,
+    "ai": 7 * 24 * 3600
+}
+
+# Seconds before a cached miss expires; tiers not listed never cache misses
+DEFAULT_NEGATIVE_TTLS = {
+    "local": 3600,
+    "web": 3600
+}
+
+def normalize_query(query):
+    """Lowercase a query and collapse its whitespace."""
+    return " ".join(query.lower().split())
+
+class QueryCache:
+    """In-memory LRU plus SQLite cache of retrieve_knowledge results per tier."""
+
+    def __init__(self, db_path=None, max_memory_entries=512, max_disk_entries=10000, ttls=None,
+                 negative_ttls=None):
+        """
+        Initialize the cache.
+
+        Args:
+            db_path (str, optional): SQLite file; memory-only when None
+            max_memory_entries (int): Capacity of the in-memory LRU
+            max_disk_entries (int): Rows kept in SQLite before the oldest are dropped
+            ttls (dict, optional): Per-tier TTL overrides in seconds
+            negative_ttls (dict, optional): Per-tier TTL overrides in seconds
+                for cached misses
+        """
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttls = dict(DEFAULT_TTLS)
+        self.ttls.update(ttls or {})
+        self.negative_ttls = dict(DEFAULT_NEGATIVE_TTLS)
+        self.negative_ttls.update(negative_ttls or {})
+        self.hits = {"memory": 0, "disk": 0}
+        self.negative_hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+
+        if db_path:
+            try:
+                directory = os.path.dirname(db_path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._db = sqlite3.connect(db_path, check_same_thread=False)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS query_cache ("
+                    "key TEXT PRIMARY KEY, tier TEXT, query TEXT, results TEXT, "
+                    "created REAL, expires REAL)"
+                )
+                self._db.execute("DELETE FROM query_cache WHERE expires IS NOT NULL AND expires < ?", (time.time(),))
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"Could not open query cache database '{db_path}': {e}. Using memory only.")
+                self._db = None
+
+    @staticmethod
+    def _key(query, tier, version):
+        raw = f"{tier}\n{version or ''}\n{normalize_query(query)}"
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def get(self, query, tier, version=None):
+        """
+        Look up cached results.
+
+        Args:
+            query (str): The knowledge query
+            tier (str): Source tier ("local", "web" or "ai")
+            version (str, optional): Corpus version the results depend on
+
+        Returns:
+            list: Cached results, an empty list for a cached miss, or None
+                if nothing is cached
+        """
+        key = self._key(query, tier, version)
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                results, expires = entry
+                if expires is None or expires > now:
+                    self._memory.move_to_end(key)
+                    self._count_hit("memory", results)
+                    return results
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT results, expires FROM query_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    results, expires = json.loads(row[0]), row[1]
+                    if expires is None or expires > now:
+                        self._remember(key, results, expires)
+                        self._count_hit("disk", results)
+                        return results
+                    self._db.execute("DELETE FROM query_cache WHERE key = ?", (key,))
+                    self._db.commit()
+
+            self.misses += 1
+            return None
+
+    def put(self, query, tier, results, version=None):
+        """
+        Store results for a query.
+
+        Args:
+            query (str): The knowledge query
+            tier (str): Source tier ("local", "web" or "ai")
+            results (list): Results to cache; empty to record a miss
+            version (str, optional): Corpus version the results depend on
+        """
+        if not results:
+            if tier not in self.negative_ttls:
+                return
+            results = []
+            ttl = self.negative_ttls[tier]
+        else:
+            ttl = self.ttls.get(tier)
+        
+        key = self._key(query, tier, version)
+        now = time.time()
+        expires = now + ttl if ttl is not None else None
+
+        with self._lock:
+            self._remember(key, results, expires)
+            if self._db is None:
+                return
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO query_cache (key, tier, query, results, created, expires) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, tier, normalize_query(query), json.dumps(results), now, expires)
+                )
+                self._db.execute(
+                    "DELETE FROM query_cache WHERE key IN (SELECT key FROM query_cache "
+                    "ORDER BY created DESC LIMIT -1 OFFSET ?)", (self.max_disk_entries,)
+                )
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"Could not write query cache entry: {e}")
+
+    def _count_hit(self, level, results):
+        """Count a hit at a cache level, or a negative hit for a cached miss."""
+        if results:
+            self.hits[level] += 1
+        else:
+            self.negative_hits += 1
+
+    def _remember(self, key, results, expires):
+        """Insert into the in-memory LRU, evicting the least recently used entry."""
+        self._memory[key] = (results, expires)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self):
+        """Return hit/miss counters, the hit rate and the negative-hit rate."""
+        with self._lock:
+            hits = self.hits["memory"] + self.hits["disk"]
+            lookups = hits + self.negative_hits + self.misses
+            return {
+                "memory_hits": self.hits["memory"],
+                "disk_hits": self.hits["disk"],
+                "negative_hits": self.negative_hits,
+                "misses": self.misses,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "negative_hit_rate": self.negative_hits / lookups if lookups else 0.0
+            }
@@ -46,31 +46,37 @@ class TechnicalAgent(DebateAgent):
             model=model
         )
     
-    def generate_argument(self, topic):
+    def generate_argument(self, topic, knowledge_integration=None):
         """Generate an argument for the debate topic, incorporating knowledge retrieval.
         
         Args:
             topic (str): The debate topic/problem statement
+            knowledge_integration (KnowledgeIntegration, optional): The debate's
+                knowledge integration, so the knowledge retrieved here is cached
+                for the reference request this method returns
             
         Returns:
             str: The generated argument with incorporated knowledge
         """
         logger.info(f"TechnicalAgent is generating an argument for '{topic}'")
         
+        query = f"technical implementation of {topic}"
         try:
-            # Try to retrieve relevant knowledge
-            knowledge = retrieve_knowledge(topic)
+            # Try to retrieve knowledge for the exact query we will reference
+            # Not recorded in the reference ledger: resolving the returned
+            # reference request records it
+            if knowledge_integration:
+                knowledge = knowledge_integration.retrieve_knowledge(query, track=False)
+            else:
+                knowledge = retrieve_knowledge(query, track=False)
             
             if knowledge and len(knowledge) > 0:
                 logger.info(f"Knowledge retrieved: {len(knowledge)} items")
                 
-                # Format the knowledge references
-                knowledge_text = "\n".join([f"- {k[:150]}..." for k in knowledge[:3]])
-                
                 # Use reference format for consistency with knowledge integration pattern
-                return f"[REF: technical implementation of {topic}]"
+                return f"[REF: {query}]"
             else:
-                logger.warning(f"No knowledge found for '{topic}', using reference request")
+                logger.warning(f"No knowledge found for '{query}', using reference request")
         except Exception as e:
             logger.error(f"Error retrieving knowledge: {str(e)}")
         
@@ -0,0 +1,9 @@
+import os
+import sys
+import tempfile
+
+# Keep the knowledge caches of the code under test out of the working tree;
+# knowledge_integration reads this at import time
+os.environ.setdefault("KNOWLEDGE_CACHE_DIR", tempfile.mkdtemp(prefix="knowledge_cache_"))
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
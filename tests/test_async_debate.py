@@ -0,0 +1,40 @@
+import pytest
+
+from async_debate import run_async_debate
+from business_agent import BusinessAgent
+from critical_agent import CriticalAgent
+from debate import run_semi_agentic_debate
+from llm_gateway import set_llm_gateway
+
+PROBLEM = "How should companies balance remote and in-office work?"
+
+@pytest.fixture
+def mock_backend(monkeypatch):
+    monkeypatch.setenv("LLM_BACKEND", "mock")
+    # Agents still construct an OpenAI config, but no call uses the key
+    monkeypatch.setenv("OPENAI_API_KEY", "mock-key")
+    for name in ("LLM_CACHE_PATH", "MOCK_LLM_LATENCY", "MOCK_LLM_RATE_LIMIT_RATE", "MOCK_LLM_TIMEOUT_RATE"):
+        monkeypatch.delenv(name, raising=False)
+    set_llm_gateway(None)
+    yield
+    set_llm_gateway(None)
+
+def shape(value):
+    """Reduce results to their keys, list lengths and value types, dropping generated text."""
+    if isinstance(value, dict):
+        return {key: shape(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [shape(item) for item in value]
+    return type(value).__name__
+
+def test_async_debate_produces_the_same_results_as_the_sequential_one(mock_backend, tmp_path):
+    _, sequential = run_semi_agentic_debate(PROBLEM, [BusinessAgent(), CriticalAgent()],
+                                            output_dir=str(tmp_path / "sequential"))
+    output_dir, concurrent = run_async_debate(PROBLEM, [BusinessAgent(), CriticalAgent()],
+                                              output_dir=str(tmp_path / "async"))
+
+    assert output_dir == str(tmp_path / "async")
+    assert concurrent.keys() == sequential.keys()
+    assert concurrent["phases"].keys() == sequential["phases"].keys()
+    assert shape(concurrent) == shape(sequential)
+    assert sorted(concurrent["phases"]["final_positions"]) == sorted(concurrent["agents"])
@@ -0,0 +1,207 @@
+import os
+import threading
+
+import pytest
+
+import document_ingestion
+from knowledge_integration import KnowledgeCorpus, KnowledgeIntegration
+
+def document(seed, words=400):
+    """Deterministic filler text; documents with the same seed are identical."""
+    return " ".join(f"term{(seed * 7919 + i * 104729) % 997}" for i in range(words))
+
+def write(path, text):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    # Make sure the refresh sees a changed mtime even on coarse filesystems
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+
+def make_corpus(tmp_path):
+    return KnowledgeCorpus("test", str(tmp_path / "docs"), {
+        "index_path": str(tmp_path / "index.json"),
+        "retrieval_mode": "lexical",
+        "ingest_workers": 1
+    })
+
+def assert_consistent(index):
+    for doc_id, doc in index.documents.items():
+        original = doc.get("duplicate_of")
+        if original is not None:
+            assert original in index.documents, f"{doc['path']} collapsed into a missing document"
+            assert index.documents[original].get("duplicate_of") is None
+        else:
+            assert doc["passages"], f"{doc['path']} has no indexed passages"
+    assert set(index.paths.values()) == set(index.documents)
+
+def test_refresh_adds_updates_and_removes(tmp_path):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    write(docs / "a.txt", document(1) + " zebra")
+    write(docs / "b.txt", document(2))
+    corpus = make_corpus(tmp_path)
+    assert len(corpus) == 2
+
+    write(docs / "a.txt", document(1) + " giraffe")
+    write(docs / "c.txt", document(3))
+    os.remove(docs / "b.txt")
+    changes = corpus.refresh()
+
+    assert changes["added"] == [str(docs / "c.txt")]
+    assert changes["updated"] == [str(docs / "a.txt")]
+    assert changes["removed"] == [str(docs / "b.txt")]
+    assert [hit["name"] for hit in corpus.index.search("giraffe")] == ["a.txt"]
+    assert corpus.index.search("zebra") == []
+    assert_consistent(corpus.index)
+
+def test_refresh_is_a_no_op_when_nothing_changed(tmp_path):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    write(docs / "a.txt", document(1))
+    corpus = make_corpus(tmp_path)
+    version = corpus.version()
+
+    assert corpus.refresh() == {"added": [], "updated": [], "removed": []}
+    assert corpus.version() == version
+
+@pytest.fixture(params=["input order", "reverse order"])
+def ingestion_order(request, monkeypatch):
+    """
+    Return a function that makes later ingestion yield documents in input
+    order or reversed, as a process pool finishing out of order would.
+    """
+    def apply():
+        if request.param == "reverse order":
+            ingest = document_ingestion.ingest_documents
+
+            def reversed_ingest(file_paths, **kwargs):
+                return reversed(list(ingest(file_paths, **kwargs)))
+            monkeypatch.setattr(document_ingestion, "ingest_documents", reversed_ingest)
+    return apply
+
+def test_updated_original_keeps_its_near_duplicate_searchable(tmp_path, ingestion_order):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    write(docs / "a.txt", document(1) + " walrus")
+    write(docs / "b.txt", document(1) + " narwhal")
+    corpus = make_corpus(tmp_path)
+    assert corpus.index.duplicate_count() == 1
+
+    # The original changes but stays a near-duplicate of b.txt
+    write(docs / "a.txt", document(1) + " walrus pelican")
+    ingestion_order()
+    corpus.refresh()
+
+    assert_consistent(corpus.index)
+    assert corpus.index.duplicate_count() == 1
+    assert corpus.index.search("pelican")
+
+def test_orphan_becomes_canonical_when_original_diverges(tmp_path, ingestion_order):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    write(docs / "a.txt", document(1))
+    write(docs / "b.txt", document(1) + " narwhal")
+    corpus = make_corpus(tmp_path)
+    assert corpus.index.duplicate_count() == 1
+
+    write(docs / "a.txt", document(5))
+    ingestion_order()
+    corpus.refresh()
+
+    assert_consistent(corpus.index)
+    assert corpus.index.duplicate_count() == 0
+    assert [hit["name"] for hit in corpus.index.search("narwhal")] == ["b.txt"]
+
+def test_removed_original_hands_over_to_its_duplicate(tmp_path):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    write(docs / "a.txt", document(1))
+    write(docs / "b.txt", document(1) + " narwhal")
+    corpus = make_corpus(tmp_path)
+
+    os.remove(docs / "a.txt")
+    corpus.refresh()
+
+    assert_consistent(corpus.index)
+    assert list(corpus.index.paths) == [str(docs / "b.txt")]
+    assert corpus.index.search("narwhal")
+
+def test_refreshed_index_survives_reload(tmp_path):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    write(docs / "a.txt", document(1) + " walrus")
+    write(docs / "b.txt", document(1) + " narwhal")
+    corpus = make_corpus(tmp_path)
+    write(docs / "a.txt", document(1) + " walrus pelican")
+    corpus.refresh()
+
+    reloaded = make_corpus(tmp_path)
+    assert_consistent(reloaded.index)
+    assert reloaded.index.search("pelican")
+
+def blocking_ingestion(monkeypatch):
+    """Make ingestion wait until released; return (started, release, worker counts seen)."""
+    started, release, workers = threading.Event(), threading.Event(), []
+    ingest = document_ingestion.ingest_documents
+
+    def blocked_ingest(file_paths, max_workers=None, **kwargs):
+        workers.append(max_workers)
+        started.set()
+        release.wait(5)
+        return ingest(file_paths, max_workers=max_workers, **kwargs)
+    monkeypatch.setattr(document_ingestion, "ingest_documents", blocked_ingest)
+    return started, release, workers
+
+def test_searches_run_while_a_refresh_extracts(tmp_path, monkeypatch):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    write(docs / "a.txt", document(1) + " walrus")
+    corpus = make_corpus(tmp_path)
+    write(docs / "b.txt", document(2) + " narwhal")
+    started, release, workers = blocking_ingestion(monkeypatch)
+
+    refresh = threading.Thread(target=corpus.refresh)
+    refresh.start()
+    assert started.wait(5)
+    searched = []
+    search = threading.Thread(target=lambda: searched.append(corpus.search_lexical("walrus")))
+    search.start()
+    search.join(2)
+    release.set()
+    refresh.join(5)
+
+    assert searched and searched[0], "search waited for the refresh"
+    # Incremental changes are extracted in-process, not in a process pool
+    assert set(workers) == {1}
+    assert corpus.search_lexical("narwhal")
+
+def test_periodic_refresh_runs_in_one_background_thread(tmp_path, monkeypatch):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    write(docs / "a.txt", document(1) + " walrus")
+    knowledge = KnowledgeIntegration({
+        "document_dir": str(docs),
+        "index_path": str(tmp_path / "index.json"),
+        "retrieval_mode": "lexical",
+        "ingest_workers": 1,
+        "refresh_interval": 0.01,
+        "use_web_search": False,
+        "use_ai_generation": False,
+        "query_cache": False
+    })
+    write(docs / "b.txt", document(2) + " narwhal")
+    started, release, workers = blocking_ingestion(monkeypatch)
+    knowledge._last_refresh -= 1
+
+    knowledge._maybe_refresh()
+    assert started.wait(5)
+    first = knowledge._refresh_thread
+    knowledge._last_refresh -= 1
+    knowledge._maybe_refresh()
+    # The lookup isn't held up, and no second refresh starts while one runs
+    assert knowledge._refresh_thread is first and first.is_alive()
+    assert knowledge.corpora[0].search_lexical("walrus")
+
+    release.set()
+    first.join(5)
+    assert knowledge.corpora[0].search_lexical("narwhal")
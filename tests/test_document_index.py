@@ -0,0 +1,122 @@
+import json
+import os
+
+from document_index import DocumentIndex
+from text_cache import file_content_hash
+
+def document(seed, words=300):
+    """Deterministic filler text; documents with the same seed are identical."""
+    return " ".join(f"term{(seed * 7919 + i * 104729) % 997}" for i in range(words))
+
+def add_file(index, path, text):
+    path.write_text(text, encoding="utf-8")
+    stat = os.stat(path)
+    return index.add_document(str(path), text, size=stat.st_size, mtime=stat.st_mtime,
+                              content_hash=file_content_hash(str(path)))
+
+def counting_loader(calls):
+    def load(path):
+        calls.append(path)
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
+    return load
+
+def test_add_and_search(tmp_path):
+    index = DocumentIndex(passage_size=50, passage_overlap=10)
+    add_file(index, tmp_path / "a.txt", document(1) + " zebra crossing")
+    add_file(index, tmp_path / "b.txt", document(2))
+
+    hits = index.search("zebra crossing")
+
+    assert [hit["name"] for hit in hits] == ["a.txt"]
+    assert "zebra crossing" in index.passage_text(hits[0]["passage_id"])
+
+def test_remove_drops_passages_and_postings(tmp_path):
+    index = DocumentIndex(passage_size=50, passage_overlap=10)
+    add_file(index, tmp_path / "a.txt", document(1) + " zebra")
+    expected = DocumentIndex(passage_size=50, passage_overlap=10)
+    add_file(expected, tmp_path / "b.txt", document(2))
+    add_file(index, tmp_path / "b.txt", document(2))
+    # The file is gone, so removal can't rely on re-reading its text
+    os.remove(tmp_path / "a.txt")
+
+    assert index.remove_document(str(tmp_path / "a.txt"))
+    assert not index.remove_document(str(tmp_path / "a.txt"))
+
+    assert index.search("zebra") == []
+    assert index.total_length == expected.total_length
+    assert {term: sorted(postings.values()) for term, postings in index.postings.items()} == \
+        {term: sorted(postings.values()) for term, postings in expected.postings.items()}
+
+class UniterablePostings(dict):
+    def __iter__(self):
+        raise AssertionError("removal scanned the whole vocabulary")
+
+def test_remove_only_touches_the_documents_own_terms(tmp_path):
+    index = DocumentIndex(passage_size=50, passage_overlap=10)
+    doc_id = add_file(index, tmp_path / "a.txt", document(1) + " zebra")
+    add_file(index, tmp_path / "b.txt", document(2) + " giraffe")
+    assert "zebra" in index.documents[doc_id]["terms"]
+    index.postings = UniterablePostings(index.postings)
+
+    index.remove_document(str(tmp_path / "a.txt"))
+
+    assert "zebra" not in index.postings
+    assert [hit["name"] for hit in index.search("giraffe")] == ["b.txt"]
+
+def test_saved_index_holds_fingerprints_not_text(tmp_path):
+    index = DocumentIndex()
+    add_file(index, tmp_path / "a.txt", document(1) + " zebra")
+    index.save(str(tmp_path / "index.json"))
+
+    with open(tmp_path / "index.json", "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    doc = next(iter(data["documents"].values()))
+    assert "text" not in doc
+    assert doc["size"] == os.stat(tmp_path / "a.txt").st_size
+    assert doc["hash"] == file_content_hash(str(tmp_path / "a.txt"))
+
+def test_loaded_index_rereads_text_once(tmp_path):
+    index = DocumentIndex(passage_size=50, passage_overlap=10)
+    add_file(index, tmp_path / "a.txt", document(1) + " zebra")
+    index.save(str(tmp_path / "index.json"))
+    calls = []
+
+    loaded = DocumentIndex.load(str(tmp_path / "index.json"), text_loader=counting_loader(calls))
+    texts = [loaded.passage_text(passage_id) for passage_id in loaded.passages]
+
+    assert texts == [index.passage_text(passage_id) for passage_id in index.passages]
+    assert calls == [str(tmp_path / "a.txt")]
+
+def test_touched_but_unchanged_file_is_still_read(tmp_path):
+    index = DocumentIndex()
+    add_file(index, tmp_path / "a.txt", document(1) + " zebra")
+    index.save(str(tmp_path / "index.json"))
+    stat = os.stat(tmp_path / "a.txt")
+    os.utime(tmp_path / "a.txt", (stat.st_atime, stat.st_mtime + 10))
+
+    loaded = DocumentIndex.load(str(tmp_path / "index.json"))
+    hit = loaded.search("zebra")[0]
+
+    assert "zebra" in loaded.passage_text(hit["passage_id"])
+
+def test_changed_file_returns_no_text(tmp_path):
+    index = DocumentIndex()
+    add_file(index, tmp_path / "a.txt", document(1) + " zebra")
+    index.save(str(tmp_path / "index.json"))
+    (tmp_path / "a.txt").write_text(document(2) + " zebra", encoding="utf-8")
+    calls = []
+
+    loaded = DocumentIndex.load(str(tmp_path / "index.json"), text_loader=counting_loader(calls))
+    hit = loaded.search("zebra")[0]
+
+    assert loaded.passage_text(hit["passage_id"]) == ""
+    assert calls == []
+
+def test_text_memory_is_bounded(tmp_path):
+    index = DocumentIndex(max_cached_texts=2)
+    for seed in range(4):
+        add_file(index, tmp_path / f"doc{seed}.txt", document(seed))
+
+    assert len(index._texts) == 2
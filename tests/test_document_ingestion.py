@@ -0,0 +1,110 @@
+from concurrent.futures import Future
+
+import document_ingestion
+from document_ingestion import IngestionReport, ingest_documents
+from knowledge_integration import build_document_index
+
+def write_documents(directory, count):
+    paths = []
+    for number in range(count):
+        path = directory / f"doc{number:02d}.txt"
+        # Vary the sizes so workers finish out of order
+        path.write_text(f"document {number} " + "filler words here " * (50 * (count - number)), encoding="utf-8")
+        paths.append(str(path))
+    return paths
+
+def test_documents_are_yielded_in_input_order(tmp_path):
+    paths = write_documents(tmp_path, 8)
+    report = IngestionReport()
+
+    documents = list(ingest_documents(paths, max_workers=4, report=report))
+
+    assert [document["path"] for document in documents] == paths
+    assert report.files == 8
+    assert report.failed == 0
+
+def test_missing_file_is_counted_as_failed(tmp_path):
+    paths = write_documents(tmp_path, 3)
+    paths.insert(1, str(tmp_path / "missing.txt"))
+    report = IngestionReport()
+
+    documents = list(ingest_documents(paths, max_workers=2, report=report))
+
+    assert [document["path"] for document in documents] == [paths[0]] + paths[2:]
+    assert report.failed == 1
+
+def test_first_of_several_near_duplicates_becomes_canonical(tmp_path):
+    text = " ".join(f"term{i * 37 % 501}" for i in range(400))
+    for name, suffix in [("a.txt", "small"), ("b.txt", "medium"), ("c.txt", "other")]:
+        (tmp_path / name).write_text(f"{text} {suffix}", encoding="utf-8")
+
+    for _ in range(3):
+        index = build_document_index(str(tmp_path), max_workers=3)
+        original = index.find_document(str(tmp_path / "a.txt"))
+        assert index.documents[original].get("duplicate_of") is None
+        for name in ("b.txt", "c.txt"):
+            assert index.documents[index.find_document(str(tmp_path / name))]["duplicate_of"] == original
+
+class InlineExecutor:
+    """Stands in for ProcessPoolExecutor, running each task when it is submitted."""
+
+    submitted = []
+
+    def __init__(self, max_workers):
+        self.max_workers = max_workers
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def submit(self, func, *args):
+        self.submitted.append(args[0])
+        future = Future()
+        future.set_result(func(*args))
+        return future
+
+def test_pool_submissions_stay_within_a_window(tmp_path, monkeypatch):
+    paths = write_documents(tmp_path, 20)
+    InlineExecutor.submitted = []
+    monkeypatch.setattr(document_ingestion, "ProcessPoolExecutor", InlineExecutor)
+
+    documents = ingest_documents(paths, max_workers=2, use_cache=False)
+    first = next(documents)
+
+    assert first["path"] == paths[0]
+    # The window of four plus the file submitted to replace the one yielded
+    assert InlineExecutor.submitted == paths[:5]
+    assert [document["path"] for document in documents] == paths[1:]
+    assert InlineExecutor.submitted == paths
+
+class RecordingCache:
+    """Text cache that holds every file and records when text is read."""
+
+    def __init__(self):
+        self.reads = []
+
+    def contains(self, file_path):
+        return True
+
+    def get(self, file_path):
+        self.reads.append(file_path)
+        with open(file_path, "r", encoding="utf-8") as f:
+            return f.read()
+
+    def cached_hash(self, file_path):
+        return None
+
+def test_cached_text_is_read_when_yielded(tmp_path, monkeypatch):
+    paths = write_documents(tmp_path, 3)
+    cache = RecordingCache()
+    monkeypatch.setattr(document_ingestion, "get_text_cache", lambda: cache)
+    monkeypatch.setattr(document_ingestion, "CACHED_EXTENSIONS", (".txt",))
+
+    documents = ingest_documents(paths, max_workers=1)
+    assert next(documents)["cached"]
+
+    assert cache.reads == paths[:1]
+    assert len(list(documents)) == 2
+    assert cache.reads == paths
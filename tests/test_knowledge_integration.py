@@ -0,0 +1,223 @@
+import asyncio
+import threading
+import time
+
+import knowledge_integration
+from business_agent import BusinessAgent
+from knowledge_integration import (
+    KnowledgeIntegration, get_knowledge_service, knowledge_service, process_reference_requests,
+    reset_knowledge_service, set_knowledge_service
+)
+from mock_llm import MockChatClient
+from llm_gateway import LLMGateway
+
+def make_knowledge(tmp_path, client=None, **config):
+    config = dict({
+        "document_dir": str(tmp_path / "docs"),
+        "use_web_search": False,
+        "use_ai_generation": False,
+        "query_cache_path": str(tmp_path / "query_cache.sqlite")
+    }, **config)
+    return KnowledgeIntegration(config, client)
+
+def test_reference_ledger_is_not_shared_through_the_gateway(tmp_path):
+    gateway = LLMGateway(client=MockChatClient())
+    first = make_knowledge(tmp_path, gateway)
+    second = make_knowledge(tmp_path, gateway)
+
+    first.record_reference("query", "source", "Agent", "critique")
+
+    assert not hasattr(gateway, "knowledge_references")
+    assert len(first.references) == 1
+    assert second.references == []
+
+def test_knowledge_service_is_scoped_to_the_debate(tmp_path):
+    first = make_knowledge(tmp_path)
+    second = make_knowledge(tmp_path)
+    default = get_knowledge_service()
+    seen = {}
+
+    def debate(name, service, ready):
+        with knowledge_service(service):
+            ready.wait()
+            seen[name] = get_knowledge_service()
+
+    # Two debates overlapping in one process each see their own service
+    ready = threading.Event()
+    threads = [threading.Thread(target=debate, args=(name, service, ready))
+               for name, service in (("first", first), ("second", second))]
+    for thread in threads:
+        thread.start()
+    ready.set()
+    for thread in threads:
+        thread.join()
+
+    assert seen == {"first": first, "second": second}
+    assert get_knowledge_service() is default
+
+def test_knowledge_service_keeps_an_installed_service_and_restores_it(tmp_path):
+    installed = make_knowledge(tmp_path)
+    debate_service = make_knowledge(tmp_path)
+
+    token = set_knowledge_service(installed)
+    try:
+        with knowledge_service(debate_service):
+            assert get_knowledge_service() is installed
+        assert get_knowledge_service() is installed
+    finally:
+        reset_knowledge_service(token)
+
+    with knowledge_service(debate_service):
+        assert get_knowledge_service() is debate_service
+    assert get_knowledge_service() is not debate_service
+
+def test_knowledge_service_follows_the_debate_into_tasks_and_threads(tmp_path):
+    service = make_knowledge(tmp_path)
+
+    async def debate():
+        return await asyncio.to_thread(get_knowledge_service)
+
+    with knowledge_service(service):
+        assert asyncio.run(debate()) is service
+
+def test_agent_argument_reference_is_recorded_once(tmp_path, monkeypatch):
+    # autogen builds an OpenAI client for the agent; no call is made
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "notes.txt").write_text("Business applications of remote work include lower office costs.",
+                                    encoding="utf-8")
+    knowledge = make_knowledge(tmp_path)
+    agent = BusinessAgent()
+
+    argument = agent.generate_argument("remote work", knowledge_integration=knowledge)
+    process_reference_requests(argument, knowledge, agent_name=agent.name, phase="initial_perspective")
+
+    queries = [(ref["query"], ref.get("agent")) for ref in knowledge.references]
+    assert queries.count(("business applications of remote work", agent.name)) == 1
+    assert len(queries) == len(set(queries))
+
+def test_reference_joins_a_prefetch_still_generating(tmp_path):
+    client = MockChatClient(latency=0.3)
+    knowledge = make_knowledge(tmp_path, LLMGateway(client=client, rpm_limit=0, tpm_limit=0),
+                               use_ai_generation=True, query_cache=False)
+    lookup = knowledge._retrieve_knowledge
+    lookups = []
+
+    def counting_lookup(query, generate=True):
+        lookups.append((query, generate))
+        return lookup(query, generate)
+    knowledge._retrieve_knowledge = counting_lookup
+
+    prefetched = knowledge.prefetch(["solar adoption"])
+    started = time.time()
+    while not knowledge._inflight and time.time() - started < 5:
+        time.sleep(0.001)
+    text = process_reference_requests("Evidence: [REF: solar adoption]", knowledge, agent_name="Agent")
+    prefetched[0].result()
+
+    assert lookups == [("solar adoption", True)]
+    assert client.stats()["calls"] == 1
+    assert "AI-Generated Knowledge" in text
+
+def blocking_lookup(knowledge, outcome):
+    """Replace the tier lookup with one that waits until a second caller has joined it."""
+    calls = []
+
+    def lookup(query, generate=True):
+        calls.append(query)
+        started = time.time()
+        while knowledge.coalesced_lookups < 1 and time.time() - started < 5:
+            time.sleep(0.001)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+    knowledge._retrieve_knowledge = lookup
+    return calls
+
+def test_concurrent_identical_queries_share_one_lookup(tmp_path):
+    knowledge = make_knowledge(tmp_path, query_cache=False)
+    calls = blocking_lookup(knowledge, ("Web Search", ["shared result"]))
+    results = [None, None]
+
+    def ask(slot, query):
+        results[slot] = knowledge.retrieve_knowledge(query)
+    threads = [threading.Thread(target=ask, args=(0, "Solar costs")),
+               threading.Thread(target=ask, args=(1, "  solar   COSTS "))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert results == [["shared result"], ["shared result"]]
+    assert knowledge.coalesced_lookups == 1
+    assert knowledge._inflight == {}
+    # Each caller records its own reference
+    assert len(knowledge.references) == 2
+
+def test_a_failed_lookup_fails_every_waiter_and_is_not_kept(tmp_path):
+    knowledge = make_knowledge(tmp_path, query_cache=False)
+    calls = blocking_lookup(knowledge, RuntimeError("search backend down"))
+    errors = []
+
+    def ask():
+        try:
+            knowledge.retrieve_knowledge("solar costs")
+        except RuntimeError as e:
+            errors.append(str(e))
+    threads = [threading.Thread(target=ask) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert errors == ["search backend down"] * 2
+    assert len(calls) == 1
+    assert knowledge._inflight == {}
+
+def hedged_knowledge(tmp_path, monkeypatch, local, web, ai):
+    """
+    Return a hedged KnowledgeIntegration whose tiers sleep and answer as
+    given by (delay, results) pairs, and the list of tiers called.
+    """
+    calls = []
+
+    def tier(name, delay, results):
+        def fetch(*args, **kwargs):
+            calls.append(name)
+            time.sleep(delay)
+            return results
+        return fetch
+    monkeypatch.setattr(knowledge_integration, "search_web", tier("web", *web))
+    monkeypatch.setattr(knowledge_integration, "generate_knowledge", tier("ai", *ai))
+    knowledge = make_knowledge(tmp_path, use_web_search=True, use_ai_generation=True, query_cache=False,
+                               hedged_retrieval=True, hedge_delay=0.05, latency_budget=0.5)
+    knowledge._search_local = tier("local", *local)
+    return knowledge, calls
+
+def test_fast_local_results_skip_the_other_tiers(tmp_path, monkeypatch):
+    knowledge, calls = hedged_knowledge(tmp_path, monkeypatch, local=(0.0, ["local"]), web=(0.0, ["web"]),
+                                        ai=(0.0, ["ai"]))
+
+    assert knowledge.retrieve_knowledge("solar costs") == ["local"]
+    assert calls == ["local"]
+
+def test_slow_tier_loses_the_race_to_a_faster_one(tmp_path, monkeypatch):
+    knowledge, calls = hedged_knowledge(tmp_path, monkeypatch, local=(0.1, []), web=(3.0, ["web"]),
+                                        ai=(0.05, ["ai"]))
+
+    started = time.time()
+    results = knowledge.retrieve_knowledge("solar costs")
+
+    # Web is still running when the budget runs out, so AI's answer wins
+    assert results == ["ai"]
+    assert time.time() - started < 1.5
+    assert sorted(calls) == ["ai", "local", "web"]
+
+def test_higher_priority_results_win_within_the_budget(tmp_path, monkeypatch):
+    knowledge, calls = hedged_knowledge(tmp_path, monkeypatch, local=(0.1, []), web=(0.2, ["web"]),
+                                        ai=(0.0, ["ai"]))
+
+    assert knowledge.retrieve_knowledge("solar costs") == ["web"]
+    assert knowledge.references[-1]["source_type"] == "Web Search"
@@ -0,0 +1,65 @@
+import pytest
+
+import llm_cache
+from llm_cache import LLMResponseCache, response_key
+from llm_gateway import LLMGateway
+from mock_llm import MockChatClient
+
+MESSAGES = [{"role": "user", "content": "Summarize the trade-offs of remote work."}]
+
+class Clock:
+    def __init__(self):
+        self.now = 1000000.0
+
+    def __call__(self):
+        self.now += 1
+        return self.now
+
+@pytest.fixture(autouse=True)
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(llm_cache.time, "time", clock)
+    return clock
+
+def stored_bytes(cache):
+    return cache._db.execute("SELECT COALESCE(SUM(bytes), 0) FROM llm_cache").fetchone()[0]
+
+def test_over_budget_evicts_the_least_recently_used_response(tmp_path):
+    cache = LLMResponseCache(str(tmp_path / "llm.sqlite"), max_bytes=250)
+    cache.put("a", "gpt-4o", "x" * 100)
+    cache.put("b", "gpt-4o", "y" * 100)
+    # a is now the most recently used
+    cache.get("a")
+
+    cache.put("c", "gpt-4o", "z" * 100)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "x" * 100
+    assert cache.get("c") == "z" * 100
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["entries"] == 2
+    assert stats["bytes"] == stored_bytes(cache) == 200
+
+def test_replacing_a_response_adjusts_the_size(tmp_path):
+    cache = LLMResponseCache(str(tmp_path / "llm.sqlite"))
+    cache.put("a", "gpt-4o", "x" * 100)
+
+    cache.put("a", "gpt-4o", "é" * 10)
+
+    assert cache.stats()["bytes"] == stored_bytes(cache) == 20
+    assert LLMResponseCache(str(tmp_path / "llm.sqlite")).stats()["bytes"] == 20
+
+def test_gateway_answers_repeated_requests_from_the_cache(tmp_path):
+    client = MockChatClient()
+    gateway = LLMGateway(client=client, rpm_limit=0, tpm_limit=0, backoff_base=0.0,
+                         cache=LLMResponseCache(str(tmp_path / "llm.sqlite")))
+
+    first = gateway.chat(MESSAGES, max_tokens=100)
+    second = gateway.chat(MESSAGES, max_tokens=100)
+    gateway.chat(MESSAGES, max_tokens=100, temperature=0.2)
+
+    assert first == second
+    assert client.stats()["calls"] == 2
+    assert gateway.get_stats()["cache"]["hits"] == 1
+    assert gateway.cache.get(response_key("gpt-4o", MESSAGES, max_tokens=100)) == first
@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+
+import llm_gateway
+from llm_gateway import (
+    AsyncLLMGateway, LLMError, LLMGateway, LLMRateLimitError, LLMTimeoutError, TokenBucket
+)
+from mock_llm import AsyncMockChatClient, MockChatClient
+
+MESSAGES = [{"role": "user", "content": "Summarize the trade-offs of remote work."}]
+
+def make_gateway(client, **kwargs):
+    settings = {"rpm_limit": 0, "tpm_limit": 0, "backoff_base": 0.0}
+    settings.update(kwargs)
+    return LLMGateway(client=client, **settings)
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Record backoff delays instead of sleeping."""
+    delays = []
+    monkeypatch.setattr(llm_gateway.time, "sleep", delays.append)
+    return delays
+
+def test_rate_limited_calls_are_retried_until_they_succeed(sleeps):
+    client = MockChatClient(seed=3, rate_limit_rate=0.5)
+    gateway = make_gateway(client, max_retries=20)
+
+    replies = [gateway.chat(MESSAGES) for _ in range(10)]
+
+    assert all(replies)
+    assert client.stats()["rate_limited"] > 0
+    stats = gateway.get_stats()
+    assert stats["calls"] == 10
+    assert stats["retries"] == client.stats()["rate_limited"]
+    assert stats["failures"] == 0
+
+def test_retries_stop_after_max_retries(sleeps):
+    client = MockChatClient(rate_limit_rate=1.0)
+    gateway = make_gateway(client, max_retries=2)
+
+    with pytest.raises(LLMRateLimitError):
+        gateway.chat(MESSAGES)
+
+    assert client.stats()["calls"] == 3
+    assert gateway.get_stats()["retries"] == 2
+    assert gateway.get_stats()["failures"] == 1
+
+def test_backoff_doubles_up_to_the_maximum(sleeps, monkeypatch):
+    # Take the top of each jitter range so the delays are deterministic
+    monkeypatch.setattr(llm_gateway.random, "uniform", lambda low, high: high)
+    gateway = make_gateway(MockChatClient(timeout_rate=1.0), max_retries=4, backoff_base=1.0, backoff_max=5.0)
+
+    with pytest.raises(LLMTimeoutError):
+        gateway.chat(MESSAGES)
+
+    assert sleeps == [1.0, 2.0, 4.0, 5.0]
+
+def test_retry_after_header_overrides_the_backoff(sleeps):
+    # The mock's 429s carry "retry-after: 0"
+    gateway = make_gateway(MockChatClient(rate_limit_rate=1.0), max_retries=3, backoff_base=10.0)
+
+    with pytest.raises(LLMRateLimitError):
+        gateway.chat(MESSAGES)
+
+    assert sleeps == [0.0, 0.0, 0.0]
+
+def test_non_retryable_errors_fail_immediately(sleeps):
+    class BrokenClient(MockChatClient):
+        def create(self, *args, **kwargs):
+            self.calls += 1
+            raise ValueError("bad request")
+
+    client = BrokenClient()
+    gateway = make_gateway(client, max_retries=5)
+
+    with pytest.raises(LLMError, match="bad request"):
+        gateway.chat(MESSAGES)
+
+    assert client.calls == 1
+    assert sleeps == []
+
+def test_async_gateway_retries_concurrent_calls():
+    client = AsyncMockChatClient(seed=5, rate_limit_rate=0.3)
+    gateway = AsyncLLMGateway(client=client, max_concurrency=4, rpm_limit=0, tpm_limit=0, backoff_base=0.0,
+                              max_retries=20)
+
+    async def run():
+        return await asyncio.gather(*[gateway.chat(MESSAGES) for _ in range(12)])
+
+    replies = asyncio.run(run())
+
+    assert len(replies) == 12 and all(replies)
+    assert gateway.get_stats()["calls"] == 12
+    assert gateway.get_stats()["retries"] == client.stats()["rate_limited"]
+
+def test_token_bucket_reports_the_wait_for_an_empty_bucket():
+    bucket = TokenBucket(60)
+
+    assert bucket.try_acquire(60) == 0.0
+    assert bucket.try_acquire(1) == pytest.approx(1.0, abs=0.05)
+    assert TokenBucket(0).try_acquire(10 ** 6) == 0.0
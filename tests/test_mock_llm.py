@@ -0,0 +1,71 @@
+import asyncio
+import json
+
+import openai
+import pytest
+
+from mock_llm import AsyncMockChatClient, MockChatClient
+
+MESSAGES = [
+    {"role": "system", "content": "You are Business Expert, an expert in strategy."},
+    {"role": "user", "content": "Give your perspective on 'remote work adoption' in about 100 words."}
+]
+
+def reply(client, messages=MESSAGES, **kwargs):
+    return client.chat.completions.create(model="gpt-4o", messages=messages, **kwargs).choices[0].message.content
+
+def test_same_seed_and_prompt_give_the_same_completion():
+    first = reply(MockChatClient(seed=1), max_tokens=200)
+
+    assert first == reply(MockChatClient(seed=1), max_tokens=200)
+    assert first != reply(MockChatClient(seed=2), max_tokens=200)
+    assert "Business Expert" in first
+
+def test_injected_errors_follow_the_configured_rates():
+    client = MockChatClient(seed=5, rate_limit_rate=0.2, timeout_rate=0.1)
+    outcomes = {"ok": 0, "rate_limited": 0, "timed_out": 0}
+
+    for _ in range(500):
+        try:
+            reply(client)
+            outcomes["ok"] += 1
+        except openai.RateLimitError:
+            outcomes["rate_limited"] += 1
+        except openai.APITimeoutError:
+            outcomes["timed_out"] += 1
+
+    stats = client.stats()
+    assert stats["calls"] == 500
+    assert outcomes["rate_limited"] == stats["rate_limited"]
+    assert outcomes["timed_out"] == stats["timed_out"]
+    assert 60 <= stats["rate_limited"] <= 140
+    assert 25 <= stats["timed_out"] <= 75
+
+def test_json_mode_answers_every_numbered_topic():
+    messages = [
+        {"role": "system", "content": "You are a knowledge base. Respond with a JSON object."},
+        {"role": "user", "content": "Provide current knowledge about each of these topics:\n"
+                                    "1. solar costs\n2. wind output\n3. grid storage"}
+    ]
+
+    answers = json.loads(reply(MockChatClient(), messages, max_tokens=1500,
+                               response_format={"type": "json_object"}))
+
+    assert sorted(answers) == ["1", "2", "3"]
+    assert answers["2"].startswith("- wind output:")
+
+def test_async_client_matches_the_sync_completion():
+    async def run():
+        response = await AsyncMockChatClient(seed=1).chat.completions.create(
+            model="gpt-4o", messages=MESSAGES, max_tokens=200)
+        return response.choices[0].message.content
+
+    assert asyncio.run(run()) == reply(MockChatClient(seed=1), max_tokens=200)
+
+@pytest.mark.parametrize("distribution", ["fixed", "uniform", "normal", "lognormal"])
+def test_simulated_latency_stays_near_the_mean(distribution):
+    client = MockChatClient(seed=2, latency=0.5, latency_spread=0.1, latency_distribution=distribution)
+
+    delays = [client._respond("gpt-4o", MESSAGES, 50, None, None)[0] for _ in range(200)]
+
+    assert 0.45 <= sum(delays) / len(delays) <= 0.55
@@ -0,0 +1,100 @@
+import pytest
+
+import query_cache
+from query_cache import QueryCache
+
+class Clock:
+    def __init__(self):
+        self.now = 1000000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(query_cache.time, "time", clock)
+    return clock
+
+def test_results_expire_after_their_tier_ttl(clock):
+    cache = QueryCache(ttls={"web": 60})
+    cache.put("solar panels", "web", ["result"])
+
+    clock.now += 59
+    assert cache.get("solar panels", "web") == ["result"]
+    clock.now += 2
+    assert cache.get("solar panels", "web") is None
+
+def test_local_results_never_expire_but_follow_the_corpus_version(clock):
+    cache = QueryCache()
+    cache.put("solar panels", "local", ["result"], version="v1")
+
+    clock.now += 365 * 24 * 3600
+    assert cache.get("solar panels", "local", version="v1") == ["result"]
+    assert cache.get("solar panels", "local", version="v2") is None
+
+def test_queries_are_normalized(clock):
+    cache = QueryCache()
+    cache.put("Solar   Panels", "ai", ["result"])
+
+    assert cache.get("solar panels", "ai") == ["result"]
+    assert cache.get("solar panels", "web") is None
+
+def test_disk_entries_outlive_the_process_until_they_expire(tmp_path, clock):
+    db_path = str(tmp_path / "queries.sqlite")
+    QueryCache(db_path, ttls={"web": 60}).put("solar panels", "web", ["result"])
+
+    cache = QueryCache(db_path, ttls={"web": 60})
+    assert cache.get("solar panels", "web") == ["result"]
+    assert cache.stats()["disk_hits"] == 1
+
+    clock.now += 61
+    assert QueryCache(db_path, ttls={"web": 60}).get("solar panels", "web") is None
+
+def test_memory_lru_evicts_the_least_recently_used(clock):
+    cache = QueryCache(max_memory_entries=2)
+    cache.put("one", "ai", ["1"])
+    cache.put("two", "ai", ["2"])
+    cache.get("one", "ai")
+    cache.put("three", "ai", ["3"])
+
+    assert cache.get("two", "ai") is None
+    assert cache.get("one", "ai") == ["1"]
+    assert cache.get("three", "ai") == ["3"]
+
+def test_misses_use_the_shorter_negative_ttl(clock):
+    cache = QueryCache(ttls={"web": 3600}, negative_ttls={"web": 60})
+    cache.put("solar panels", "web", [])
+
+    clock.now += 59
+    assert cache.get("solar panels", "web") == []
+    clock.now += 2
+    assert cache.get("solar panels", "web") is None
+
+def test_tiers_without_a_negative_ttl_do_not_cache_misses(clock):
+    cache = QueryCache()
+    cache.put("solar panels", "ai", [])
+
+    assert "ai" not in cache.negative_ttls
+    assert cache.get("solar panels", "ai") is None
+
+def test_negative_hits_are_counted_separately(tmp_path, clock):
+    db_path = str(tmp_path / "queries.sqlite")
+    QueryCache(db_path).put("solar panels", "local", [], version="v1")
+
+    cache = QueryCache(db_path)
+    assert cache.get("solar panels", "local", version="v1") == []
+    assert cache.get("solar panels", "local", version="v1") == []
+    stats = cache.stats()
+
+    assert stats["negative_hits"] == 2
+    assert stats["disk_hits"] == stats["memory_hits"] == 0
+    assert stats["negative_hit_rate"] == 1.0
+
+def test_a_found_result_replaces_a_cached_miss(clock):
+    cache = QueryCache()
+    cache.put("solar panels", "web", [])
+    cache.put("solar panels", "web", ["result"])
+
+    clock.now += 3601
+    assert cache.get("solar panels", "web") == ["result"]
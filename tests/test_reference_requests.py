@@ -0,0 +1,89 @@
+import threading
+import time
+
+from knowledge_integration import KnowledgeIntegration, process_reference_requests
+from llm_gateway import LLMGateway
+from mock_llm import MockChatClient
+
+def make_knowledge(tmp_path, client=None, **config):
+    config = dict({
+        "document_dir": str(tmp_path / "docs"),
+        "use_web_search": False,
+        "use_ai_generation": False,
+        "query_cache": False
+    }, **config)
+    return KnowledgeIntegration(config, client)
+
+def slow_lookups(knowledge, delays, default=0.2):
+    """Replace the tier lookup with one that sleeps per query; return the queries looked up."""
+    calls = []
+    lock = threading.Lock()
+
+    def lookup(query, generate=True):
+        with lock:
+            calls.append(query)
+        time.sleep(delays.get(query, default))
+        return "Web Search", [f"result for {query}"]
+    knowledge._retrieve_knowledge = lookup
+    return calls
+
+def test_distinct_references_resolve_concurrently_once_each(tmp_path):
+    knowledge = make_knowledge(tmp_path)
+    calls = slow_lookups(knowledge, {})
+    text = "A [REF: solar costs] B [REF: wind output] C [REF: solar costs] D [REF: grid storage]"
+
+    started = time.time()
+    resolved = process_reference_requests(text, knowledge, agent_name="Agent", phase="critique")
+    elapsed = time.time() - started
+
+    assert sorted(calls) == ["grid storage", "solar costs", "wind output"]
+    # Three 0.2s lookups in parallel, not in sequence
+    assert elapsed < 0.5
+    assert resolved.count("[Reference for 'solar costs': result for solar costs]") == 2
+    assert "[REF:" not in resolved
+    assert [reference["query"] for reference in knowledge.references if "agent" in reference] == \
+        ["solar costs", "wind output", "grid storage"]
+
+def test_lookups_past_the_deadline_are_reported_as_not_found(tmp_path):
+    knowledge = make_knowledge(tmp_path)
+    slow_lookups(knowledge, {"slow topic": 2.0}, default=0.0)
+
+    started = time.time()
+    resolved = process_reference_requests("[REF: slow topic] and [REF: fast topic]", knowledge, deadline=0.3)
+
+    assert time.time() - started < 1.0
+    assert "[No reference information found for 'slow topic']" in resolved
+    assert "[Reference for 'fast topic': result for fast topic]" in resolved
+
+def mock_gateway():
+    client = MockChatClient()
+    return client, LLMGateway(client=client, rpm_limit=0, tpm_limit=0, backoff_base=0.0)
+
+def test_references_needing_generation_share_one_model_call(tmp_path):
+    client, gateway = mock_gateway()
+    knowledge = make_knowledge(tmp_path, gateway, use_ai_generation=True)
+    text = "A [REF: solar costs] B [REF: wind output] C [REF: grid storage]"
+
+    resolved = process_reference_requests(text, knowledge, agent_name="Agent", phase="critique")
+
+    assert client.stats()["calls"] == 1
+    assert "[REF:" not in resolved
+    for query in ("solar costs", "wind output", "grid storage"):
+        assert f"[Reference for '{query}': 🤖 AI-Generated Knowledge: - {query}:" in resolved
+
+def test_cached_generations_skip_the_model(tmp_path):
+    client, gateway = mock_gateway()
+    knowledge = make_knowledge(tmp_path, gateway, use_ai_generation=True, query_cache=True,
+                               query_cache_path=str(tmp_path / "query_cache.sqlite"))
+    _, version = knowledge._cache_version("ai")
+    knowledge.query_cache.put("solar costs", "ai", ["cached solar answer"], version)
+
+    resolved = process_reference_requests("[REF: solar costs] and [REF: wind output] and [REF: grid storage]",
+                                          knowledge)
+
+    assert client.stats()["calls"] == 1
+    assert "[Reference for 'solar costs': cached solar answer]" in resolved
+    assert "[REF:" not in resolved
+    # Both fresh answers went back into the cache
+    process_reference_requests("[REF: wind output] and [REF: grid storage]", knowledge)
+    assert client.stats()["calls"] == 1
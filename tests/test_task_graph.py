@@ -0,0 +1,96 @@
+import asyncio
+import threading
+
+import pytest
+
+from debate_graph import TaskGraph
+
+def recording_task(log, name, result=None, delay=0.0):
+    async def run(inputs):
+        log.append(f"start {name}")
+        await asyncio.sleep(delay)
+        log.append(f"end {name}")
+        return result if result is not None else inputs
+    return run
+
+def test_tasks_run_after_their_dependencies_with_their_results():
+    log = []
+    graph = TaskGraph()
+    graph.add("d", recording_task(log, "d"), deps=["b", "c"])
+    graph.add("b", recording_task(log, "b", result="B", delay=0.02), deps=["a"])
+    graph.add("c", recording_task(log, "c", result="C", delay=0.01), deps=["a"])
+    graph.add("a", recording_task(log, "a", result="A"))
+
+    results = asyncio.run(graph.run())
+
+    assert results["d"] == {"b": "B", "c": "C"}
+    assert log.index("end a") < log.index("start b")
+    assert log.index("end a") < log.index("start c")
+    assert log.index("start d") > max(log.index("end b"), log.index("end c"))
+    # Independent tasks overlap instead of waiting for each other
+    assert log.index("start c") < log.index("end b")
+
+def test_blocking_tasks_run_in_a_worker_thread():
+    graph = TaskGraph()
+    graph.add("value", recording_task([], "value", result=2))
+    graph.add("thread", lambda inputs: (threading.current_thread() is threading.main_thread(), inputs["value"] * 2),
+              deps=["value"], blocking=True)
+
+    results = asyncio.run(graph.run())
+
+    assert results["thread"] == (False, 4)
+
+def test_a_failure_propagates_and_cancels_the_rest():
+    log = []
+
+    async def fail(inputs):
+        raise RuntimeError("agent call failed")
+
+    graph = TaskGraph()
+    graph.add("fail", fail)
+    graph.add("dependent", recording_task(log, "dependent"), deps=["fail"])
+    graph.add("slow", recording_task(log, "slow", delay=5))
+
+    with pytest.raises(RuntimeError, match="agent call failed"):
+        asyncio.run(asyncio.wait_for(graph.run(), timeout=2))
+
+    assert "start dependent" not in log
+    assert "end slow" not in log
+    assert graph._futures["slow"].cancelled()
+
+def test_cycles_and_unknown_dependencies_are_rejected_before_running():
+    log = []
+    graph = TaskGraph()
+    graph.add("independent", recording_task(log, "independent"))
+    graph.add("a", recording_task(log, "a"), deps=["c"])
+    graph.add("b", recording_task(log, "b"), deps=["a"])
+    graph.add("c", recording_task(log, "c"), deps=["b"])
+
+    with pytest.raises(ValueError, match="cycle among tasks: a, b, c"):
+        asyncio.run(graph.run())
+    assert log == []
+
+    graph = TaskGraph()
+    graph.add("a", recording_task(log, "a"), deps=["missing"])
+    with pytest.raises(ValueError, match="unknown task missing"):
+        asyncio.run(graph.run())
+
+    with pytest.raises(ValueError, match="Duplicate task"):
+        graph.add("a", recording_task(log, "a"))
+
+def test_dynamic_dependencies_are_on_the_critical_path():
+    graph = TaskGraph()
+    graph.add("start", recording_task([], "start", result="go"))
+    graph.add("slow", recording_task([], "slow", result="slow", delay=0.05), deps=["start"])
+    graph.add("fast", recording_task([], "fast", result="fast"), deps=["start"])
+
+    async def finish(inputs):
+        # Which task is needed is only known at run time
+        return await graph.result("slow")
+
+    graph.add("finish", finish, deps=["fast"])
+
+    results = asyncio.run(graph.run())
+
+    assert results["finish"] == "slow"
+    assert [name for name, _ in graph.critical_path()] == ["start", "slow", "finish"]
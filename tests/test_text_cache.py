@@ -0,0 +1,94 @@
+import json
+import os
+
+import pytest
+
+import text_cache
+from text_cache import ExtractedTextCache, file_content_hash
+
+class Clock:
+    def __init__(self):
+        self.now = 1000000.0
+
+    def __call__(self):
+        self.now += 1
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(text_cache.time, "time", clock)
+    return clock
+
+def make_file(directory, name, text):
+    path = directory / name
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+def test_cached_text_survives_a_new_instance(tmp_path):
+    path = make_file(tmp_path, "a.pdf", "raw bytes")
+    ExtractedTextCache(str(tmp_path / "cache")).put(path, "extracted text")
+
+    cache = ExtractedTextCache(str(tmp_path / "cache"))
+
+    assert cache.contains(path)
+    assert cache.get(path) == "extracted text"
+    assert cache.stats()["hits"] == 1
+
+def test_changed_file_misses_and_touched_file_hits(tmp_path):
+    path = make_file(tmp_path, "a.pdf", "raw bytes")
+    cache = ExtractedTextCache(str(tmp_path / "cache"))
+    cache.put(path, "extracted text")
+
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+    assert cache.get(path) == "extracted text"
+
+    make_file(tmp_path, "a.pdf", "new raw bytes")
+    assert not cache.contains(path)
+    assert cache.get(path) is None
+
+def test_access_order_carries_over_between_processes(tmp_path, clock):
+    paths = [make_file(tmp_path, f"{name}.pdf", name) for name in ("a", "b", "c")]
+    first = ExtractedTextCache(str(tmp_path / "cache"))
+    first.put(paths[0], "x" * 100)
+    first.put(paths[1], "y" * 100)
+    # a is now the most recently used
+    first.get(paths[0])
+
+    second = ExtractedTextCache(str(tmp_path / "cache"), max_bytes=250)
+    second.put(paths[2], "z" * 100)
+
+    assert second.get(paths[1]) is None
+    assert second.get(paths[0]) == "x" * 100
+    assert second.stats()["bytes"] == 200
+    assert sorted(os.listdir(tmp_path / "cache" / "blobs")) == sorted(
+        f"{file_content_hash(path)}.txt" for path in (paths[0], paths[2]))
+
+def test_entries_from_a_json_manifest_are_imported(tmp_path):
+    path = make_file(tmp_path, "a.pdf", "raw bytes")
+    cache_dir = tmp_path / "cache"
+    (cache_dir / "blobs").mkdir(parents=True)
+    content_hash = file_content_hash(path)
+    (cache_dir / "blobs" / f"{content_hash}.txt").write_text("extracted text", encoding="utf-8")
+    stat = os.stat(path)
+    (cache_dir / "manifest.json").write_text(json.dumps({os.path.abspath(path): {
+        "size": stat.st_size, "mtime": stat.st_mtime, "hash": content_hash, "bytes": 14, "last_access": 1.0
+    }}), encoding="utf-8")
+
+    cache = ExtractedTextCache(str(cache_dir))
+
+    assert cache.get(path) == "extracted text"
+    assert not (cache_dir / "manifest.json").exists()
+
+def test_text_is_not_cached_if_the_file_changed_during_extraction(tmp_path):
+    path = make_file(tmp_path, "a.pdf", "raw bytes")
+    stat = os.stat(path)
+    cache = ExtractedTextCache(str(tmp_path / "cache"))
+
+    # Edited after the stat was taken, while the old contents were being extracted
+    make_file(tmp_path, "a.pdf", "edited raw bytes")
+    stored = cache.put(path, "text of the old contents", size=stat.st_size, mtime=stat.st_mtime)
+
+    assert not stored
+    assert cache.get(path) is None
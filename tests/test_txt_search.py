@@ -0,0 +1,63 @@
+from knowledge_integration import _find_in_decoded_txt, find_in_txt, search_txt_file
+
+def test_ascii_query_matches_case_insensitively(tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_text("Intro.\nRemote WORK improves focus.\n", encoding="utf-8")
+
+    start, end = find_in_txt(str(path), "remote work")
+
+    assert path.read_bytes()[start:end] == b"Remote WORK"
+
+def test_non_ascii_query_matches_other_case(tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_text("Einleitung. ÜBERSICHT der Ergebnisse: Größe zählt.\n", encoding="utf-8")
+
+    start, end = find_in_txt(str(path), "übersicht")
+
+    assert path.read_bytes()[start:end].decode("utf-8") == "ÜBERSICHT"
+    assert "ÜBERSICHT der Ergebnisse" in search_txt_file(str(path), "übersicht")
+
+def test_non_ascii_query_in_latin1_file(tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_bytes("Résumé: ÉTUDE complète\n".encode("latin-1"))
+
+    start, end = find_in_txt(str(path), "étude")
+
+    assert path.read_bytes()[start:end].decode("latin-1") == "ÉTUDE"
+
+def test_missing_query_returns_none(tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_text("Nothing to see here. Ü\n", encoding="utf-8")
+
+    assert find_in_txt(str(path), "absent") is None
+    assert find_in_txt(str(path), "größe") is None
+
+def test_non_ascii_match_across_chunk_boundaries(tmp_path):
+    path = tmp_path / "notes.txt"
+    text = "Größe Übung ÄRGER " * 20 + "Kernpunkt: ÜBERSICHT der Ergebnisse\n"
+    path.write_text(text, encoding="utf-8")
+    data = path.read_bytes()
+    expected = data.index("ÜBERSICHT".encode("utf-8"))
+
+    # Every small chunk size puts the match (and multi-byte characters) across a boundary
+    for chunk_size in range(3, 24):
+        start, end = _find_in_decoded_txt(str(path), "übersicht", chunk_size=chunk_size)
+        assert (start, data[start:end].decode("utf-8")) == (expected, "ÜBERSICHT"), chunk_size
+
+def test_non_ascii_match_after_switching_to_latin1(tmp_path):
+    path = tmp_path / "notes.txt"
+    # Valid UTF-8 up to a Latin-1 byte further into the file
+    path.write_bytes("Größe ".encode("utf-8") * 10 + "café ÉTUDE finale\n".encode("latin-1"))
+    data = path.read_bytes()
+
+    start, end = _find_in_decoded_txt(str(path), "étude", chunk_size=16)
+
+    assert data[start:end].decode("latin-1") == "ÉTUDE"
+
+def test_dotted_capital_i_maps_back_to_byte_offsets(tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_text("İİİ then ÇAĞRI merkezi\n", encoding="utf-8")
+
+    start, end = _find_in_decoded_txt(str(path), "çağ", chunk_size=5)
+
+    assert path.read_bytes()[start:end].decode("utf-8") == "ÇAĞ"
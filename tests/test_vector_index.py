@@ -0,0 +1,66 @@
+import json
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from document_index import DocumentIndex
+from vector_index import VectorIndex
+
+TEXTS = {
+    "energy.txt": "Solar panels and wind turbines lower household electricity costs over a decade.",
+    "health.txt": "Hospitals adopt diagnostic software to reduce waiting times for patients.",
+    "trust.txt": "Readers judge the reliability of automated news by checking cited sources."
+}
+
+@pytest.fixture
+def document_index(tmp_path):
+    index = DocumentIndex()
+    for name, text in TEXTS.items():
+        path = tmp_path / name
+        path.write_text(text, encoding="utf-8")
+        index.add_document(str(path), text)
+    return index
+
+def names(document_index, hits):
+    return [document_index.documents[document_index.passages[pid]["doc_id"]]["name"] for pid, _ in hits]
+
+def test_reworded_query_finds_the_passage(document_index):
+    vectors = VectorIndex.build(document_index, dim=512)
+
+    # "reliable" shares only the "relia*" prefix feature with "reliability"
+    hits = vectors.search("is it reliable", top_k=1)
+
+    assert names(document_index, hits) == ["trust.txt"]
+    assert 0 < hits[0][1] <= 1.0
+
+def test_batch_search_matches_single_queries(document_index):
+    vectors = VectorIndex.build(document_index, dim=512)
+    queries = ["wind electricity costs", "hospital waiting times", "what is the"]
+
+    batch = vectors.search_batch(queries, top_k=2)
+
+    assert batch == [vectors.search(query, top_k=2) for query in queries]
+    assert batch[2] == []
+    assert vectors.matrix.dtype == np.float32
+    assert vectors.matrix.shape == (len(document_index.passages), 512)
+
+@pytest.mark.parametrize("memory_map", [False, True])
+def test_saved_vectors_load_with_the_same_scores(document_index, tmp_path, memory_map):
+    vectors = VectorIndex.build(document_index, dim=512)
+    vectors.save(str(tmp_path / "vectors"))
+
+    loaded = VectorIndex.load(str(tmp_path / "vectors"), memory_map=memory_map)
+
+    assert loaded.corpus_version == document_index.corpus_version()
+    assert isinstance(loaded.matrix, np.memmap) == memory_map
+    assert loaded.search("solar power costs") == vectors.search("solar power costs")
+
+def test_vectors_from_another_format_version_are_ignored(document_index, tmp_path):
+    VectorIndex.build(document_index, dim=512).save(str(tmp_path / "vectors"))
+    meta_path = tmp_path / "vectors.json"
+    meta = json.loads(meta_path.read_text(encoding="utf-8"))
+    meta["version"] = -1
+    meta_path.write_text(json.dumps(meta), encoding="utf-8")
+
+    assert VectorIndex.load(str(tmp_path / "vectors")) is None
@@ -0,0 +1,253 @@
+"""
+Content-addressed store of text extracted from local documents.
+
+Extracting text from PDFs and DOCX files is the slowest step of local
+retrieval, so extracted text is kept on disk and reused until the source
+file changes. Entries are looked up by path, size and mtime; when the stat
+information changes the file's content hash decides whether the cached
+text is still valid. The manifest lives in SQLite, so each store or lookup
+updates one row and the eviction order survives restarts.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+
+logger = logging.getLogger("TextCache")
+
+def file_content_hash(file_path, chunk_size=1024 * 1024):
+    """Return the SHA-256 hex digest of a file's contents, read in chunks."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class ExtractedTextCache:
+    """Size-bounded on-disk cache of extracted document text with LRU eviction."""
+
+    def __init__(self, cache_dir, max_bytes=512 * 1024 * 1024):
+        """
+        Initialize the cache, opening the manifest database in cache_dir.
+
+        Args:
+            cache_dir (str): Directory holding the manifest and text blobs
+            max_bytes (int): Upper bound on the total size of stored text
+        """
+        self.cache_dir = cache_dir
+        self.blob_dir = os.path.join(cache_dir, "blobs")
+        self.db_path = os.path.join(cache_dir, "manifest.sqlite")
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = self._open_manifest()
+
+    def _open_manifest(self):
+        """
+        Open the manifest (path -> size, mtime, hash, bytes, last access) in SQLite.
+
+        Each put or lookup updates a single row, so building a cache over N
+        files doesn't rewrite the whole manifest N times, and access times
+        (and so the eviction order) carry over between processes.
+        """
+        schema = ("CREATE TABLE IF NOT EXISTS entries ("
+                  "path TEXT PRIMARY KEY, size INTEGER, mtime REAL, hash TEXT, bytes INTEGER, last_access REAL)")
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            db = sqlite3.connect(self.db_path, check_same_thread=False)
+            db.execute(schema)
+            db.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Could not open text cache manifest '{self.db_path}': {e}. Using memory only.")
+            db = sqlite3.connect(":memory:", check_same_thread=False)
+            db.execute(schema)
+        self._import_json_manifest(db)
+        return db
+
+    def _import_json_manifest(self, db):
+        """Move entries from the JSON manifest used by earlier versions into the database."""
+        json_path = os.path.join(self.cache_dir, "manifest.json")
+        if not os.path.exists(json_path):
+            return
+        try:
+            with open(json_path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+            db.executemany(
+                "INSERT OR IGNORE INTO entries (path, size, mtime, hash, bytes, last_access) VALUES (?, ?, ?, ?, ?, ?)",
+                [(key, entry["size"], entry["mtime"], entry["hash"], entry["bytes"], entry["last_access"])
+                 for key, entry in entries.items()]
+            )
+            db.commit()
+            os.remove(json_path)
+        except Exception as e:
+            logger.warning(f"Could not import text cache manifest '{json_path}': {e}")
+
+    def _blob_path(self, content_hash):
+        return os.path.join(self.blob_dir, f"{content_hash}.txt")
+
+    def get(self, file_path):
+        """
+        Return cached text for a file if it is still valid.
+
+        Args:
+            file_path (str): Path of the source document
+
+        Returns:
+            str: The cached text, or None on a miss
+        """
+        key = os.path.abspath(file_path)
+        with self._lock:
+            entry = self._valid_entry(key, file_path)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            try:
+                with open(self._blob_path(entry["hash"]), "r", encoding="utf-8") as f:
+                    text = f.read()
+            except OSError:
+                self._db.execute("DELETE FROM entries WHERE path = ?", (key,))
+                self._db.commit()
+                self.misses += 1
+                return None
+
+            self._db.execute("UPDATE entries SET last_access = ? WHERE path = ?", (time.time(), key))
+            self._db.commit()
+            self.hits += 1
+            return text
+
+    def contains(self, file_path):
+        """Return True if valid text is cached for a file, without reading the text."""
+        with self._lock:
+            return self._valid_entry(os.path.abspath(file_path), file_path) is not None
+
+    def _valid_entry(self, key, file_path):
+        """Return the manifest entry for a file if it still matches the file, else None."""
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        row = self._db.execute("SELECT size, mtime, hash FROM entries WHERE path = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        entry = {"size": row[0], "mtime": row[1], "hash": row[2]}
+        if entry["size"] != stat.st_size:
+            return None
+        if entry["mtime"] != stat.st_mtime:
+            # Touched but possibly unchanged: verify against the content hash
+            if file_content_hash(file_path) != entry["hash"]:
+                return None
+            entry["mtime"] = stat.st_mtime
+            self._db.execute("UPDATE entries SET mtime = ? WHERE path = ?", (stat.st_mtime, key))
+            self._db.commit()
+        return entry
+
+    def cached_hash(self, file_path):
+        """Return the content hash recorded for a file, or None if it is not cached."""
+        with self._lock:
+            row = self._db.execute("SELECT hash FROM entries WHERE path = ?",
+                                   (os.path.abspath(file_path),)).fetchone()
+            return row[0] if row else None
+
+    def put(self, file_path, text, content_hash=None, size=None, mtime=None):
+        """
+        Store extracted text for a file and evict old entries if over budget.
+
+        Pass the size and mtime the file had before extraction started: if the
+        file has changed since, the text is not cached, rather than recording
+        the new file's fingerprint against the old text.
+
+        Args:
+            file_path (str): Path of the source document
+            text (str): Extracted text
+            content_hash (str, optional): Content hash of the file, computed
+                after size and mtime were taken
+            size (int, optional): File size before extraction
+            mtime (float, optional): File modification time before extraction
+
+        Returns:
+            bool: True if the text was stored
+        """
+        key = os.path.abspath(file_path)
+        content_hash = content_hash or file_content_hash(file_path)
+        stat = os.stat(file_path)
+        if size is not None and (size, mtime) != (stat.st_size, stat.st_mtime):
+            logger.info(f"'{file_path}' changed while its text was extracted; not caching it")
+            return False
+        data = text.encode("utf-8")
+
+        with self._lock:
+            os.makedirs(self.blob_dir, exist_ok=True)
+            blob_path = self._blob_path(content_hash)
+            if not os.path.exists(blob_path):
+                tmp_path = f"{blob_path}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, blob_path)
+
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries (path, size, mtime, hash, bytes, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, stat.st_size, stat.st_mtime, content_hash, len(data), time.time())
+            )
+            self._evict()
+            self._db.commit()
+        return True
+
+    def invalidate(self, file_path):
+        """Drop the cached text for a file."""
+        key = os.path.abspath(file_path)
+        with self._lock:
+            row = self._db.execute("SELECT hash FROM entries WHERE path = ?", (key,)).fetchone()
+            if row is not None:
+                self._db.execute("DELETE FROM entries WHERE path = ?", (key,))
+                self._db.commit()
+                self._remove_blob_if_unused(row[0])
+
+    def _remove_blob_if_unused(self, content_hash):
+        """Delete a text blob once no entry refers to it."""
+        if self._db.execute("SELECT 1 FROM entries WHERE hash = ? LIMIT 1", (content_hash,)).fetchone():
+            return
+        try:
+            os.remove(self._blob_path(content_hash))
+        except OSError:
+            pass
+
+    def _stored_bytes(self):
+        """Return the size of the stored blobs; entries with the same content share one."""
+        row = self._db.execute(
+            "SELECT SUM(bytes) FROM (SELECT MAX(bytes) AS bytes FROM entries GROUP BY hash)"
+        ).fetchone()
+        return row[0] or 0
+
+    def _evict(self):
+        """Evict least recently used entries until the cache fits in max_bytes."""
+        total = self._stored_bytes()
+        if total <= self.max_bytes:
+            return
+
+        rows = self._db.execute("SELECT path, hash, bytes FROM entries ORDER BY last_access").fetchall()
+        for key, content_hash, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._db.execute("DELETE FROM entries WHERE path = ?", (key,))
+            if not self._db.execute("SELECT 1 FROM entries WHERE hash = ? LIMIT 1", (content_hash,)).fetchone():
+                total -= size
+                self._remove_blob_if_unused(content_hash)
+            logger.info(f"Evicted cached text for '{key}'")
+
+    def stats(self):
+        """Return hit/miss counters and the current cache size."""
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": entries,
+                "bytes": self._stored_bytes()
+            }
@@ -0,0 +1,219 @@
+"""
+Dense passage retrieval over the local document corpus.
+
+Passages from the document index are vectorised with a dependency-light
+hashing TF-IDF scheme into one contiguous float32 NumPy matrix (optionally
+memory-mapped from disk). A lookup is a single matrix product against the
+query vectors followed by an argpartition top-k, so partially matching or
+reworded queries still find relevant passages without any network call.
+"""
+
+import os
+import json
+import math
+import zlib
+import logging
+
+from document_index import tokenize
+
+try:
+    import numpy as np
+    NUMPY_SUPPORT = True
+except ImportError:
+    NUMPY_SUPPORT = False
+    logging.warning("numpy not installed. Dense retrieval disabled.")
+
+logger = logging.getLogger("VectorIndex")
+
+VECTOR_INDEX_VERSION = 1
+
+def feature_keys(text):
+    """
+    Return the features of a text before hashing.
+
+    Each term contributes itself and, for longer words, its five-letter
+    prefix so that inflections ("reliable", "reliability") share a feature.
+
+    Args:
+        text (str): Text to featurise
+
+    Returns:
+        list: Feature strings, with repeats
+    """
+    keys = []
+    for term, _ in tokenize(text):
+        keys.append(term)
+        if len(term) > 5:
+            keys.append(term[:5] + "*")
+    return keys
+
+def hashed_features(text, dim):
+    """
+    Map text to signed hashed term-frequency features.
+
+    Args:
+        text (str): Text to vectorise
+        dim (int): Number of hash buckets
+
+    Returns:
+        dict: bucket -> signed term frequency
+    """
+    features = {}
+    for key in feature_keys(text):
+        h = zlib.crc32(key.encode("utf-8"))
+        bucket = h % dim
+        sign = -1.0 if h & 0x80000000 else 1.0
+        features[bucket] = features.get(bucket, 0.0) + sign
+    return features
+
+class VectorIndex:
+    """Hashing TF-IDF passage vectors held in a float32 matrix."""
+
+    def __init__(self, dim=2048):
+        """
+        Initialize an empty vector index.
+
+        Args:
+            dim (int): Vector dimensionality (number of hash buckets)
+        """
+        self.dim = dim
+        self.passage_ids = []
+        self.idf = None
+        self.matrix = None
+        self.corpus_version = None
+
+    def __len__(self):
+        return len(self.passage_ids)
+
+    def _weight(self, features):
+        """Apply sublinear TF and IDF to hashed features and return a unit vector."""
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for bucket, tf in features.items():
+            vector[bucket] = math.copysign(1 + math.log(abs(tf)), tf) if tf else 0.0
+        vector *= self.idf
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    @classmethod
+    def build(cls, document_index, dim=2048):
+        """
+        Vectorise every passage of a DocumentIndex.
+
+        Args:
+            document_index (DocumentIndex): Source of passages
+            dim (int): Vector dimensionality
+
+        Returns:
+            VectorIndex: The populated vector index
+        """
+        index = cls(dim=dim)
+        index.passage_ids = list(document_index.passages)
+        index.corpus_version = document_index.corpus_version()
+
+        features = [hashed_features(document_index.passage_text(pid), dim) for pid in index.passage_ids]
+        doc_freq = np.zeros(dim, dtype=np.float32)
+        for passage_features in features:
+            doc_freq[list(passage_features)] += 1
+        count = len(features)
+        index.idf = (np.log((count + 1) / (doc_freq + 1)) + 1).astype(np.float32)
+
+        index.matrix = np.zeros((count, dim), dtype=np.float32)
+        for row, passage_features in enumerate(features):
+            index.matrix[row] = index._weight(passage_features)
+
+        logger.info(f"Vectorised {count} passages into a {count}x{dim} matrix")
+        return index
+
+    def search_batch(self, queries, top_k=3, min_score=0.1):
+        """
+        Score many queries against all passages with one matrix product.
+
+        Args:
+            queries (list): Query strings
+            top_k (int): Maximum passages per query
+            min_score (float): Minimum cosine similarity for a result
+
+        Returns:
+            list: For each query, a list of (passage_id, score) best first
+        """
+        if not queries:
+            return []
+        if not self.passage_ids:
+            return [[] for _ in queries]
+
+        query_matrix = np.stack([self._weight(hashed_features(q, self.dim)) for q in queries])
+        scores = self.matrix @ query_matrix.T
+
+        k = min(top_k, len(self.passage_ids))
+        results = []
+        for column in range(scores.shape[1]):
+            column_scores = scores[:, column]
+            top = np.argpartition(-column_scores, k - 1)[:k]
+            top = top[np.argsort(-column_scores[top])]
+            results.append([(self.passage_ids[row], float(column_scores[row]))
+                            for row in top if column_scores[row] >= min_score])
+        return results
+
+    def search(self, query, top_k=3, min_score=0.1):
+        """Score a single query; see search_batch()."""
+        return self.search_batch([query], top_k=top_k, min_score=min_score)[0]
+
+    def save(self, base_path):
+        """
+        Write the matrix (.npy) and its metadata (.json) next to base_path.
+
+        Args:
+            base_path (str): Path prefix for the two files
+        """
+        directory = os.path.dirname(base_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        tmp_matrix = f"{base_path}.tmp.npy"
+        np.save(tmp_matrix, self.matrix)
+        os.replace(tmp_matrix, f"{base_path}.npy")
+
+        meta = {
+            "version": VECTOR_INDEX_VERSION,
+            "dim": self.dim,
+            "corpus_version": self.corpus_version,
+            "passage_ids": self.passage_ids,
+            "idf": self.idf.tolist()
+        }
+        tmp_meta = f"{base_path}.json.tmp"
+        with open(tmp_meta, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_meta, f"{base_path}.json")
+
+    @classmethod
+    def load(cls, base_path, memory_map=False):
+        """
+        Load a vector index written with save().
+
+        Args:
+            base_path (str): Path prefix used when saving
+            memory_map (bool): Map the matrix read-only from disk instead of
+                reading it into memory
+
+        Returns:
+            VectorIndex: The loaded index, or None if missing or incompatible
+        """
+        if not os.path.exists(f"{base_path}.json") or not os.path.exists(f"{base_path}.npy"):
+            return None
+
+        try:
+            with open(f"{base_path}.json", "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("version") != VECTOR_INDEX_VERSION:
+                return None
+            matrix = np.load(f"{base_path}.npy", mmap_mode="r" if memory_map else None)
+        except Exception as e:
+            logger.warning(f"Could not read vector index '{base_path}': {e}")
+            return None
+
+        index = cls(dim=meta["dim"])
+        index.corpus_version = meta["corpus_version"]
+        index.passage_ids = meta["passage_ids"]
+        index.idf = np.asarray(meta["idf"], dtype=np.float32)
+        index.matrix = matrix
+        return index